@@ -10,6 +10,8 @@ from fuzzywuzzy import fuzz
 import os
 from dotenv import load_dotenv
 
+from post_carga import refrescar_resumenes
+
 load_dotenv()
 
 # Configuración BD
@@ -201,9 +203,15 @@ def cargar_inversion_medios(conn, file_path):
     
     execute_batch(cursor, insert_query, registros, page_size=1000)
     conn.commit()
+    
+    # Cubo por (anunciante, mes, medio, vehículo): las consultas de inversión no leen los hechos crudos
+    cursor.execute("SELECT reconstruir_cubo_inversion_medios()")
+    filas_cubo = cursor.fetchone()[0]
+    conn.commit()
     cursor.close()
     
     print(f"\n✅ {len(registros):,} registros insertados")
+    print(f"✅ Cubo de inversión: {filas_cubo:,} filas")
     print(f"✅ {nuevos_aliases} nuevos aliases agregados")
     print(f"\n📊 Estadísticas de matching:")
     print(f"   ✅ Match exacto: {match_stats['matched']:,} ({match_stats['matched']/len(df)*100:.1f}%)")
@@ -335,6 +343,9 @@ def main():
             "POSICIONAMIENTO_DE_CLIENTES.xlsx"
         )
         
+        # Resúmenes 360° (mv_anunciante_360) con perfil y ranking recién cargados
+        refrescar_resumenes(conn)
+        
         conn.close()
         print("\n" + "="*80)
         print("✅ CARGA COMPLETADA EXITOSAMENTE")
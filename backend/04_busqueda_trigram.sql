@@ -0,0 +1,85 @@
+-- ============================================================================
+-- BÚSQUEDA FUZZY CON pg_trgm - Similitud real e índices de trigramas
+-- Reemplaza la simulación con LIKE '%..%' de buscar_anunciante_fuzzy
+-- Requiere: 03_sistema_aliases.sql
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+
+-- ÍNDICES GIN DE TRIGRAMAS
+-- ============================================================================
+-- Soportan %, <%, LIKE '%..%' e ILIKE sobre las mismas expresiones UPPER()
+-- que usan las consultas de la aplicación
+
+CREATE INDEX IF NOT EXISTS idx_aliases_nombre_trgm
+    ON dim_anunciante_aliases USING GIN (UPPER(nombre_alias) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_anunciante_nombre_trgm
+    ON dim_anunciante USING GIN (UPPER(nombre_canonico) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_perfil_nombre_trgm
+    ON dim_anunciante_perfil USING GIN (UPPER(nombre_anunciante) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_inversion_nombre_trgm
+    ON fact_inversion_medios USING GIN (UPPER(nombre_anunciante) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_dnit_razon_social_trgm
+    ON dim_posicionamiento_dnit USING GIN (UPPER(razon_social) gin_trgm_ops);
+
+
+-- FUNCIÓN: buscar_anunciante_fuzzy (similitud real con pg_trgm)
+-- ============================================================================
+-- Misma firma que la versión anterior: p_threshold en escala 0-100.
+-- Candidatos por índice:
+--   alias % nombre   → similitud de trigramas del texto completo
+--   nombre <% alias  → el nombre buscado aparece como palabra/parte del alias
+-- similitud = mayor de similarity() y word_similarity(), escalado a 0-100
+CREATE OR REPLACE FUNCTION buscar_anunciante_fuzzy(
+    p_nombre TEXT,
+    p_threshold INTEGER DEFAULT 80
+)
+RETURNS TABLE(
+    anunciante_id INTEGER,
+    nombre_alias VARCHAR,
+    similitud INTEGER
+) AS $$
+BEGIN
+    -- Umbrales de los operadores % y <% (solo para esta transacción)
+    PERFORM set_config('pg_trgm.similarity_threshold', (p_threshold / 100.0)::TEXT, true);
+    PERFORM set_config('pg_trgm.word_similarity_threshold', (p_threshold / 100.0)::TEXT, true);
+
+    RETURN QUERY
+    SELECT
+        a.anunciante_id,
+        a.nombre_alias,
+        CASE
+            WHEN UPPER(a.nombre_alias) = UPPER(p_nombre) THEN 100
+            ELSE ROUND(GREATEST(
+                similarity(UPPER(a.nombre_alias), UPPER(p_nombre)),
+                word_similarity(UPPER(p_nombre), UPPER(a.nombre_alias))
+            ) * 100)::INTEGER
+        END as similitud
+    FROM dim_anunciante_aliases a
+    WHERE
+        UPPER(a.nombre_alias) % UPPER(p_nombre)
+        OR UPPER(p_nombre) <% UPPER(a.nombre_alias)
+    ORDER BY similitud DESC, a.confianza DESC
+    LIMIT 5;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION buscar_anunciante_fuzzy IS
+'Búsqueda fuzzy con pg_trgm (índice GIN). Retorna top 5 matches con similitud 0-100 >= p_threshold.';
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Debe usar Bitmap Index Scan sobre idx_aliases_nombre_trgm
+-- EXPLAIN ANALYZE SELECT * FROM buscar_anunciante_fuzzy('cervepar', 60);
+
+-- EXPLAIN ANALYZE
+-- SELECT anunciante_id, nombre_canonico FROM dim_anunciante
+-- WHERE UPPER(nombre_canonico) LIKE '%CERVEPAR%';
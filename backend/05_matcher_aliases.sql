@@ -0,0 +1,109 @@
+-- ============================================================================
+-- MATCHER DE ALIASES - Reglas de aliases y falsos positivos en la base
+-- Reemplaza los diccionarios ALIASES_AUTOMATICOS / FALSOS_POSITIVOS de
+-- jarvis_360_integration.py; los trainers agregan reglas sin deploy
+-- Requiere: 03_sistema_aliases.sql
+-- ============================================================================
+
+
+-- TABLA: dim_anunciante_alias_negativo (reglas "NO matchear")
+-- ============================================================================
+-- Si el query contiene patron_query, ningún anunciante cuyo nombre contenga
+-- patron_nombre puede ser el resultado (ej: "cervepar" nunca es "CERVEZA DIOSA")
+CREATE TABLE IF NOT EXISTS dim_anunciante_alias_negativo (
+    negativo_id SERIAL PRIMARY KEY,
+    patron_query VARCHAR(200) NOT NULL,
+    patron_nombre VARCHAR(300) NOT NULL,
+    fuente VARCHAR(50) NOT NULL DEFAULT 'manual', -- 'base', 'manual', 'trainer'
+    created_at TIMESTAMP DEFAULT NOW(),
+    created_by VARCHAR(100),
+    CONSTRAINT unique_alias_negativo UNIQUE(patron_query, patron_nombre)
+);
+
+COMMENT ON TABLE dim_anunciante_alias_negativo IS
+'Reglas anti-falsos positivos: un query que contiene patron_query nunca identifica
+un anunciante cuyo nombre contiene patron_nombre.';
+
+
+-- POBLACIÓN INICIAL: falsos positivos conocidos (antes hardcodeados)
+-- ============================================================================
+INSERT INTO dim_anunciante_alias_negativo (patron_query, patron_nombre, fuente)
+VALUES
+    -- Cervezas diferentes
+    ('cervepar', 'cerveza diosa', 'base'),
+    ('cervepar', 'diosa', 'base'),
+    ('brahma', 'brahma garcia', 'base'),
+    -- Telecos diferentes
+    ('tigo', 'tigo sports', 'base'),
+    ('personal', 'personal envios', 'base'),
+    ('telefonica', 'telefonica celular', 'base'),
+    -- Evitar confusiones genéricas
+    ('nacional', 'banco nacional de fomento', 'base'),
+    ('central', 'banco central', 'base'),
+    ('central', 'mercado central', 'base')
+ON CONFLICT (patron_query, patron_nombre) DO NOTHING;
+
+
+-- POBLACIÓN INICIAL: aliases automáticos de marcas conocidas (antes hardcodeados)
+-- ============================================================================
+-- Cada variante apunta al primer anunciante (por anunciante_id) cuyo nombre AdLens
+-- contiene la marca, igual que la búsqueda en Python que reemplaza, salvo los
+-- bloqueados por una regla negativa (ej: "tigo paraguay" nunca es "TIGO SPORTS")
+INSERT INTO dim_anunciante_aliases (anunciante_id, nombre_alias, fuente, confianza)
+SELECT
+    m.anunciante_id,
+    v.variante,
+    'aliases_automaticos',
+    85
+FROM (VALUES
+    ('cervepar', 'cervepar'),
+    ('pilsen', 'pilsen'),
+    ('brahma', 'brahma'),
+    ('telecel', 'telecel'),
+    ('banco familiar', 'banco familiar'),
+    ('distribuidora del paraguay', 'distribuidora del paraguay'),
+    ('distribuidora del paraguay', 'distribuidora paraguay'),
+    ('tigo', 'tigo paraguay'),
+    ('personal', 'personal'),
+    ('personal', 'telecom personal'),
+    ('telefonica', 'telefonica'),
+    ('unilever', 'unilever'),
+    ('nestle', 'nestle'),
+    ('nestle', 'nestlé'),
+    ('coca cola', 'coca cola'),
+    ('coca cola', 'coca-cola'),
+    ('banco nacional', 'banco nacional'),
+    ('banco continental', 'banco continental'),
+    ('carrefour', 'carrefour'),
+    ('superseis', 'superseis'),
+    ('superseis', 'super seis')
+) AS v(marca, variante)
+CROSS JOIN LATERAL (
+    SELECT p.anunciante_id
+    FROM dim_anunciante_perfil p
+    JOIN dim_anunciante d ON p.anunciante_id = d.anunciante_id
+    WHERE LOWER(p.nombre_anunciante) LIKE '%' || v.marca || '%'
+      AND NOT EXISTS (
+          SELECT 1 FROM dim_anunciante_alias_negativo n
+          WHERE v.variante LIKE '%' || n.patron_query || '%'
+            AND LOWER(p.nombre_anunciante) LIKE '%' || n.patron_nombre || '%'
+      )
+    ORDER BY p.anunciante_id
+    LIMIT 1
+) m
+ON CONFLICT (nombre_alias) DO NOTHING;
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Reglas negativas activas
+-- SELECT patron_query, STRING_AGG(patron_nombre, ' | ') FROM dim_anunciante_alias_negativo GROUP BY patron_query;
+
+-- Firma que usa matcher_aliases.py para detectar cambios (hot reload, solo sin escucha de NOTIFY)
+-- SELECT
+--     (SELECT md5(COALESCE(string_agg(a::TEXT, '|' ORDER BY alias_id), ''))
+--      FROM dim_anunciante_aliases a),
+--     (SELECT md5(COALESCE(string_agg(n::TEXT, '|' ORDER BY negativo_id), ''))
+--      FROM dim_anunciante_alias_negativo n);
@@ -0,0 +1,117 @@
+-- ============================================================================
+-- NOMBRES NORMALIZADOS - Columnas persistidas + índices btree
+-- "Nestlé Paraguay S.A.", "NESTLE PARAGUAY SA" y "nestle paraguay" comparten
+-- la misma clave: la resolución exacta pasa a ser un Index Scan en vez de
+-- UPPER(..) LIKE '%..%' sobre toda la tabla
+-- Requiere: 03_sistema_aliases.sql, 05_matcher_aliases.sql
+-- (volver a ejecutar si se recrea dim_anunciante_aliases con 03)
+-- ============================================================================
+
+
+-- FUNCIÓN: normalizar_nombre (misma salida que normalizacion.normalizar_nombre)
+-- ============================================================================
+-- 1. NFKD + quitar diacríticos (é → e, ñ → n)
+-- 2. minúsculas y espacios simples
+-- 3. sufijos societarios como palabra completa (s.a., s.a.e., s.a.e.c.a., srl, ltda)
+-- 4. puntuación a espacios y espacios simples
+-- IMMUTABLE: requisito para usarla en columnas generadas e índices
+CREATE OR REPLACE FUNCTION normalizar_nombre(p_nombre TEXT)
+RETURNS TEXT AS $$
+    SELECT BTRIM(REGEXP_REPLACE(
+        REGEXP_REPLACE(
+            REGEXP_REPLACE(
+                BTRIM(REGEXP_REPLACE(
+                    LOWER(REGEXP_REPLACE(NORMALIZE(p_nombre, NFKD), E'[\\u0300-\\u036f]', '', 'g')),
+                    '\s+', ' ', 'g'
+                )),
+                '(?<![a-z0-9_])(?:s\.? ?a\.? ?e\.? ?c\.? ?a|s\.? ?a\.? ?e|s\.? ?a|s\.? ?r\.? ?l|ltda|sociedad anonima)\.?(?![a-z0-9_])',
+                ' ', 'g'
+            ),
+            '[^a-z0-9_ ]', ' ', 'g'
+        ),
+        ' +', ' ', 'g'
+    ))
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+COMMENT ON FUNCTION normalizar_nombre IS
+'Clave canónica de un nombre: sin acentos, minúsculas, sin sufijos societarios ni puntuación.
+Debe coincidir con normalizar_nombre() de backend/normalizacion.py.';
+
+
+-- COLUMNAS GENERADAS: se recalculan solas en cada INSERT/UPDATE
+-- ============================================================================
+ALTER TABLE dim_anunciante
+    ADD COLUMN IF NOT EXISTS nombre_normalizado TEXT
+    GENERATED ALWAYS AS (normalizar_nombre(nombre_canonico)) STORED;
+
+ALTER TABLE dim_anunciante_aliases
+    ADD COLUMN IF NOT EXISTS nombre_normalizado TEXT
+    GENERATED ALWAYS AS (normalizar_nombre(nombre_alias)) STORED;
+
+ALTER TABLE dim_anunciante_perfil
+    ADD COLUMN IF NOT EXISTS nombre_normalizado TEXT
+    GENERATED ALWAYS AS (normalizar_nombre(nombre_anunciante)) STORED;
+
+ALTER TABLE dim_posicionamiento_dnit
+    ADD COLUMN IF NOT EXISTS nombre_normalizado TEXT
+    GENERATED ALWAYS AS (normalizar_nombre(razon_social)) STORED;
+
+
+-- ÍNDICES BTREE
+-- ============================================================================
+CREATE INDEX IF NOT EXISTS idx_anunciante_nombre_normalizado
+    ON dim_anunciante(nombre_normalizado);
+
+-- Incluye confianza para resolver "mejor alias" sin ir a la tabla
+CREATE INDEX IF NOT EXISTS idx_aliases_nombre_normalizado
+    ON dim_anunciante_aliases(nombre_normalizado, confianza DESC);
+
+CREATE INDEX IF NOT EXISTS idx_perfil_nombre_normalizado
+    ON dim_anunciante_perfil(nombre_normalizado);
+
+CREATE INDEX IF NOT EXISTS idx_dnit_nombre_normalizado
+    ON dim_posicionamiento_dnit(nombre_normalizado);
+
+
+-- FUNCIÓN: buscar_anunciante (búsqueda exacta por nombre normalizado)
+-- ============================================================================
+-- Misma firma que 03_sistema_aliases.sql; ahora "CERVEPAR S.A." encuentra el
+-- alias "cervepar" por índice
+CREATE OR REPLACE FUNCTION buscar_anunciante(p_nombre TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    v_anunciante_id INTEGER;
+BEGIN
+    SELECT anunciante_id INTO v_anunciante_id
+    FROM dim_anunciante_aliases
+    WHERE nombre_normalizado = normalizar_nombre(p_nombre)
+    ORDER BY confianza DESC, created_at DESC
+    LIMIT 1;
+
+    IF v_anunciante_id IS NULL THEN
+        SELECT anunciante_id INTO v_anunciante_id
+        FROM dim_anunciante
+        WHERE nombre_normalizado = normalizar_nombre(p_nombre)
+        ORDER BY anunciante_id
+        LIMIT 1;
+    END IF;
+
+    RETURN v_anunciante_id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION buscar_anunciante IS
+'Busca anunciante_id por nombre normalizado (aliases, luego nombre canónico). Prioriza por confianza.';
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Debe usar Index Scan sobre idx_anunciante_nombre_normalizado
+-- EXPLAIN ANALYZE SELECT anunciante_id FROM dim_anunciante
+-- WHERE nombre_normalizado = normalizar_nombre('Nestlé Paraguay S.A.');
+
+-- Nombres canónicos que colisionan al normalizar (candidatos a duplicados)
+-- SELECT nombre_normalizado, ARRAY_AGG(nombre_canonico) FROM dim_anunciante
+-- GROUP BY nombre_normalizado HAVING COUNT(*) > 1;
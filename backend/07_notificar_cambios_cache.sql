@@ -0,0 +1,69 @@
+-- ============================================================================
+-- NOTIFICACIÓN DE CAMBIOS - Canal LISTEN/NOTIFY para los caches en memoria
+-- Cada INSERT/UPDATE/DELETE/TRUNCATE sobre las tablas de nombres publica el
+-- nombre de la tabla en el canal 'jarvis_cache'; escucha_cache.py invalida
+-- solo los caches que dependen de esa tabla (índice, matcher, extractor,
+-- tablas dinámicas), sin TTL
+-- Requiere: 05_matcher_aliases.sql (y haber iniciado app.py una vez, que crea dynamic_tables)
+-- ============================================================================
+
+
+-- FUNCIÓN: notificar_cambio_cache (trigger por sentencia)
+-- ============================================================================
+-- pg_notify se entrega al hacer COMMIT y Postgres descarta notificaciones
+-- idénticas dentro de la misma transacción: una carga masiva genera un solo
+-- aviso por tabla
+CREATE OR REPLACE FUNCTION notificar_cambio_cache()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('jarvis_cache', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION notificar_cambio_cache IS
+'Publica el nombre de la tabla modificada en el canal jarvis_cache (ver backend/escucha_cache.py).';
+
+
+-- TRIGGERS
+-- ============================================================================
+DO $$
+DECLARE
+    v_tabla TEXT;
+BEGIN
+    FOREACH v_tabla IN ARRAY ARRAY[
+        'dim_anunciante',
+        'dim_anunciante_perfil',
+        'dim_anunciante_aliases',
+        'dim_anunciante_alias_negativo',
+        'dynamic_tables'
+    ]
+    LOOP
+        IF to_regclass(v_tabla) IS NULL THEN
+            RAISE NOTICE 'Tabla % no existe, se omite', v_tabla;
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_cache ON %I', v_tabla);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notificar_cache
+             AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+             FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_cache()',
+            v_tabla
+        );
+    END LOOP;
+END;
+$$;
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- En una sesión: LISTEN jarvis_cache;
+-- En otra:       UPDATE dim_anunciante_aliases SET confianza = confianza WHERE alias_id = 1;
+-- La primera recibe: Asynchronous notification "jarvis_cache" with payload "dim_anunciante_aliases"
+
+-- Triggers instalados
+-- SELECT event_object_table, trigger_name FROM information_schema.triggers
+-- WHERE trigger_name = 'trg_notificar_cache' GROUP BY 1, 2;
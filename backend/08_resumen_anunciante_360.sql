@@ -0,0 +1,168 @@
+-- ============================================================================
+-- RESUMEN 360° MATERIALIZADO - Una fila precalculada por anunciante
+-- Agregados ERP de fact_facturacion, perfil AdLens con las columnas numéricas
+-- ya convertidas y el mejor ranking DNIT; las consultas 360° leen una fila en
+-- lugar de agregar los hechos en cada request (ver backend/consulta_360.py)
+-- Se refresca al final de cada carga con refrescar_resumenes_jarvis()
+-- (backend/post_carga.py)
+-- Requiere: fact_facturacion, dim_anunciante_perfil y dim_posicionamiento_dnit cargadas
+-- ============================================================================
+
+
+-- FUNCIÓN: texto_a_numero
+-- ============================================================================
+-- Las columnas AdLens son texto ('-', '', '12.5'): NULL si no es un número,
+-- para que un valor sucio no haga fallar el refresco completo
+CREATE OR REPLACE FUNCTION texto_a_numero(p_valor TEXT)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT CASE
+        WHEN BTRIM(p_valor) ~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$'
+            THEN CAST(BTRIM(p_valor) AS DOUBLE PRECISION)
+    END;
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+COMMENT ON FUNCTION texto_a_numero IS
+'Convierte un texto a número; NULL si no es numérico (ej: "-" en columnas AdLens).';
+
+
+-- VISTA MATERIALIZADA: mv_anunciante_360
+-- ============================================================================
+DROP MATERIALIZED VIEW IF EXISTS mv_anunciante_360;
+
+CREATE MATERIALIZED VIEW mv_anunciante_360 AS
+WITH ids AS (
+    SELECT anunciante_id FROM dim_anunciante
+    UNION
+    SELECT anunciante_id FROM dim_anunciante_perfil WHERE anunciante_id IS NOT NULL
+    UNION
+    SELECT anunciante_id FROM fact_facturacion WHERE anunciante_id IS NOT NULL
+),
+erp AS (
+    SELECT
+        anunciante_id,
+        SUM(facturacion) as facturacion_total,
+        SUM(revenue) as revenue_total,
+        SUM(costo) as costo_total,
+        AVG(facturacion) as promedio_mensual,
+        COUNT(*) as registros,
+        MIN(fecha_fact) as primera_fecha,
+        MAX(fecha_fact) as ultima_fecha,
+        STRING_AGG(DISTINCT division, ', ') as divisiones,
+        STRING_AGG(DISTINCT arena, ', ') as arenas
+    FROM fact_facturacion
+    WHERE anunciante_id IS NOT NULL
+    GROUP BY anunciante_id
+),
+perfil AS (
+    -- Una fila por anunciante aunque el Excel AdLens traiga duplicados: sin id de carga
+    -- ni timestamp, se desempata por el contenido de la fila (la misma en cada refresco)
+    SELECT DISTINCT ON (anunciante_id) p.*
+    FROM dim_anunciante_perfil p
+    WHERE anunciante_id IS NOT NULL
+    ORDER BY anunciante_id, p::TEXT
+),
+dnit AS (
+    SELECT DISTINCT ON (anunciante_id)
+        anunciante_id,
+        ranking,
+        aporte_gs,
+        ingreso_estimado_gs,
+        razon_social
+    FROM dim_posicionamiento_dnit
+    WHERE anunciante_id IS NOT NULL
+    ORDER BY anunciante_id, ranking
+)
+SELECT
+    ids.anunciante_id,
+    a.nombre_canonico,
+
+    -- ERP
+    erp.facturacion_total,
+    erp.revenue_total,
+    erp.costo_total,
+    erp.promedio_mensual,
+    COALESCE(erp.registros, 0) as registros,
+    erp.primera_fecha,
+    erp.ultima_fecha,
+    erp.divisiones,
+    erp.arenas,
+
+    -- AdLens (texto original + versión numérica)
+    p.anunciante_id IS NOT NULL as tiene_perfil,
+    p.nombre_anunciante,
+    p.rubro_principal,
+    p.tamano_de_la_empresa_cantidad_de_empleados,
+    p.cluster,
+    p.tipo_de_cluster,
+    p.cultura,
+    p.ejecucion,
+    p.estructura,
+    p.competitividad,
+    p.puntaje_total,
+    texto_a_numero(CAST(p.cultura AS TEXT)) as cultura_num,
+    texto_a_numero(CAST(p.competitividad AS TEXT)) as competitividad_num,
+    texto_a_numero(CAST(p.puntaje_total AS TEXT)) as puntaje_total_num,
+    texto_a_numero(CAST(p.la_empresa_invierte_en_digital AS TEXT)) as digital_num,
+    texto_a_numero(CAST(p.inversion_en_tv_abierta_2024_en_miles_usd AS TEXT)) as inv_tv,
+    texto_a_numero(CAST(p.inversion_en_radio_2024_en_miles_usd AS TEXT)) as inv_radio,
+    texto_a_numero(CAST(p.inversion_en_cable_2024_en_miles_usd AS TEXT)) as inv_cable,
+    texto_a_numero(CAST(p.inversion_en_revistas_2024_en_miles_usd AS TEXT)) as inv_revistas,
+    texto_a_numero(CAST(p.inversion_en_diarios_2024_en_miles_usd AS TEXT)) as inv_diarios,
+    texto_a_numero(CAST(p.inversion_en_pdv_2024_en_miles_usd AS TEXT)) as inv_pdv,
+    p.central_de_medios,
+    p.tiene_la_empresa_departamento_de_marketing,
+    p.en_que_medios_invierte_la_empresa_principalmente,
+    p.la_empresa_invierte_en_digital,
+
+    -- DNIT
+    dnit.anunciante_id IS NOT NULL as tiene_dnit,
+    dnit.ranking,
+    dnit.aporte_gs,
+    dnit.ingreso_estimado_gs,
+    dnit.razon_social
+FROM ids
+LEFT JOIN dim_anunciante a ON a.anunciante_id = ids.anunciante_id
+LEFT JOIN erp ON erp.anunciante_id = ids.anunciante_id
+LEFT JOIN perfil p ON p.anunciante_id = ids.anunciante_id
+LEFT JOIN dnit ON dnit.anunciante_id = ids.anunciante_id;
+
+COMMENT ON MATERIALIZED VIEW mv_anunciante_360 IS
+'Fila 360° precalculada por anunciante (ERP + AdLens + DNIT). Se refresca con refrescar_resumenes_jarvis().';
+
+-- Índice único: requerido por REFRESH ... CONCURRENTLY y usado por = ANY(:ids)
+CREATE UNIQUE INDEX idx_mv_anunciante_360_id
+ON mv_anunciante_360(anunciante_id);
+
+-- Rankings por facturación (consulta_ranking_avanzado)
+CREATE INDEX idx_mv_anunciante_360_facturacion
+ON mv_anunciante_360(facturacion_total DESC NULLS LAST)
+WHERE tiene_perfil AND registros > 0;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis
+-- ============================================================================
+-- CONCURRENTLY: las consultas siguen leyendo la versión anterior mientras se
+-- recalcula; llamar al final de cada carga (post_carga.py)
+CREATE OR REPLACE FUNCTION refrescar_resumenes_jarvis()
+RETURNS VOID AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refrescar_resumenes_jarvis IS
+'Refresca los resúmenes materializados después de una carga ETL (ver backend/post_carga.py).';
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Refrescar después de una carga manual
+-- SELECT refrescar_resumenes_jarvis();
+
+-- La fila precalculada coincide con la agregación sobre los hechos
+-- SELECT r.anunciante_id, r.facturacion_total, SUM(f.facturacion)
+-- FROM mv_anunciante_360 r JOIN fact_facturacion f USING (anunciante_id)
+-- GROUP BY r.anunciante_id, r.facturacion_total
+-- HAVING r.facturacion_total IS DISTINCT FROM SUM(f.facturacion);
@@ -0,0 +1,73 @@
+-- ============================================================================
+-- DATA VERSION - Versión de los datos cargados
+-- Un contador que se incrementa en cada carga (refrescar_resumenes_jarvis(),
+-- llamado por post_carga.py al final de los ETL); cache_360.py guarda las
+-- filas 360° por (anunciante_id, data_version), así que se invalidan justo
+-- cuando cambian los datos y nunca entre cargas
+-- Requiere: 07_notificar_cambios_cache.sql, 08_resumen_anunciante_360.sql
+-- ============================================================================
+
+
+-- TABLA: jarvis_data_version (una sola fila)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS jarvis_data_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    data_version BIGINT NOT NULL DEFAULT 1,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO jarvis_data_version (id) VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+COMMENT ON TABLE jarvis_data_version IS
+'Versión de los datos de facturación/AdLens/DNIT: cambia en cada carga (ver backend/cache_360.py).';
+
+
+-- FUNCIÓN: incrementar_data_version
+-- ============================================================================
+CREATE OR REPLACE FUNCTION incrementar_data_version()
+RETURNS BIGINT AS $$
+    UPDATE jarvis_data_version
+    SET data_version = data_version + 1,
+        actualizado_en = NOW()
+    WHERE id = 1
+    RETURNING data_version;
+$$ LANGUAGE sql;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis (reemplaza la de 08)
+-- ============================================================================
+-- Resumen y versión en la misma transacción: quien ve la versión nueva ve
+-- también el resumen nuevo. Devuelve la versión nueva
+DROP FUNCTION IF EXISTS refrescar_resumenes_jarvis();
+
+CREATE FUNCTION refrescar_resumenes_jarvis()
+RETURNS BIGINT AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+    RETURN incrementar_data_version();
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION refrescar_resumenes_jarvis IS
+'Refresca los resúmenes materializados e incrementa data_version después de una carga ETL (ver backend/post_carga.py).';
+
+
+-- TRIGGER: avisar a los procesos (canal jarvis_cache de 07)
+-- ============================================================================
+DROP TRIGGER IF EXISTS trg_notificar_cache ON jarvis_data_version;
+
+CREATE TRIGGER trg_notificar_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON jarvis_data_version
+FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_cache();
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Versión actual
+-- SELECT data_version, actualizado_en FROM jarvis_data_version;
+
+-- Carga hecha por SQL a mano: refrescar e invalidar los caches de todos los procesos
+-- SELECT refrescar_resumenes_jarvis();
@@ -0,0 +1,98 @@
+-- ============================================================================
+-- FACTURACIÓN MENSUAL - Rollup de fact_facturacion por mes
+-- (anunciante_id, anio, mes, division, arena) → facturación, revenue, costo y
+-- cantidad de facturas; evolucion_mensual y las preguntas de tendencia / año
+-- contra año leen unas decenas de filas por cliente en lugar de las facturas
+-- Se reconstruye en cada carga dentro de refrescar_resumenes_jarvis()
+-- (backend/post_carga.py)
+-- Requiere: 09_data_version.sql
+-- ============================================================================
+
+
+-- TABLA: fact_facturacion_mensual
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS fact_facturacion_mensual (
+    anunciante_id INTEGER NOT NULL,
+    anio INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    division TEXT,
+    arena TEXT,
+    facturacion NUMERIC NOT NULL DEFAULT 0,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    costo NUMERIC NOT NULL DEFAULT 0,
+    facturas INTEGER NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE fact_facturacion_mensual IS
+'Rollup mensual de fact_facturacion por anunciante, división y arena. Se reconstruye con refrescar_resumenes_jarvis().';
+
+-- Una fila por combinación (división / arena vacías cuentan como una sola)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_facturacion_mensual_clave
+ON fact_facturacion_mensual(anunciante_id, anio, mes, COALESCE(division, ''), COALESCE(arena, ''));
+
+
+-- FUNCIÓN: reconstruir_facturacion_mensual
+-- ============================================================================
+-- DELETE + INSERT en vez de TRUNCATE: las consultas siguen leyendo el rollup
+-- anterior hasta el COMMIT de la carga
+CREATE OR REPLACE FUNCTION reconstruir_facturacion_mensual()
+RETURNS INTEGER AS $$
+DECLARE
+    v_filas INTEGER;
+BEGIN
+    DELETE FROM fact_facturacion_mensual;
+
+    INSERT INTO fact_facturacion_mensual (anunciante_id, anio, mes, division, arena,
+                                          facturacion, revenue, costo, facturas)
+    SELECT
+        anunciante_id,
+        COALESCE(anio, EXTRACT(YEAR FROM fecha_fact)::INTEGER),
+        COALESCE(mes, EXTRACT(MONTH FROM fecha_fact)::INTEGER),
+        NULLIF(division, ''),
+        NULLIF(arena, ''),
+        COALESCE(SUM(facturacion), 0),
+        COALESCE(SUM(revenue), 0),
+        COALESCE(SUM(costo), 0),
+        COUNT(*)
+    FROM fact_facturacion
+    WHERE anunciante_id IS NOT NULL
+      AND COALESCE(anio, EXTRACT(YEAR FROM fecha_fact)) IS NOT NULL
+      AND COALESCE(mes, EXTRACT(MONTH FROM fecha_fact)) IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5;
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+    RETURN v_filas;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis (reemplaza la de 09)
+-- ============================================================================
+CREATE OR REPLACE FUNCTION refrescar_resumenes_jarvis()
+RETURNS BIGINT AS $$
+BEGIN
+    PERFORM reconstruir_facturacion_mensual();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+    RETURN incrementar_data_version();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- CARGA INICIAL
+-- ============================================================================
+SELECT reconstruir_facturacion_mensual();
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- El rollup suma lo mismo que las facturas con anunciante y período
+-- SELECT
+--     (SELECT SUM(facturacion) FROM fact_facturacion
+--      WHERE anunciante_id IS NOT NULL AND COALESCE(anio, EXTRACT(YEAR FROM fecha_fact)) IS NOT NULL),
+--     (SELECT SUM(facturacion) FROM fact_facturacion_mensual);
+
+-- Evolución mensual de un cliente
+-- SELECT anio, mes, SUM(facturacion) FROM fact_facturacion_mensual
+-- WHERE anunciante_id = 1 GROUP BY anio, mes ORDER BY anio, mes;
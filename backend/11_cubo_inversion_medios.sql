@@ -0,0 +1,78 @@
+-- ============================================================================
+-- CUBO DE INVERSIÓN EN MEDIOS - fact_inversion_medios agregada
+-- (anunciante_id, anio, mes, medio, vehiculo) → montos y registros; el desglose
+-- por medio, la evolución mensual de inversión y "cuánto invirtió en TV" leen
+-- filas del tamaño del resultado en vez de las filas crudas de AdLens
+-- Se reconstruye al final de 02_cargar_inversion_posicionamiento.py
+-- ============================================================================
+
+
+-- TABLA: fact_inversion_medios_cubo
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS fact_inversion_medios_cubo (
+    anunciante_id INTEGER NOT NULL,
+    anio INTEGER,
+    mes INTEGER,
+    medio TEXT,
+    vehiculo TEXT,
+    monto_usd NUMERIC NOT NULL DEFAULT 0,
+    monto_gs NUMERIC NOT NULL DEFAULT 0,
+    registros INTEGER NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE fact_inversion_medios_cubo IS
+'Inversión AdLens agregada por anunciante, mes, medio y vehículo. Se reconstruye con reconstruir_cubo_inversion_medios().';
+
+CREATE INDEX IF NOT EXISTS idx_inversion_cubo_anunciante
+ON fact_inversion_medios_cubo(anunciante_id, medio);
+
+
+-- FUNCIÓN: reconstruir_cubo_inversion_medios
+-- ============================================================================
+-- DELETE + INSERT: las consultas leen el cubo anterior hasta el COMMIT
+-- Las filas sin anunciante_id quedan fuera (se buscan por nombre en los hechos)
+CREATE OR REPLACE FUNCTION reconstruir_cubo_inversion_medios()
+RETURNS INTEGER AS $$
+DECLARE
+    v_filas INTEGER;
+BEGIN
+    DELETE FROM fact_inversion_medios_cubo;
+
+    INSERT INTO fact_inversion_medios_cubo (anunciante_id, anio, mes, medio, vehiculo,
+                                            monto_usd, monto_gs, registros)
+    SELECT
+        anunciante_id,
+        anio,
+        mes,
+        medio,
+        vehiculo,
+        COALESCE(SUM(monto_usd), 0),
+        COALESCE(SUM(monto_gs), 0),
+        COUNT(*)
+    FROM fact_inversion_medios
+    WHERE anunciante_id IS NOT NULL
+    GROUP BY anunciante_id, anio, mes, medio, vehiculo;
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+    RETURN v_filas;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- CARGA INICIAL
+-- ============================================================================
+SELECT reconstruir_cubo_inversion_medios();
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- El cubo suma lo mismo que los hechos con anunciante
+-- SELECT
+--     (SELECT SUM(monto_usd) FROM fact_inversion_medios WHERE anunciante_id IS NOT NULL),
+--     (SELECT SUM(monto_usd) FROM fact_inversion_medios_cubo);
+
+-- Inversión por medio de un anunciante
+-- SELECT medio, SUM(monto_usd) FROM fact_inversion_medios_cubo
+-- WHERE anunciante_id = 1 GROUP BY medio ORDER BY 2 DESC;
@@ -0,0 +1,276 @@
+-- ============================================================================
+-- PERFIL ADLENS TIPADO - Proyección numérica de dim_anunciante_perfil
+-- El Excel AdLens se carga como texto ('-', '', '0.85', 'Sí'); esta tabla
+-- guarda una fila por anunciante con NUMERIC / BOOLEAN y NULL donde no hay
+-- dato, así los promedios y sumas por cluster / rubro no convierten texto en
+-- cada consulta y el planner tiene estadísticas de las columnas numéricas
+-- Se reconstruye en cada carga dentro de refrescar_resumenes_jarvis()
+-- (backend/post_carga.py)
+-- Requiere: 08_resumen_anunciante_360.sql, 10_facturacion_mensual.sql
+-- ============================================================================
+
+
+-- FUNCIÓN: texto_a_booleano
+-- ============================================================================
+-- Respuestas Sí/No del formulario AdLens; NULL si no es una respuesta reconocida
+CREATE OR REPLACE FUNCTION texto_a_booleano(p_valor TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT CASE LOWER(BTRIM(p_valor))
+        WHEN 'si' THEN TRUE
+        WHEN 'sí' THEN TRUE
+        WHEN 's' THEN TRUE
+        WHEN 'yes' THEN TRUE
+        WHEN 'true' THEN TRUE
+        WHEN '1' THEN TRUE
+        WHEN 'no' THEN FALSE
+        WHEN 'n' THEN FALSE
+        WHEN 'false' THEN FALSE
+        WHEN '0' THEN FALSE
+    END;
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+COMMENT ON FUNCTION texto_a_booleano IS
+'Convierte una respuesta Sí/No a booleano; NULL si no se reconoce (ej: "-" en columnas AdLens).';
+
+
+-- TABLA: dim_anunciante_perfil_tipado
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS dim_anunciante_perfil_tipado (
+    anunciante_id INTEGER PRIMARY KEY,
+    nombre_anunciante TEXT,
+    rubro_principal TEXT,
+    cluster TEXT,
+    tipo_de_cluster TEXT,
+
+    -- Puntajes AdLens
+    cultura NUMERIC,
+    ejecucion NUMERIC,
+    estructura NUMERIC,
+    competitividad NUMERIC,
+    puntaje_total NUMERIC,
+    digital NUMERIC,
+
+    -- Inversión 2024 en miles de USD
+    inv_tv NUMERIC,
+    inv_radio NUMERIC,
+    inv_cable NUMERIC,
+    inv_revistas NUMERIC,
+    inv_diarios NUMERIC,
+    inv_pdv NUMERIC,
+
+    tiene_depto_marketing BOOLEAN
+);
+
+COMMENT ON TABLE dim_anunciante_perfil_tipado IS
+'dim_anunciante_perfil con columnas numéricas y booleanas (una fila por anunciante). Se reconstruye con refrescar_resumenes_jarvis().';
+
+CREATE INDEX IF NOT EXISTS idx_perfil_tipado_cluster
+ON dim_anunciante_perfil_tipado(cluster)
+WHERE cluster IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_perfil_tipado_rubro
+ON dim_anunciante_perfil_tipado(rubro_principal)
+WHERE rubro_principal IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_perfil_tipado_competitividad
+ON dim_anunciante_perfil_tipado(competitividad DESC NULLS LAST);
+
+
+-- FUNCIÓN: reconstruir_perfil_tipado
+-- ============================================================================
+-- DELETE + INSERT: las consultas leen la proyección anterior hasta el COMMIT
+-- Texto vacío cuenta como NULL también en cluster / rubro
+CREATE OR REPLACE FUNCTION reconstruir_perfil_tipado()
+RETURNS INTEGER AS $$
+DECLARE
+    v_filas INTEGER;
+BEGIN
+    DELETE FROM dim_anunciante_perfil_tipado;
+
+    INSERT INTO dim_anunciante_perfil_tipado
+    SELECT DISTINCT ON (anunciante_id)
+        anunciante_id,
+        NULLIF(BTRIM(nombre_anunciante), ''),
+        NULLIF(BTRIM(rubro_principal), ''),
+        NULLIF(BTRIM(cluster), ''),
+        NULLIF(BTRIM(tipo_de_cluster), ''),
+        texto_a_numero(CAST(cultura AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(ejecucion AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(estructura AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(competitividad AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(puntaje_total AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(la_empresa_invierte_en_digital AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(inversion_en_tv_abierta_2024_en_miles_usd AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(inversion_en_radio_2024_en_miles_usd AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(inversion_en_cable_2024_en_miles_usd AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(inversion_en_revistas_2024_en_miles_usd AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(inversion_en_diarios_2024_en_miles_usd AS TEXT))::NUMERIC,
+        texto_a_numero(CAST(inversion_en_pdv_2024_en_miles_usd AS TEXT))::NUMERIC,
+        texto_a_booleano(CAST(tiene_la_empresa_departamento_de_marketing AS TEXT))
+    FROM dim_anunciante_perfil p
+    WHERE anunciante_id IS NOT NULL
+    -- Duplicados del Excel: dim_anunciante_perfil no tiene id de carga ni timestamp, así que se
+    -- desempata por el contenido de la fila (la misma en cada reconstrucción, sin importar el
+    -- orden físico); mv_anunciante_360 usa el mismo orden
+    ORDER BY anunciante_id, p::TEXT;
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+
+    -- Estadísticas al día para los promedios por cluster / rubro
+    ANALYZE dim_anunciante_perfil_tipado;
+
+    RETURN v_filas;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- CARGA INICIAL
+-- ============================================================================
+SELECT reconstruir_perfil_tipado();
+
+
+-- VISTA MATERIALIZADA: mv_anunciante_360 (reemplaza la de 08)
+-- ============================================================================
+-- Mismas columnas; los *_num y inv_* salen de la tabla tipada en vez de
+-- convertirse en el refresco
+DROP MATERIALIZED VIEW IF EXISTS mv_anunciante_360;
+
+CREATE MATERIALIZED VIEW mv_anunciante_360 AS
+WITH ids AS (
+    SELECT anunciante_id FROM dim_anunciante
+    UNION
+    SELECT anunciante_id FROM dim_anunciante_perfil_tipado
+    UNION
+    SELECT anunciante_id FROM fact_facturacion WHERE anunciante_id IS NOT NULL
+),
+erp AS (
+    SELECT
+        anunciante_id,
+        SUM(facturacion) as facturacion_total,
+        SUM(revenue) as revenue_total,
+        SUM(costo) as costo_total,
+        AVG(facturacion) as promedio_mensual,
+        COUNT(*) as registros,
+        MIN(fecha_fact) as primera_fecha,
+        MAX(fecha_fact) as ultima_fecha,
+        STRING_AGG(DISTINCT division, ', ') as divisiones,
+        STRING_AGG(DISTINCT arena, ', ') as arenas
+    FROM fact_facturacion
+    WHERE anunciante_id IS NOT NULL
+    GROUP BY anunciante_id
+),
+perfil AS (
+    -- Texto original para mostrar (misma fila que dim_anunciante_perfil_tipado)
+    SELECT DISTINCT ON (anunciante_id) p.*
+    FROM dim_anunciante_perfil p
+    WHERE anunciante_id IS NOT NULL
+    ORDER BY anunciante_id, p::TEXT
+),
+dnit AS (
+    SELECT DISTINCT ON (anunciante_id)
+        anunciante_id,
+        ranking,
+        aporte_gs,
+        ingreso_estimado_gs,
+        razon_social
+    FROM dim_posicionamiento_dnit
+    WHERE anunciante_id IS NOT NULL
+    ORDER BY anunciante_id, ranking
+)
+SELECT
+    ids.anunciante_id,
+    a.nombre_canonico,
+
+    -- ERP
+    erp.facturacion_total,
+    erp.revenue_total,
+    erp.costo_total,
+    erp.promedio_mensual,
+    COALESCE(erp.registros, 0) as registros,
+    erp.primera_fecha,
+    erp.ultima_fecha,
+    erp.divisiones,
+    erp.arenas,
+
+    -- AdLens (texto original + versión tipada)
+    t.anunciante_id IS NOT NULL as tiene_perfil,
+    p.nombre_anunciante,
+    p.rubro_principal,
+    p.tamano_de_la_empresa_cantidad_de_empleados,
+    p.cluster,
+    p.tipo_de_cluster,
+    p.cultura,
+    p.ejecucion,
+    p.estructura,
+    p.competitividad,
+    p.puntaje_total,
+    t.cultura::DOUBLE PRECISION as cultura_num,
+    t.competitividad::DOUBLE PRECISION as competitividad_num,
+    t.puntaje_total::DOUBLE PRECISION as puntaje_total_num,
+    t.digital::DOUBLE PRECISION as digital_num,
+    t.inv_tv::DOUBLE PRECISION as inv_tv,
+    t.inv_radio::DOUBLE PRECISION as inv_radio,
+    t.inv_cable::DOUBLE PRECISION as inv_cable,
+    t.inv_revistas::DOUBLE PRECISION as inv_revistas,
+    t.inv_diarios::DOUBLE PRECISION as inv_diarios,
+    t.inv_pdv::DOUBLE PRECISION as inv_pdv,
+    t.tiene_depto_marketing,
+    p.central_de_medios,
+    p.tiene_la_empresa_departamento_de_marketing,
+    p.en_que_medios_invierte_la_empresa_principalmente,
+    p.la_empresa_invierte_en_digital,
+
+    -- DNIT
+    dnit.anunciante_id IS NOT NULL as tiene_dnit,
+    dnit.ranking,
+    dnit.aporte_gs,
+    dnit.ingreso_estimado_gs,
+    dnit.razon_social
+FROM ids
+LEFT JOIN dim_anunciante a ON a.anunciante_id = ids.anunciante_id
+LEFT JOIN erp ON erp.anunciante_id = ids.anunciante_id
+LEFT JOIN dim_anunciante_perfil_tipado t ON t.anunciante_id = ids.anunciante_id
+LEFT JOIN perfil p ON p.anunciante_id = ids.anunciante_id
+LEFT JOIN dnit ON dnit.anunciante_id = ids.anunciante_id;
+
+COMMENT ON MATERIALIZED VIEW mv_anunciante_360 IS
+'Fila 360° precalculada por anunciante (ERP + AdLens + DNIT). Se refresca con refrescar_resumenes_jarvis().';
+
+CREATE UNIQUE INDEX idx_mv_anunciante_360_id
+ON mv_anunciante_360(anunciante_id);
+
+CREATE INDEX idx_mv_anunciante_360_facturacion
+ON mv_anunciante_360(facturacion_total DESC NULLS LAST)
+WHERE tiene_perfil AND registros > 0;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis (reemplaza la de 10)
+-- ============================================================================
+-- La tabla tipada antes del REFRESH: la vista materializada lee de ella
+CREATE OR REPLACE FUNCTION refrescar_resumenes_jarvis()
+RETURNS BIGINT AS $$
+BEGIN
+    PERFORM reconstruir_perfil_tipado();
+    PERFORM reconstruir_facturacion_mensual();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+    RETURN incrementar_data_version();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Valores de texto que no se pudieron convertir (revisar el Excel AdLens)
+-- SELECT p.competitividad, COUNT(*)
+-- FROM dim_anunciante_perfil p
+-- JOIN dim_anunciante_perfil_tipado t USING (anunciante_id)
+-- WHERE t.competitividad IS NULL AND BTRIM(COALESCE(p.competitividad, '')) NOT IN ('', '-')
+-- GROUP BY 1 ORDER BY 2 DESC;
+
+-- Promedios por cluster sin conversiones
+-- SELECT cluster, COUNT(*), AVG(competitividad), AVG(puntaje_total), SUM(inv_tv)
+-- FROM dim_anunciante_perfil_tipado
+-- WHERE cluster IS NOT NULL
+-- GROUP BY cluster ORDER BY 2 DESC;
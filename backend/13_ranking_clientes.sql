@@ -0,0 +1,182 @@
+-- ============================================================================
+-- RANKING DE CLIENTES PRECALCULADO - Top N por facturación en cada corte
+-- Una fila por (corte, cliente) con posición (DENSE_RANK), market share y share
+-- acumulado; los cortes son el total, año, división, arena, cluster y año ×
+-- división / arena / cluster. "Top 10 de 2025" o "top de la arena X" leen N
+-- filas por índice en lugar de agrupar fact_facturacion en cada request
+-- (ver backend/ranking_clientes.py)
+-- Se reconstruye en cada carga dentro de refrescar_resumenes_jarvis()
+-- Requiere: 10_facturacion_mensual.sql, 12_perfil_tipado.sql
+-- ============================================================================
+
+
+-- TABLA: ranking_clientes
+-- ============================================================================
+-- Las dimensiones que no forman parte del corte quedan en NULL
+-- Cliente = anunciante (nombre canónico) o, sin anunciante_id, el cliente_original del ERP;
+-- un anunciante sin nombre canónico ni cliente_original queda como 'ANUNCIANTE <id>'
+CREATE TABLE IF NOT EXISTS ranking_clientes (
+    corte TEXT NOT NULL,
+    anio INTEGER,
+    division TEXT,
+    arena TEXT,
+    cluster TEXT,
+    anunciante_id INTEGER,
+    cliente TEXT NOT NULL,
+    facturacion NUMERIC NOT NULL DEFAULT 0,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    registros INTEGER NOT NULL DEFAULT 0,
+    posicion INTEGER NOT NULL,
+    market_share NUMERIC,
+    share_acumulado NUMERIC
+);
+
+COMMENT ON TABLE ranking_clientes IS
+'Ranking de clientes por facturación en cada corte (total, año, división, arena, cluster). Se reconstruye con refrescar_resumenes_jarvis().';
+
+-- Top N de un corte: las consultas usan las mismas expresiones COALESCE
+CREATE INDEX IF NOT EXISTS idx_ranking_clientes_corte
+ON ranking_clientes(corte, COALESCE(anio, 0), COALESCE(division, ''), COALESCE(arena, ''),
+                    COALESCE(cluster, ''), posicion);
+
+CREATE INDEX IF NOT EXISTS idx_ranking_clientes_anunciante
+ON ranking_clientes(anunciante_id)
+WHERE anunciante_id IS NOT NULL;
+
+
+-- FUNCIÓN: reconstruir_ranking_clientes
+-- ============================================================================
+-- DELETE + INSERT: las consultas leen el ranking anterior hasta el COMMIT
+-- El market share se calcula sobre toda la facturación del corte (también la
+-- que no tiene cliente identificado), igual que totales_mercado.py
+CREATE OR REPLACE FUNCTION reconstruir_ranking_clientes()
+RETURNS INTEGER AS $$
+DECLARE
+    v_filas INTEGER;
+BEGIN
+    DELETE FROM ranking_clientes;
+
+    INSERT INTO ranking_clientes (corte, anio, division, arena, cluster, anunciante_id, cliente,
+                                  facturacion, revenue, registros, posicion, market_share, share_acumulado)
+    WITH base AS (
+        SELECT
+            f.anunciante_id,
+            COALESCE(a.nombre_canonico, NULLIF(BTRIM(f.cliente_original), ''), 'ANUNCIANTE ' || f.anunciante_id) as cliente,
+            CASE
+                WHEN f.anunciante_id IS NOT NULL THEN 'a' || f.anunciante_id
+                ELSE 'c' || NULLIF(BTRIM(f.cliente_original), '')
+            END as clave,
+            COALESCE(f.anio, EXTRACT(YEAR FROM f.fecha_fact)::INTEGER) as anio,
+            NULLIF(f.division, '') as division,
+            NULLIF(f.arena, '') as arena,
+            t.cluster,
+            f.facturacion,
+            f.revenue
+        FROM fact_facturacion f
+        LEFT JOIN dim_anunciante a ON a.anunciante_id = f.anunciante_id
+        LEFT JOIN dim_anunciante_perfil_tipado t ON t.anunciante_id = f.anunciante_id
+    ),
+    agregado AS (
+        SELECT
+            COALESCE(NULLIF(CONCAT_WS('_',
+                CASE WHEN GROUPING(anio) = 0 THEN 'anio' END,
+                CASE WHEN GROUPING(division) = 0 THEN 'division' END,
+                CASE WHEN GROUPING(arena) = 0 THEN 'arena' END,
+                CASE WHEN GROUPING(cluster) = 0 THEN 'cluster' END
+            ), ''), 'total') as corte,
+            anio,
+            division,
+            arena,
+            cluster,
+            clave,
+            MAX(anunciante_id) as anunciante_id,
+            MIN(cliente) as cliente,
+            COALESCE(SUM(facturacion), 0) as facturacion,
+            COALESCE(SUM(revenue), 0) as revenue,
+            COUNT(*) as registros
+        FROM base
+        GROUP BY clave, GROUPING SETS (
+            (), (anio), (division), (arena), (cluster),
+            (anio, division), (anio, arena), (anio, cluster)
+        )
+    ),
+    con_total AS (
+        SELECT
+            agregado.*,
+            SUM(facturacion) OVER (PARTITION BY corte, anio, division, arena, cluster) as total_corte
+        FROM agregado
+    ),
+    rankeado AS (
+        SELECT
+            con_total.*,
+            DENSE_RANK() OVER w_corte as posicion,
+            SUM(facturacion) OVER (w_corte ROWS UNBOUNDED PRECEDING) as facturacion_acumulada
+        FROM con_total
+        WHERE clave IS NOT NULL
+        WINDOW w_corte AS (PARTITION BY corte, anio, division, arena, cluster
+                           ORDER BY facturacion DESC, cliente)
+    )
+    SELECT
+        corte,
+        anio,
+        division,
+        arena,
+        cluster,
+        anunciante_id,
+        cliente,
+        facturacion,
+        revenue,
+        registros,
+        posicion,
+        facturacion * 100.0 / NULLIF(total_corte, 0),
+        facturacion_acumulada * 100.0 / NULLIF(total_corte, 0)
+    FROM rankeado
+    -- Un corte por división no tiene grupo "sin división"
+    WHERE (corte NOT LIKE '%anio%' OR anio IS NOT NULL)
+      AND (corte NOT LIKE '%division%' OR division IS NOT NULL)
+      AND (corte NOT LIKE '%arena%' OR arena IS NOT NULL)
+      AND (corte NOT LIKE '%cluster%' OR cluster IS NOT NULL);
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+
+    ANALYZE ranking_clientes;
+
+    RETURN v_filas;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis (reemplaza la de 12)
+-- ============================================================================
+CREATE OR REPLACE FUNCTION refrescar_resumenes_jarvis()
+RETURNS BIGINT AS $$
+BEGIN
+    PERFORM reconstruir_perfil_tipado();
+    PERFORM reconstruir_facturacion_mensual();
+    PERFORM reconstruir_ranking_clientes();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+    RETURN incrementar_data_version();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- CARGA INICIAL
+-- ============================================================================
+SELECT reconstruir_ranking_clientes();
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Top 10 general
+-- SELECT posicion, cliente, facturacion, ROUND(market_share, 2), ROUND(share_acumulado, 2)
+-- FROM ranking_clientes
+-- WHERE corte = 'total' AND COALESCE(anio, 0) = 0 AND COALESCE(division, '') = ''
+--   AND COALESCE(arena, '') = '' AND COALESCE(cluster, '') = ''
+-- ORDER BY posicion LIMIT 10;
+
+-- Cada corte suma el 100% (menos la facturación sin cliente)
+-- SELECT corte, anio, division, arena, cluster, MAX(share_acumulado)
+-- FROM ranking_clientes
+-- GROUP BY 1, 2, 3, 4, 5 ORDER BY 6 LIMIT 20;
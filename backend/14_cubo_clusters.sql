@@ -0,0 +1,169 @@
+-- ============================================================================
+-- CUBO DE CLUSTERS - Métricas AdLens por cluster × año × medio
+-- Empresas, facturación, competitividad / puntaje promedio e inversión por
+-- medio de cada cluster, calculados una vez por carga a partir de las tablas
+-- tipadas y agregadas (perfil tipado, rollup mensual y cubo de inversión):
+-- el análisis por clusters lee unas pocas filas por índice y no crece con
+-- fact_facturacion. Cada empresa cuenta una sola vez (el JOIN perfil ×
+-- facturas multiplicaba empresas e inversiones por la cantidad de facturas)
+-- Se reconstruye en cada carga dentro de refrescar_resumenes_jarvis()
+-- Requiere: 10_facturacion_mensual.sql, 11_cubo_inversion_medios.sql,
+--           12_perfil_tipado.sql, 13_ranking_clientes.sql
+-- ============================================================================
+
+
+-- TABLA: cubo_clusters
+-- ============================================================================
+-- anio NULL = todos los años; medio NULL = todos los medios
+-- Las métricas de perfil (empresas, promedios, inversión AdLens 2024) son del
+-- cluster completo y se repiten en cada fila
+CREATE TABLE IF NOT EXISTS cubo_clusters (
+    cluster TEXT NOT NULL,
+    anio INTEGER,
+    medio TEXT,
+
+    -- Perfil AdLens del cluster
+    empresas INTEGER NOT NULL DEFAULT 0,
+    competitividad_promedio NUMERIC,
+    puntaje_promedio NUMERIC,
+    inversion_tv_perfil NUMERIC NOT NULL DEFAULT 0,
+    inversion_radio_perfil NUMERIC NOT NULL DEFAULT 0,
+    inversion_cable_perfil NUMERIC NOT NULL DEFAULT 0,
+
+    -- Facturación ERP (solo en filas sin medio)
+    empresas_con_facturacion INTEGER NOT NULL DEFAULT 0,
+    facturacion NUMERIC NOT NULL DEFAULT 0,
+    facturas INTEGER NOT NULL DEFAULT 0,
+
+    -- Inversión en medios (fact_inversion_medios_cubo)
+    empresas_con_inversion INTEGER NOT NULL DEFAULT 0,
+    inversion_usd NUMERIC NOT NULL DEFAULT 0
+);
+
+COMMENT ON TABLE cubo_clusters IS
+'Métricas por cluster, año y medio (anio / medio NULL = todos). Se reconstruye con refrescar_resumenes_jarvis().';
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cubo_clusters_clave
+ON cubo_clusters(COALESCE(anio, 0), COALESCE(medio, ''), cluster);
+
+
+-- FUNCIÓN: reconstruir_cubo_clusters
+-- ============================================================================
+CREATE OR REPLACE FUNCTION reconstruir_cubo_clusters()
+RETURNS INTEGER AS $$
+DECLARE
+    v_filas INTEGER;
+BEGIN
+    DELETE FROM cubo_clusters;
+
+    INSERT INTO cubo_clusters
+    WITH perfil AS (
+        SELECT anunciante_id, cluster, competitividad, puntaje_total, inv_tv, inv_radio, inv_cable
+        FROM dim_anunciante_perfil_tipado
+        WHERE cluster IS NOT NULL
+    ),
+    clusters AS (
+        SELECT
+            cluster,
+            COUNT(*) as empresas,
+            AVG(competitividad) as competitividad_promedio,
+            AVG(puntaje_total) as puntaje_promedio,
+            COALESCE(SUM(inv_tv), 0) as inversion_tv_perfil,
+            COALESCE(SUM(inv_radio), 0) as inversion_radio_perfil,
+            COALESCE(SUM(inv_cable), 0) as inversion_cable_perfil
+        FROM perfil
+        GROUP BY cluster
+    ),
+    hechos AS (
+        -- Una fila vacía por cluster para que aparezca aunque no tenga hechos
+        SELECT cluster, NULL::INTEGER as anio, NULL::TEXT as medio, NULL::INTEGER as anunciante_id,
+               NULL::TEXT as tipo, 0::NUMERIC as facturacion, 0 as facturas, 0::NUMERIC as inversion_usd
+        FROM clusters
+        UNION ALL
+        SELECT p.cluster, m.anio, NULL, m.anunciante_id, 'facturacion', m.facturacion, m.facturas, 0
+        FROM fact_facturacion_mensual m
+        JOIN perfil p ON p.anunciante_id = m.anunciante_id
+        UNION ALL
+        SELECT p.cluster, i.anio, i.medio, i.anunciante_id, 'inversion', 0, 0, i.monto_usd
+        FROM fact_inversion_medios_cubo i
+        JOIN perfil p ON p.anunciante_id = i.anunciante_id
+    ),
+    agregado AS (
+        SELECT
+            cluster,
+            anio,
+            medio,
+            GROUPING(anio) as todos_anios,
+            GROUPING(medio) as todos_medios,
+            COUNT(DISTINCT anunciante_id) FILTER (WHERE tipo = 'facturacion') as empresas_con_facturacion,
+            COALESCE(SUM(facturacion) FILTER (WHERE tipo = 'facturacion'), 0) as facturacion,
+            COALESCE(SUM(facturas) FILTER (WHERE tipo = 'facturacion'), 0) as facturas,
+            COUNT(DISTINCT anunciante_id) FILTER (WHERE tipo = 'inversion') as empresas_con_inversion,
+            COALESCE(SUM(inversion_usd) FILTER (WHERE tipo = 'inversion'), 0) as inversion_usd
+        FROM hechos
+        GROUP BY cluster, GROUPING SETS ((), (anio), (medio), (anio, medio))
+    )
+    SELECT
+        a.cluster,
+        a.anio,
+        a.medio,
+        c.empresas,
+        c.competitividad_promedio,
+        c.puntaje_promedio,
+        c.inversion_tv_perfil,
+        c.inversion_radio_perfil,
+        c.inversion_cable_perfil,
+        -- La facturación no tiene medio
+        CASE WHEN a.todos_medios = 1 THEN a.empresas_con_facturacion ELSE 0 END,
+        CASE WHEN a.todos_medios = 1 THEN a.facturacion ELSE 0 END,
+        CASE WHEN a.todos_medios = 1 THEN a.facturas ELSE 0 END,
+        a.empresas_con_inversion,
+        a.inversion_usd
+    FROM agregado a
+    JOIN clusters c ON c.cluster = a.cluster
+    -- Un corte por año / medio no tiene grupo "sin año" / "sin medio"
+    WHERE (a.todos_anios = 1 OR a.anio IS NOT NULL)
+      AND (a.todos_medios = 1 OR a.medio IS NOT NULL);
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+    RETURN v_filas;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis (reemplaza la de 13)
+-- ============================================================================
+-- El cubo de clusters después del perfil tipado y del rollup mensual
+CREATE OR REPLACE FUNCTION refrescar_resumenes_jarvis()
+RETURNS BIGINT AS $$
+BEGIN
+    PERFORM reconstruir_perfil_tipado();
+    PERFORM reconstruir_facturacion_mensual();
+    PERFORM reconstruir_ranking_clientes();
+    PERFORM reconstruir_cubo_clusters();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+    RETURN incrementar_data_version();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- CARGA INICIAL
+-- ============================================================================
+SELECT reconstruir_cubo_clusters();
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Resumen por cluster (todos los años y medios)
+-- SELECT cluster, empresas, empresas_con_facturacion, facturacion, inversion_usd
+-- FROM cubo_clusters
+-- WHERE COALESCE(anio, 0) = 0 AND COALESCE(medio, '') = ''
+-- ORDER BY facturacion DESC;
+
+-- La facturación del cubo coincide con el rollup para anunciantes con cluster
+-- SELECT
+--     (SELECT SUM(facturacion) FROM cubo_clusters WHERE anio IS NULL AND medio IS NULL),
+--     (SELECT SUM(m.facturacion) FROM fact_facturacion_mensual m
+--      JOIN dim_anunciante_perfil_tipado t USING (anunciante_id) WHERE t.cluster IS NOT NULL);
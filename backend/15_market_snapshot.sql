@@ -0,0 +1,117 @@
+-- ============================================================================
+-- SNAPSHOTS DEL MERCADO - Estadísticas generales guardadas en cada carga
+-- Totales, promedios, cantidad de registros y top sectores calculados una vez
+-- al final de la carga (refrescar_resumenes_jarvis()); las estadísticas del
+-- mercado leen el último snapshot y "cómo cambió el mercado desde la última
+-- carga" compara los dos últimos sin recorrer los hechos
+-- (ver consulta_estadisticas_mercado / consulta_cambios_mercado en
+-- backend/jarvis_360_integration.py)
+-- Requiere: 09_data_version.sql, 10_facturacion_mensual.sql,
+--           12_perfil_tipado.sql, 14_cubo_clusters.sql
+-- ============================================================================
+
+
+-- TABLA: market_snapshot
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS market_snapshot (
+    cargado_en TIMESTAMP PRIMARY KEY,
+    data_version BIGINT,
+    total_clientes_facturacion INTEGER NOT NULL DEFAULT 0,
+    total_anunciantes_mercado INTEGER NOT NULL DEFAULT 0,
+    mercado_total_facturacion NUMERIC NOT NULL DEFAULT 0,
+    mercado_total_revenue NUMERIC NOT NULL DEFAULT 0,
+    promedio_facturacion NUMERIC NOT NULL DEFAULT 0,
+    total_registros INTEGER NOT NULL DEFAULT 0,
+    -- [{"sector", "empresas", "facturacion", "competitividad_promedio"}, ...] (top 10)
+    top_sectores JSONB NOT NULL DEFAULT '[]'
+);
+
+COMMENT ON TABLE market_snapshot IS
+'Estadísticas del mercado al final de cada carga (una fila por carga). Se escribe con registrar_market_snapshot().';
+
+
+-- FUNCIÓN: registrar_market_snapshot
+-- ============================================================================
+-- Un solo recorrido de fact_facturacion por carga; los sectores salen del
+-- rollup mensual y del perfil tipado (cada empresa cuenta una vez)
+CREATE OR REPLACE FUNCTION registrar_market_snapshot(p_data_version BIGINT)
+RETURNS TIMESTAMP AS $$
+    INSERT INTO market_snapshot (cargado_en, data_version, total_clientes_facturacion,
+                                 total_anunciantes_mercado, mercado_total_facturacion,
+                                 mercado_total_revenue, promedio_facturacion, total_registros,
+                                 top_sectores)
+    SELECT
+        clock_timestamp(),
+        p_data_version,
+        f.total_clientes_facturacion,
+        (SELECT COUNT(*) FROM dim_anunciante_perfil_tipado),
+        f.mercado_total_facturacion,
+        f.mercado_total_revenue,
+        f.promedio_facturacion,
+        f.total_registros,
+        COALESCE((
+            SELECT JSONB_AGG(s ORDER BY s.facturacion DESC)
+            FROM (
+                SELECT
+                    p.rubro_principal as sector,
+                    COUNT(DISTINCT p.anunciante_id) as empresas,
+                    SUM(m.facturacion) as facturacion,
+                    ROUND(AVG(p.competitividad), 2) as competitividad_promedio
+                FROM fact_facturacion_mensual m
+                JOIN dim_anunciante_perfil_tipado p ON p.anunciante_id = m.anunciante_id
+                WHERE p.rubro_principal IS NOT NULL
+                GROUP BY p.rubro_principal
+                ORDER BY facturacion DESC
+                LIMIT 10
+            ) s
+        ), '[]')
+    FROM (
+        SELECT
+            COUNT(DISTINCT anunciante_id) as total_clientes_facturacion,
+            COALESCE(SUM(facturacion), 0) as mercado_total_facturacion,
+            COALESCE(SUM(revenue), 0) as mercado_total_revenue,
+            COALESCE(AVG(facturacion), 0) as promedio_facturacion,
+            COUNT(*) as total_registros
+        FROM fact_facturacion
+    ) f
+    RETURNING cargado_en;
+$$ LANGUAGE sql;
+
+
+-- FUNCIÓN: refrescar_resumenes_jarvis (reemplaza la de 14)
+-- ============================================================================
+-- El snapshot queda con la data_version de la carga que lo generó
+CREATE OR REPLACE FUNCTION refrescar_resumenes_jarvis()
+RETURNS BIGINT AS $$
+DECLARE
+    v_version BIGINT;
+BEGIN
+    PERFORM reconstruir_perfil_tipado();
+    PERFORM reconstruir_facturacion_mensual();
+    PERFORM reconstruir_ranking_clientes();
+    PERFORM reconstruir_cubo_clusters();
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_anunciante_360;
+    v_version := incrementar_data_version();
+    PERFORM registrar_market_snapshot(v_version);
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- CARGA INICIAL
+-- ============================================================================
+SELECT registrar_market_snapshot((SELECT data_version FROM jarvis_data_version WHERE id = 1));
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Historial de cargas
+-- SELECT cargado_en, data_version, mercado_total_facturacion, total_registros
+-- FROM market_snapshot ORDER BY cargado_en DESC LIMIT 10;
+
+-- Variación entre las dos últimas cargas
+-- SELECT cargado_en, mercado_total_facturacion,
+--        mercado_total_facturacion - LEAD(mercado_total_facturacion) OVER (ORDER BY cargado_en DESC) as variacion
+-- FROM market_snapshot ORDER BY cargado_en DESC LIMIT 2;
@@ -0,0 +1,33 @@
+-- ============================================================================
+-- RANKING PAGINADO - Índice para top N con keyset ("ver más")
+-- Las páginas del ranking se piden como "después de (posición, cliente)"
+-- (ver get_pagina_ranking en backend/ranking_clientes.py): con cliente en el
+-- índice, la página N es un rango del índice y no recorre las anteriores
+-- Requiere: 13_ranking_clientes.sql
+-- ============================================================================
+
+
+-- ÍNDICE: corte + posición + cliente (reemplaza idx_ranking_clientes_corte)
+-- ============================================================================
+DROP INDEX IF EXISTS idx_ranking_clientes_corte;
+
+CREATE INDEX IF NOT EXISTS idx_ranking_clientes_pagina
+ON ranking_clientes(corte, COALESCE(anio, 0), COALESCE(division, ''), COALESCE(arena, ''),
+                    COALESCE(cluster, ''), posicion, cliente);
+
+ANALYZE ranking_clientes;
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- Segunda página del top 10 de un año (debe usar idx_ranking_clientes_pagina)
+-- EXPLAIN ANALYZE
+-- SELECT posicion, cliente, facturacion
+-- FROM ranking_clientes
+-- WHERE corte = 'anio' AND COALESCE(anio, 0) = 2025 AND COALESCE(division, '') = ''
+--   AND COALESCE(arena, '') = '' AND COALESCE(cluster, '') = ''
+--   AND (posicion, cliente) > (10, 'ULTIMO CLIENTE DE LA PAGINA 1')
+-- ORDER BY posicion, cliente
+-- LIMIT 10;
@@ -0,0 +1,69 @@
+-- ============================================================================
+-- BÚSQUEDA FUZZY - Umbrales de pg_trgm sin efectos en el resto del request
+-- buscar_anunciante_fuzzy cambiaba pg_trgm.similarity_threshold y
+-- word_similarity_threshold con set_config(..., true), que dura hasta el final
+-- de la transacción: con la conexión compartida por request (ver
+-- backend/unidad_trabajo.py) cualquier % o <% posterior usaba el umbral de la
+-- búsqueda. Ahora se guardan los valores anteriores y se restauran al salir
+-- Requiere: 04_busqueda_trigram.sql
+-- ============================================================================
+
+
+-- FUNCIÓN: buscar_anunciante_fuzzy (reemplaza la de 04)
+-- ============================================================================
+-- Los operadores % y <% siguen siendo la condición (son los que usan el índice
+-- GIN); los umbrales se cambian solo mientras corre la consulta
+CREATE OR REPLACE FUNCTION buscar_anunciante_fuzzy(
+    p_nombre TEXT,
+    p_threshold INTEGER DEFAULT 80
+)
+RETURNS TABLE(
+    anunciante_id INTEGER,
+    nombre_alias VARCHAR,
+    similitud INTEGER
+) AS $$
+DECLARE
+    -- NULL si pg_trgm todavía no se cargó en la sesión: se restauran sus defaults
+    v_umbral_similitud TEXT := COALESCE(current_setting('pg_trgm.similarity_threshold', true), '0.3');
+    v_umbral_palabra TEXT := COALESCE(current_setting('pg_trgm.word_similarity_threshold', true), '0.6');
+BEGIN
+    PERFORM set_config('pg_trgm.similarity_threshold', (p_threshold / 100.0)::TEXT, true);
+    PERFORM set_config('pg_trgm.word_similarity_threshold', (p_threshold / 100.0)::TEXT, true);
+
+    RETURN QUERY
+    SELECT
+        a.anunciante_id,
+        a.nombre_alias,
+        CASE
+            WHEN UPPER(a.nombre_alias) = UPPER(p_nombre) THEN 100
+            ELSE ROUND(GREATEST(
+                similarity(UPPER(a.nombre_alias), UPPER(p_nombre)),
+                word_similarity(UPPER(p_nombre), UPPER(a.nombre_alias))
+            ) * 100)::INTEGER
+        END as similitud
+    FROM dim_anunciante_aliases a
+    WHERE
+        UPPER(a.nombre_alias) % UPPER(p_nombre)
+        OR UPPER(p_nombre) <% UPPER(a.nombre_alias)
+    ORDER BY similitud DESC, a.confianza DESC
+    LIMIT 5;
+
+    -- RETURN QUERY ya ejecutó la consulta: restaurar los umbrales del request
+    PERFORM set_config('pg_trgm.similarity_threshold', v_umbral_similitud, true);
+    PERFORM set_config('pg_trgm.word_similarity_threshold', v_umbral_palabra, true);
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION buscar_anunciante_fuzzy IS
+'Búsqueda fuzzy con pg_trgm (índice GIN). Retorna top 5 matches con similitud 0-100 >= p_threshold. No cambia los umbrales de pg_trgm de la transacción.';
+
+
+-- ============================================================================
+-- QUERIES DE VALIDACIÓN
+-- ============================================================================
+
+-- El umbral de la transacción no cambia (debe mostrar 0.3)
+-- BEGIN;
+-- SELECT * FROM buscar_anunciante_fuzzy('cervepar', 60);
+-- SHOW pg_trgm.similarity_threshold;
+-- ROLLBACK;
@@ -10,6 +10,10 @@ import logging
 from datetime import datetime
 import numpy as np
 
+from post_carga import refrescar_resumenes
+
+from normalizacion import normalizar_nombre
+
 # Configuración logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -100,11 +104,17 @@ def mapear_clientes_anunciante_id(df, engine):
         # Obtener tabla de anunciantes
         with engine.connect() as conn:
             anunciantes_query = text("""
-                SELECT anunciante_id, nombre_anunciante 
+                SELECT anunciante_id, nombre_anunciante, nombre_normalizado
                 FROM dim_anunciante_perfil
+                ORDER BY anunciante_id
             """)
             anunciantes_df = pd.read_sql(anunciantes_query, conn)
         
+        # Coincidencia exacta por nombre normalizado (06_nombre_normalizado.sql): O(1) por cliente
+        anunciantes_por_nombre = {}
+        for row in anunciantes_df.itertuples():
+            anunciantes_por_nombre.setdefault(row.nombre_normalizado, row.anunciante_id)
+        
         logger.info(f"📋 Anunciantes en BD: {len(anunciantes_df)}")
         
         # Función de matching básico
@@ -112,12 +122,12 @@ def mapear_clientes_anunciante_id(df, engine):
             if pd.isna(cliente_nombre):
                 return None
                 
-            cliente_clean = str(cliente_nombre).upper().strip()
-            
             # Buscar coincidencia exacta primero
-            match = anunciantes_df[anunciantes_df['nombre_anunciante'].str.upper() == cliente_clean]
-            if not match.empty:
-                return match.iloc[0]['anunciante_id']
+            anunciante_id = anunciantes_por_nombre.get(normalizar_nombre(str(cliente_nombre)))
+            if anunciante_id is not None:
+                return anunciante_id
+            
+            cliente_clean = str(cliente_nombre).upper().strip()
             
             # Buscar coincidencia parcial
             for _, row in anunciantes_df.iterrows():
@@ -237,6 +247,9 @@ def main():
     success = actualizar_base_datos(df, engine)
     
     if success:
+        # Resúmenes 360° (mv_anunciante_360) con los datos recién cargados
+        refrescar_resumenes(engine)
+        
         logger.info("🎉 ¡ACTUALIZACIÓN COMPLETADA CON ÉXITO!")
         logger.info("✅ Datos 2025 actualizados")
         logger.info("✅ Backup creado")
@@ -1,11 +1,33 @@
 """
 ANÁLISIS ESTRATÉGICO DE NEGOCIO
 Respuestas a consultas específicas con datos cruzados
+Lee el snapshot Parquet (python snapshot_parquet.py), no la base de producción
 """
 
-from app import engine
-from sqlalchemy import text
-import json
+from lector_snapshot import leer_tabla
+
+COLUMNAS_FACTURAS = ['anunciante_id', 'facturacion', 'revenue', 'division', 'arena']
+
+def _unir(valores):
+    """STRING_AGG(DISTINCT ...)"""
+    return ', '.join(sorted(valores.dropna().unique())) or None
+
+def _con_facturas(perfiles):
+    """perfiles LEFT JOIN fact_facturacion (una fila por factura)"""
+    facturas = leer_tabla('fact_facturacion', columnas=COLUMNAS_FACTURAS,
+                          filtros=[('anunciante_id', 'in', perfiles['anunciante_id'].tolist())])
+    return perfiles.merge(facturas, on='anunciante_id', how='left')
+
+def _resumen_facturacion(perfiles):
+    """Una fila por perfil con facturación, revenue, registros, divisiones y arenas"""
+    resumen = _con_facturas(perfiles[['anunciante_id']]).groupby('anunciante_id').agg(
+        facturacion_total=('facturacion', 'sum'),
+        revenue_total=('revenue', 'sum'),
+        registros=('facturacion', 'count'),
+        divisiones=('division', _unir),
+        arenas=('arena', _unir),
+    ).reset_index()
+    return perfiles.merge(resumen, on='anunciante_id', how='left')
 
 def analizar_alex_sa():
     """
@@ -16,64 +38,45 @@ def analizar_alex_sa():
     print("="*50)
     
     try:
-        with engine.connect() as conn:
-            # Datos completos Alex
-            stmt = text("""
-                SELECT 
-                    p.nombre_anunciante,
-                    CAST(p.inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT) as inversion_tv_usd,
-                    p.cluster,
-                    p.competitividad,
-                    p.la_empresa_invierte_en_digital,
-                    COALESCE(SUM(f.facturacion), 0) as facturacion_total,
-                    COALESCE(SUM(f.revenue), 0) as revenue_total,
-                    COUNT(f.*) as registros,
-                    STRING_AGG(DISTINCT f.division, ', ') as divisiones,
-                    STRING_AGG(DISTINCT f.arena, ', ') as arenas
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.nombre_anunciante = 'ALEX'
-                GROUP BY p.nombre_anunciante, p.inversion_en_tv_abierta_2024_en_miles_usd, 
-                         p.cluster, p.competitividad, p.la_empresa_invierte_en_digital
-            """)
+        # Datos completos Alex
+        perfiles = leer_tabla('dim_anunciante_perfil_tipado', filtros=[('nombre_anunciante', '=', 'ALEX')])
+        result = next(_resumen_facturacion(perfiles).itertuples(), None)
+        
+        if result:
+            inversion_tv = result.inv_tv or 0
+            facturacion = result.facturacion_total or 0
+            revenue = result.revenue_total or 0
+            digital_score = result.digital or 0
             
-            result = conn.execute(stmt).fetchone()
+            print(f"📺 Inversión TV AdLens: ${inversion_tv:,.0f} USD")
+            print(f"💰 Facturación con nosotros: {facturacion:,.0f} Gs")
+            print(f"💰 Revenue generado: {revenue:,.0f} Gs")
+            print(f"🎯 Digital score: {digital_score:.0f}/10")
+            print(f"📊 Registros: {result.registros}")
+            print(f"🏢 Divisiones: {result.divisiones}")
+            print(f"🎪 Arenas: {result.arenas}")
             
-            if result:
-                inversion_tv = result.inversion_tv_usd or 0
-                facturacion = result.facturacion_total or 0
-                revenue = result.revenue_total or 0
-                digital_score = result.la_empresa_invierte_en_digital or 0
+            # Cálculo ratio
+            if inversion_tv > 0 and facturacion > 0:
+                # Convertir facturación a USD aproximado (1 USD = 7500 Gs aprox)
+                facturacion_usd = facturacion / 7500
+                ratio = facturacion_usd / inversion_tv * 100
                 
-                print(f"📺 Inversión TV AdLens: ${inversion_tv:,.0f} USD")
-                print(f"💰 Facturación con nosotros: {facturacion:,.0f} Gs")
-                print(f"💰 Revenue generado: {revenue:,.0f} Gs") 
-                print(f"🎯 Digital score: {digital_score}/10")
-                print(f"📊 Registros: {result.registros}")
-                print(f"🏢 Divisiones: {result.divisiones}")
-                print(f"🎪 Arenas: {result.arenas}")
+                print(f"\n🎯 ANÁLISIS ESTRATÉGICO:")
+                print(f"   Facturación USD aprox: ${facturacion_usd:,.0f}")
+                print(f"   Ratio captura: {ratio:.1f}% de su inversión TV")
                 
-                # Cálculo ratio
-                if inversion_tv > 0 and facturacion > 0:
-                    # Convertir facturación a USD aproximado (1 USD = 7500 Gs aprox)
-                    facturacion_usd = facturacion / 7500
-                    ratio = facturacion_usd / inversion_tv * 100
-                    
-                    print(f"\n🎯 ANÁLISIS ESTRATÉGICO:")
-                    print(f"   Facturación USD aprox: ${facturacion_usd:,.0f}")
-                    print(f"   Ratio captura: {ratio:.1f}% de su inversión TV")
-                    
-                    if ratio < 10:
-                        print("   ⚠️  OPORTUNIDAD: Muy baja captura vs inversión")
-                        print("   💡 Recomendación: Explorar servicios digitales")
-                    elif ratio < 25:
-                        print("   ⚡ Captura moderada - potencial de crecimiento")
-                    else:
-                        print("   ✅ Buena captura de su inversión")
+                if ratio < 10:
+                    print("   ⚠️  OPORTUNIDAD: Muy baja captura vs inversión")
+                    print("   💡 Recomendación: Explorar servicios digitales")
+                elif ratio < 25:
+                    print("   ⚡ Captura moderada - potencial de crecimiento")
                 else:
-                    print(f"\n❌ Sin facturación registrada - GRAN OPORTUNIDAD")
+                    print("   ✅ Buena captura de su inversión")
             else:
-                print("❌ Alex S.A. no encontrado")
+                print(f"\n❌ Sin facturación registrada - GRAN OPORTUNIDAD")
+        else:
+            print("❌ Alex S.A. no encontrado")
     
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -87,61 +90,46 @@ def analizar_puma_energy():
     print("="*50)
     
     try:
-        with engine.connect() as conn:
-            stmt = text("""
-                SELECT 
-                    p.nombre_anunciante,
-                    p.cluster,
-                    p.cultura,
-                    p.competitividad,
-                    p.la_empresa_invierte_en_digital,
-                    COALESCE(SUM(f.facturacion), 0) as facturacion_total,
-                    STRING_AGG(DISTINCT f.division, ', ') as divisiones,
-                    STRING_AGG(DISTINCT f.arena, ', ') as arenas
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.nombre_anunciante LIKE '%PUMA%'
-                GROUP BY p.nombre_anunciante, p.cluster, p.cultura, p.competitividad, p.la_empresa_invierte_en_digital
-            """)
+        perfiles = leer_tabla('dim_anunciante_perfil_tipado')
+        perfiles = perfiles[perfiles['nombre_anunciante'].str.contains('PUMA', regex=False, na=False)]
+        result = next(_resumen_facturacion(perfiles).itertuples(), None)
+        
+        if result:
+            print(f"🎯 Cluster: {result.cluster}")
+            print(f"🎨 Cultura: {result.cultura}")
+            print(f"⚡ Competitividad: {result.competitividad}")
+            print(f"💻 Digital score: {result.digital:.0f}/10")
+            print(f"💰 Facturación: {result.facturacion_total:,.0f} Gs")
+            print(f"🏢 Divisiones: {result.divisiones}")
+            print(f"🎪 Arenas: {result.arenas}")
             
-            result = conn.execute(stmt).fetchone()
+            print(f"\n🎯 ANÁLISIS DE INNOVACIÓN:")
             
-            if result:
-                print(f"🎯 Cluster: {result.cluster}")
-                print(f"🎨 Cultura: {result.cultura}")
-                print(f"⚡ Competitividad: {result.competitividad}")
-                print(f"💻 Digital score: {result.la_empresa_invierte_en_digital}/10")
-                print(f"💰 Facturación: {result.facturacion_total:,.0f} Gs")
-                print(f"🏢 Divisiones: {result.divisiones}")
-                print(f"🎪 Arenas: {result.arenas}")
-                
-                print(f"\n🎯 ANÁLISIS DE INNOVACIÓN:")
-                
-                # Evaluar si les hacemos servicios innovadores
-                arenas = result.arenas or ""
-                divisiones = result.divisiones or ""
-                
-                servicios_innovadores = 0
-                servicios_tradicionales = 0
-                
-                if "CREACION" in arenas.upper():
-                    servicios_innovadores += 1
-                if "BI" in arenas.upper():
-                    servicios_innovadores += 1
-                if "DISTRIBUCION" in arenas.upper():
-                    servicios_tradicionales += 1
-                if "FEE FIJO" in divisiones.upper():
-                    servicios_tradicionales += 1
-                
-                if servicios_innovadores > servicios_tradicionales:
-                    print("   ✅ Les prestamos servicios INNOVADORES")
-                elif servicios_innovadores == servicios_tradicionales:
-                    print("   ⚡ Mix balanceado - potencial para más innovación")
-                else:
-                    print("   ⚠️  OPORTUNIDAD: Más servicios tradicionales que innovadores")
-                    print("   💡 Recomendación: Ofrecer más creación y BI")
+            # Evaluar si les hacemos servicios innovadores
+            arenas = result.arenas or ""
+            divisiones = result.divisiones or ""
+            
+            servicios_innovadores = 0
+            servicios_tradicionales = 0
+            
+            if "CREACION" in arenas.upper():
+                servicios_innovadores += 1
+            if "BI" in arenas.upper():
+                servicios_innovadores += 1
+            if "DISTRIBUCION" in arenas.upper():
+                servicios_tradicionales += 1
+            if "FEE FIJO" in divisiones.upper():
+                servicios_tradicionales += 1
+            
+            if servicios_innovadores > servicios_tradicionales:
+                print("   ✅ Les prestamos servicios INNOVADORES")
+            elif servicios_innovadores == servicios_tradicionales:
+                print("   ⚡ Mix balanceado - potencial para más innovación")
             else:
-                print("❌ Puma Energy no encontrado")
+                print("   ⚠️  OPORTUNIDAD: Más servicios tradicionales que innovadores")
+                print("   💡 Recomendación: Ofrecer más creación y BI")
+        else:
+            print("❌ Puma Energy no encontrado")
     
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -155,42 +143,26 @@ def analizar_empresas_innovadoras():
     print("="*50)
     
     try:
-        with engine.connect() as conn:
-            stmt = text("""
-                SELECT 
-                    p.nombre_anunciante,
-                    CAST(p.competitividad AS FLOAT) as competitividad,
-                    CAST(p.la_empresa_invierte_en_digital AS FLOAT) as digital_score,
-                    p.cluster,
-                    COALESCE(SUM(f.facturacion), 0) as facturacion_total,
-                    STRING_AGG(DISTINCT f.arena, ', ') as arenas
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.competitividad != '-' AND p.competitividad IS NOT NULL
-                  AND p.la_empresa_invierte_en_digital != '-' AND p.la_empresa_invierte_en_digital IS NOT NULL
-                  AND CAST(p.competitividad AS FLOAT) >= 0.8
-                  AND CAST(p.la_empresa_invierte_en_digital AS FLOAT) >= 8
-                GROUP BY p.nombre_anunciante, p.competitividad, p.la_empresa_invierte_en_digital, p.cluster
-                HAVING SUM(f.facturacion) > 0
-                ORDER BY CAST(p.competitividad AS FLOAT) DESC, CAST(p.la_empresa_invierte_en_digital AS FLOAT) DESC
-                LIMIT 10
-            """)
-            
-            results = conn.execute(stmt).fetchall()
-            
-            print("🏆 TOP EMPRESAS INNOVADORAS:")
-            print("   (Competitividad ≥ 0.8 + Digital ≥ 8)")
+        perfiles = leer_tabla('dim_anunciante_perfil_tipado',
+                              filtros=[('competitividad', '>=', 0.8), ('digital', '>=', 8)])
+        resumen = _resumen_facturacion(perfiles)
+        results = (resumen[resumen['facturacion_total'] > 0]
+                   .sort_values(['competitividad', 'digital'], ascending=False)
+                   .head(10))
+        
+        print("🏆 TOP EMPRESAS INNOVADORAS:")
+        print("   (Competitividad ≥ 0.8 + Digital ≥ 8)")
+        print()
+        
+        for i, row in enumerate(results.itertuples(), 1):
+            arenas = row.arenas or "Sin datos"
+            print(f"{i:2d}. {row.nombre_anunciante}")
+            print(f"    Competitividad: {row.competitividad:.1f}")
+            print(f"    Digital: {row.digital:.0f}/10")
+            print(f"    Cluster: {row.cluster}")
+            print(f"    Facturación: {row.facturacion_total:,.0f} Gs")
+            print(f"    Servicios: {arenas}")
             print()
-            
-            for i, row in enumerate(results, 1):
-                arenas = row.arenas or "Sin datos"
-                print(f"{i:2d}. {row.nombre_anunciante}")
-                print(f"    Competitividad: {row.competitividad:.1f}")
-                print(f"    Digital: {row.digital_score:.0f}/10")
-                print(f"    Cluster: {row.cluster}")
-                print(f"    Facturación: {row.facturacion_total:,.0f} Gs")
-                print(f"    Servicios: {arenas}")
-                print()
     
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -204,40 +176,37 @@ def analizar_depto_marketing_vs_agencia():
     print("="*50)
     
     try:
-        with engine.connect() as conn:
-            stmt = text("""
-                SELECT 
-                    p.tiene_la_empresa_departamento_de_marketing as tiene_depto,
-                    p.central_de_medios,
-                    COUNT(*) as total_empresas,
-                    AVG(COALESCE(f.facturacion, 0)) as facturacion_promedio,
-                    SUM(COALESCE(f.facturacion, 0)) as facturacion_total,
-                    AVG(CAST(
-                        CASE WHEN p.competitividad = '-' OR p.competitividad IS NULL THEN NULL 
-                             ELSE p.competitividad END AS FLOAT)) as competitividad_promedio
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.tiene_la_empresa_departamento_de_marketing IS NOT NULL
-                GROUP BY p.tiene_la_empresa_departamento_de_marketing, p.central_de_medios
-                HAVING COUNT(*) > 5
-                ORDER BY facturacion_promedio DESC
-            """)
-            
-            results = conn.execute(stmt).fetchall()
+        perfiles = leer_tabla('dim_anunciante_perfil', columnas=[
+            'anunciante_id', 'tiene_la_empresa_departamento_de_marketing', 'central_de_medios'
+        ])
+        perfiles = perfiles[perfiles['tiene_la_empresa_departamento_de_marketing'].notna()]
+        tipados = leer_tabla('dim_anunciante_perfil_tipado', columnas=['anunciante_id', 'competitividad'])
+        filas = _con_facturas(perfiles.merge(tipados, on='anunciante_id', how='left'))
+        filas['facturacion'] = filas['facturacion'].fillna(0)
+        
+        results = filas.groupby(
+            ['tiene_la_empresa_departamento_de_marketing', 'central_de_medios'], dropna=False
+        ).agg(
+            total_empresas=('anunciante_id', 'size'),
+            facturacion_promedio=('facturacion', 'mean'),
+            facturacion_total=('facturacion', 'sum'),
+            competitividad_promedio=('competitividad', 'mean'),
+        ).reset_index()
+        results = results[results['total_empresas'] > 5].sort_values('facturacion_promedio', ascending=False)
+        
+        print("📊 FACTURACIÓN POR ESTRUCTURA:")
+        print()
+        
+        for row in results.itertuples():
+            depto = row.tiene_la_empresa_departamento_de_marketing or "Sin especificar"
+            central = row.central_de_medios if isinstance(row.central_de_medios, str) else "Sin central"
             
-            print("📊 FACTURACIÓN POR ESTRUCTURA:")
+            print(f"🏢 {depto} + {central}")
+            print(f"   Empresas: {row.total_empresas}")
+            print(f"   Facturación promedio: {row.facturacion_promedio:,.0f} Gs")
+            print(f"   Facturación total: {row.facturacion_total:,.0f} Gs")
+            print(f"   Competitividad: {row.competitividad_promedio:.2f}")
             print()
-            
-            for row in results:
-                depto = row.tiene_depto or "Sin especificar"
-                central = row.central_de_medios or "Sin central"
-                
-                print(f"🏢 {depto} + {central}")
-                print(f"   Empresas: {row.total_empresas}")
-                print(f"   Facturación promedio: {row.facturacion_promedio:,.0f} Gs")
-                print(f"   Facturación total: {row.facturacion_total:,.0f} Gs")
-                print(f"   Competitividad: {row.competitividad_promedio:.2f}")
-                print()
     
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -251,43 +220,33 @@ def analizar_cultura_vs_inversion():
     print("="*50)
     
     try:
-        with engine.connect() as conn:
-            stmt = text("""
-                SELECT 
-                    CASE 
-                        WHEN CAST(p.cultura AS FLOAT) >= 0.8 THEN 'Alta Cultura (≥0.8)'
-                        WHEN CAST(p.cultura AS FLOAT) >= 0.5 THEN 'Media Cultura (0.5-0.7)'
-                        ELSE 'Baja Cultura (<0.5)'
-                    END as nivel_cultura,
-                    COUNT(*) as empresas,
-                    AVG(CAST(p.inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT)) as inversion_tv_promedio,
-                    AVG(CAST(p.la_empresa_invierte_en_digital AS FLOAT)) as digital_promedio,
-                    AVG(COALESCE(f.facturacion, 0)) as facturacion_promedio
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.cultura != '-' AND p.cultura IS NOT NULL
-                  AND p.inversion_en_tv_abierta_2024_en_miles_usd != '-' 
-                  AND p.la_empresa_invierte_en_digital != '-'
-                GROUP BY CASE 
-                        WHEN CAST(p.cultura AS FLOAT) >= 0.8 THEN 'Alta Cultura (≥0.8)'
-                        WHEN CAST(p.cultura AS FLOAT) >= 0.5 THEN 'Media Cultura (0.5-0.7)'
-                        ELSE 'Baja Cultura (<0.5)'
-                    END
-                ORDER BY AVG(CAST(p.cultura AS FLOAT)) DESC
-            """)
-            
-            results = conn.execute(stmt).fetchall()
-            
-            print("🎨 CORRELACIÓN CULTURA-INVERSIÓN:")
+        perfiles = leer_tabla('dim_anunciante_perfil_tipado',
+                              columnas=['anunciante_id', 'cultura', 'inv_tv', 'digital'])
+        perfiles = perfiles.dropna(subset=['cultura', 'inv_tv', 'digital'])
+        filas = _con_facturas(perfiles)
+        filas['facturacion'] = filas['facturacion'].fillna(0)
+        filas['nivel_cultura'] = 'Baja Cultura (<0.5)'
+        filas.loc[filas['cultura'] >= 0.5, 'nivel_cultura'] = 'Media Cultura (0.5-0.7)'
+        filas.loc[filas['cultura'] >= 0.8, 'nivel_cultura'] = 'Alta Cultura (≥0.8)'
+        
+        results = filas.groupby('nivel_cultura').agg(
+            empresas=('anunciante_id', 'size'),
+            inversion_tv_promedio=('inv_tv', 'mean'),
+            digital_promedio=('digital', 'mean'),
+            facturacion_promedio=('facturacion', 'mean'),
+            cultura_promedio=('cultura', 'mean'),
+        ).reset_index().sort_values('cultura_promedio', ascending=False)
+        
+        print("🎨 CORRELACIÓN CULTURA-INVERSIÓN:")
+        print()
+        
+        for row in results.itertuples():
+            print(f"📊 {row.nivel_cultura}")
+            print(f"   Empresas: {row.empresas}")
+            print(f"   Inversión TV promedio: ${row.inversion_tv_promedio:,.0f} USD")
+            print(f"   Score digital promedio: {row.digital_promedio:.1f}/10")
+            print(f"   Facturación promedio: {row.facturacion_promedio:,.0f} Gs")
             print()
-            
-            for row in results:
-                print(f"📊 {row.nivel_cultura}")
-                print(f"   Empresas: {row.empresas}")
-                print(f"   Inversión TV promedio: ${row.inversion_tv_promedio:,.0f} USD")
-                print(f"   Score digital promedio: {row.digital_promedio:.1f}/10")
-                print(f"   Facturación promedio: {row.facturacion_promedio:,.0f} Gs")
-                print()
     
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -307,4 +266,3 @@ if __name__ == "__main__":
     
     print("🎉 ANÁLISIS COMPLETADO")
     print("Insights estratégicos basados en datos reales")
-
@@ -8,6 +8,7 @@ from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 import logging
+import threading
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
@@ -30,7 +31,25 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from validate_feedback import validate_feedback_with_claude, format_validation_for_trainer
+from motor_fuzzy import puntuar_lote, top_k
+import numpy as np
+from matcher_aliases import invalidar_matcher_aliases
+from indice_anunciantes import invalidar_indice_anunciantes
+from escucha_cache import iniciar_escucha, registrar_invalidador
+from unidad_trabajo import conexion, fabrica_sesiones, registrar_unidad_trabajo, transaccion
+from cache_360 import get_estadisticas_cache_360, invalidar_cache_360
+from totales_mercado import invalidar_totales_mercado
+from cache_columnar import invalidar_cache_columnar, precargar_cache_columnar
+from orquestador_fuentes import ejecutar_fuentes
+from ranking_clientes import (
+    get_pagina_ranking,
+    invalidar_dimensiones_ranking,
+    parsear_consulta_ranking
+)
+from normalizacion import compilar_claves, normalizar_texto, palabras_cliente
+from extractor_menciones import invalidar_extractor_menciones
 from busqueda_flexible import (
+    buscar_anunciante,
     get_facturacion_cliente,
     get_inversion_medios_cliente,
     get_ranking_dnit_cliente,
@@ -184,7 +203,57 @@ try:
 except Exception as e:
     logger.error(f"Error creando tablas: {e}")
 
-Session = sessionmaker(bind=engine)
+# Dentro de un request Session() devuelve la sesión del request (una conexión del pool por request,
+# ver unidad_trabajo.py); en scripts e hilos de fondo sigue creando una sesión nueva
+Session = fabrica_sesiones(sessionmaker(bind=engine))
+registrar_unidad_trabajo(app)
+
+# ==================== CACHES EN MEMORIA ====================
+
+_tablas_dinamicas = None
+_tablas_dinamicas_lock = threading.Lock()
+
+def get_tablas_dinamicas():
+    """Nombres de las tablas subidas por trainers (cache del proceso)"""
+    global _tablas_dinamicas
+    
+    if _tablas_dinamicas is not None:
+        return _tablas_dinamicas
+    
+    with _tablas_dinamicas_lock:
+        if _tablas_dinamicas is None:
+            session = Session()
+            try:
+                _tablas_dinamicas = [dt.table_name for dt in session.query(DynamicTable).all()]
+            finally:
+                session.close()
+    
+    return _tablas_dinamicas
+
+def invalidar_tablas_dinamicas():
+    """Descartar la lista de tablas dinámicas para que se recargue en la próxima consulta"""
+    global _tablas_dinamicas
+    
+    with _tablas_dinamicas_lock:
+        _tablas_dinamicas = None
+    
+    logger.info("🔄 Tablas dinámicas invalidadas")
+
+# Cada cache se invalida solo cuando cambian sus tablas (NOTIFY, ver 07_notificar_cambios_cache.sql)
+registrar_invalidador(['dim_anunciante', 'dim_anunciante_perfil'], invalidar_indice_anunciantes)
+registrar_invalidador(['dim_anunciante', 'dim_anunciante_perfil', 'dim_anunciante_aliases',
+                       'dim_anunciante_alias_negativo'], invalidar_matcher_aliases)
+registrar_invalidador(['dim_anunciante', 'dim_anunciante_perfil', 'dim_anunciante_aliases'],
+                      invalidar_extractor_menciones)
+registrar_invalidador('dynamic_tables', invalidar_tablas_dinamicas)
+registrar_invalidador('jarvis_data_version', invalidar_cache_360)
+registrar_invalidador('jarvis_data_version', invalidar_totales_mercado)
+registrar_invalidador('jarvis_data_version', invalidar_cache_columnar)
+registrar_invalidador('jarvis_data_version', invalidar_dimensiones_ranking)
+iniciar_escucha(engine)
+
+# Hechos en memoria para rankings y totales (solo con JARVIS_CACHE_COLUMNAR=1)
+precargar_cache_columnar(engine)
 
 # ==================== AUTHENTICATION ====================
 
@@ -293,13 +362,18 @@ def find_similar_feedback(user_query, category=None):
         else:
             threshold = 85  # Queries largas: más exigentes
         
-        for fb in feedbacks:
-            if fb.original_query:
-                # Usar token_set_ratio para más flexibilidad
-                score = fuzz.token_set_ratio(user_query.lower(), fb.original_query.lower())
-                if score > best_score:
-                    best_score = score
-                    best_match = fb
+        # Usar token_set_ratio para más flexibilidad (scoring por lotes)
+        feedbacks = [fb for fb in feedbacks if fb.original_query]
+        scores = puntuar_lote(
+            user_query.lower(),
+            [fb.original_query.lower() for fb in feedbacks],
+            scorer='token_set_ratio'
+        )
+        mejores = top_k(np.round(scores * 100), k=1, score_cutoff=1)
+        if mejores:
+            pos, score = mejores[0]
+            best_score = int(score)
+            best_match = feedbacks[pos]
         
         if best_match and best_score >= threshold:
             logger.info(f"✅ Feedback similar encontrado: score {best_score}, categoría: {best_match.category}")
@@ -416,61 +490,51 @@ def _mock_response_fallback(query_type, rows, user_query):
     else:
         return "Consulta procesada."
 
-def get_top_clientes_enriched(query):
-    """Top clientes por facturación - VERSIÓN FINAL CORRECTA"""
+def get_top_clientes_enriched(query, despues_de=None):
+    """
+    Top clientes por facturación desde el ranking precalculado (ranking_clientes.py)
+    N, año, división, arena y cluster salen de la consulta (10 si no pide cantidad)
+    Retorna (filas, siguiente): siguiente es el despues_de de la página que sigue ("ver más")
+    """
     try:
-        with engine.connect() as conn:
-            stmt = text("""
-                SELECT 
-                    cliente_original,
-                    COUNT(*) as registros,
-                    SUM(facturacion) as facturacion_total
-                FROM fact_facturacion
-                WHERE cliente_original IS NOT NULL
-                GROUP BY cliente_original
-                ORDER BY facturacion_total DESC
-                LIMIT 10
-            """)
-            rows = conn.execute(stmt).fetchall()
-            
-            # Calcular total para market share
-            total_stmt = text("SELECT SUM(facturacion) FROM fact_facturacion WHERE cliente_original IS NOT NULL")
-            total_result = conn.execute(total_stmt).fetchone()
-            total_facturacion = float(total_result[0]) if total_result[0] else 1
-            
-            result = []
-            for r in rows:
-                facturacion = float(r[2]) if r[2] else 0
-                market_share = (facturacion / total_facturacion * 100) if total_facturacion > 0 else 0
-                
-                result.append({
-                    "cliente": r[0] or "Sin nombre",
-                    "facturacion": facturacion,
-                    "registros": int(r[1]) if r[1] else 0,
-                    "market_share": market_share
-                })
-            return result
+        filtros = parsear_consulta_ranking(query, engine)
+        limite = filtros.pop('limite') or 10
+        pagina = get_pagina_ranking(engine, limite=limite, despues_de=despues_de, **filtros)
+        
+        return [
+            {
+                "posicion": cliente["posicion"],
+                "cliente": cliente["cliente"],
+                "facturacion": cliente["facturacion"],
+                "registros": cliente["registros"],
+                "market_share": cliente["market_share"]
+            }
+            for cliente in pagina["datos"]
+        ], pagina["siguiente"]
     except Exception as e:
         logger.error(f"Error Top Clientes: {e}")
-        return []
+        return [], None
     
 
     # metodo que busca si un cliente tiene busqueda de facturacion o inversion separados o juntos.
     
+# Palabras clave de los routers (precompiladas sobre texto normalizado)
+CLAVES_INVERSION = compilar_claves(['tv', 'radio', 'cable', 'inversion', 'invirtio', 'invertir', 'medios', 'publicidad', 'pauta'])
+CLAVES_RANKING_DNIT = compilar_claves(['ranking', 'dnit', 'posicion', 'puesto', 'aporte'])
+CLAVES_FACTURACION = compilar_claves(['facturo', 'facturacion', 'vendio', 'ventas', 'cuanto'])
+CLAVES_QUERY_RANKING = compilar_claves(["top", "ranking", "principal", "importante", "mayor", "más", "clientes"])
+CLAVES_QUERY_FACTURACION = compilar_claves(["cuánto", "cuanto", "factur", "how much", "invirti", "ranking", "dnit", "datos", "perfil", "informacion", "cluster", "cultura"])
+CLAVES_QUERY_COMPLEJA = compilar_claves(["comparar", "compare", "vs", "ranking", "clusters", "analisis", "estadisticas", "mercado", "completo", "datos completos"])
+
 def get_facturacion_enriched(query):
     """
     Facturación de un cliente con búsqueda flexible
     Detecta si pide solo facturación o facturación + inversión
     """
-    query_limpio = query.replace('?', '').replace('!', '').replace(',', '').lower()
+    query_limpio = normalizar_texto(query)
     
-    # Palabras comunes a ignorar
-    stopwords = ['cuanto', 'cuánto', 'facturo', 'facturó', 'facturacion', 'facturación', 
-                 'de', 'la', 'el', 'en', 'y', 'o', 'para', 'con', 'a', 'un', 'una',
-                 'invirtio', 'invirti', 'invertir', 'inversion']
-    
-    palabras = query_limpio.split()
-    cliente_palabras = [p for p in palabras if p not in stopwords and len(p) > 2]
+    # Palabras del cliente (sin stopwords de consulta)
+    cliente_palabras = palabras_cliente(query)
     
     if not cliente_palabras:
         return []
@@ -479,52 +543,68 @@ def get_facturacion_enriched(query):
     cliente = cliente_palabras[0] if len(cliente_palabras) == 1 else " ".join(cliente_palabras[:2])
     
     # Detectar qué datos necesita
-    pide_inversion = any(w in query_limpio for w in ['tv', 'radio', 'cable', 'inversion', 'invirtio', 'invertir', 'medios', 'publicidad', 'pauta'])
-    pide_ranking = any(w in query_limpio for w in ['ranking', 'dnit', 'posicion', 'puesto', 'aporte'])
+    pide_inversion = bool(CLAVES_INVERSION.search(query_limpio))
+    pide_ranking = bool(CLAVES_RANKING_DNIT.search(query_limpio))
+    pide_facturacion = bool(CLAVES_FACTURACION.search(query_limpio))
     
     resultado = []
     
     try:
-        # 1. Siempre buscar facturación si la query lo indica
-        if any(w in query_limpio for w in ['facturo', 'facturacion', 'vendio', 'ventas', 'cuanto']):
-            facturacion = get_facturacion_cliente(cliente, engine)
-            
-            if facturacion:
-                # Agregar datos de facturación al resultado
-                for f in facturacion:
-                    resultado.append(f)
-        
-        # 2. Si pide inversión, buscar en medios
+        if not (pide_facturacion or pide_inversion):
+            return []
+        
+        # Resolver el anunciante una sola vez para todas las fuentes
+        anunciante = buscar_anunciante(cliente, engine)
+        
+        # Detectar filtros de inversión
+        filtros = {}
+        if 'tv' in query_limpio:
+            filtros['medio'] = 'TV'
+        elif 'radio' in query_limpio:
+            filtros['medio'] = 'RADIO'
+        elif 'cable' in query_limpio:
+            filtros['medio'] = 'CABLE'
+        
+        # Fuentes independientes en paralelo (orquestador_fuentes.py)
+        fuentes = {'dnit': lambda: get_ranking_dnit_cliente(cliente, engine, anunciante=anunciante)}
+        if pide_facturacion:
+            fuentes['erp'] = lambda: get_facturacion_cliente(cliente, engine, anunciante=anunciante)
         if pide_inversion:
-            # Detectar filtros
-            filtros = {}
-            if 'tv' in query_limpio:
-                filtros['medio'] = 'TV'
-            elif 'radio' in query_limpio:
-                filtros['medio'] = 'RADIO'
-            elif 'cable' in query_limpio:
-                filtros['medio'] = 'CABLE'
-            
-            inversion = get_inversion_medios_cliente(cliente, engine, filtros)
-            
-            if inversion:
-                # Agregar datos de inversión al resultado
-                if resultado:
-                    # Ya hay facturación, agregar inversión al mismo dict
-                    resultado[0]['inversion_medios'] = inversion
-                else:
-                    # Solo inversión, crear resultado
-                    resultado = [{
-                        'cliente': inversion[0]['cliente'],
-                        'inversion_medios': inversion
-                    }]
+            fuentes['inversion'] = lambda: get_inversion_medios_cliente(cliente, engine, filtros, anunciante=anunciante)
+        
+        datos, fuentes_faltantes = ejecutar_fuentes(fuentes)
+        
+        # 1. Facturación si la query lo indica
+        facturacion = datos.get('erp')
+        if facturacion:
+            # Agregar datos de facturación al resultado
+            for f in facturacion:
+                resultado.append(f)
+        
+        # 2. Inversión en medios si la pide
+        inversion = datos.get('inversion')
+        if inversion:
+            # Agregar datos de inversión al resultado
+            if resultado:
+                # Ya hay facturación, agregar inversión al mismo dict
+                resultado[0]['inversion_medios'] = inversion
+            else:
+                # Solo inversión, crear resultado
+                resultado = [{
+                    'cliente': inversion[0]['cliente'],
+                    'inversion_medios': inversion
+                }]
         
-        # 3. ✅ CORREGIDO: Siempre buscar ranking DNIT cuando tenemos datos del cliente
-        if resultado:  # ✅ CORREGIDO: buscar automáticamente
-            ranking = get_ranking_dnit_cliente(cliente, engine)
+        # 3. ✅ CORREGIDO: Siempre agregar ranking DNIT cuando tenemos datos del cliente
+        if resultado:
+            ranking = datos.get('dnit')
             
             if ranking:
                 resultado[0]['ranking_dnit'] = ranking[0]
+            
+            # Resultado parcial: avisar qué fuentes no respondieron
+            if fuentes_faltantes:
+                resultado[0]['fuentes_faltantes'] = fuentes_faltantes
         
         return resultado
         
@@ -538,7 +618,7 @@ def get_facturacion_enriched(query):
 def health():
     """Health check"""
     try:
-        with engine.connect() as conn:
+        with conexion(engine) as conn:
             conn.execute(text("SELECT 1"))
         return safe_jsonify({"status": "✅ OK", "db": "connected"}), 200
     except:
@@ -734,6 +814,8 @@ def query(user_id):
     data = request.json
     user_query = data.get('query', '').strip()
     session_id = data.get('session_id', str(user_id))
+    # "Ver más" de un ranking: cursor 'siguiente' de la respuesta anterior
+    despues_de = data.get('despues_de')
     
     session = Session()
     user = session.query(User).filter_by(id=user_id).first()
@@ -746,7 +828,7 @@ def query(user_id):
         return safe_jsonify({"error": "Query vacío"}), 400
     
     try:
-        query_lower = user_query.lower()
+        query_lower = normalizar_texto(user_query)
         
         # Detectar intención: chart_only, text_only, o chart_and_text
         intent = detect_query_intent(user_query)
@@ -766,51 +848,47 @@ def query(user_id):
             }), 200
         
         # DETECCIÓN DE TABLAS DINÁMICAS
-        dynamic_session = Session()
-        try:
-            dynamic_tables = dynamic_session.query(DynamicTable).all()
-            for dt in dynamic_tables:
-                if dt.table_name in query_lower:
-                    with engine.connect() as conn:
-                        stmt = text(f"SELECT * FROM {dt.table_name} LIMIT 10")
-                        result = conn.execute(stmt).fetchall()
-                        rows = [dict(row._mapping) for row in result]
-                        
-                    response_text = f"Encontré {len(rows)} registros en la tabla {dt.table_name}"
-                    return safe_jsonify({
-                        "success": True,
-                        "responses": [{
-                            "type": "text",
-                            "content": response_text,
-                            "query_type": "dynamic_table",
-                            "data": rows
-                        }]
-                    }), 200
-        finally:
-            dynamic_session.close()
+        for table_name in get_tablas_dinamicas():
+            if table_name in query_lower:
+                with conexion(engine) as conn:
+                    stmt = text(f"SELECT * FROM {table_name} LIMIT 10")
+                    result = conn.execute(stmt).fetchall()
+                    rows = [dict(row._mapping) for row in result]
+                    
+                response_text = f"Encontré {len(rows)} registros en la tabla {table_name}"
+                return safe_jsonify({
+                    "success": True,
+                    "responses": [{
+                        "type": "text",
+                        "content": response_text,
+                        "query_type": "dynamic_table",
+                        "data": rows
+                    }]
+                }), 200
         
         # DETECCIÓN DE TIPO DE QUERY
         rows = []
+        siguiente = None
         query_type = "generico"
 
         # 1. RANKINGS
-        if any(w in query_lower for w in ["top", "ranking", "principal", "importante", "mayor", "más", "clientes"]):
+        if CLAVES_QUERY_RANKING.search(query_lower):
             query_type = "ranking"
-            rows = get_top_clientes_enriched(user_query)
+            rows, siguiente = get_top_clientes_enriched(user_query, despues_de=despues_de)
             logger.info(f"🔍 Detectado: ranking - rows: {len(rows)}")
 
         # 2. FACTURACIÓN CON KEYWORDS
-        elif any(w in query_lower for w in ["cuánto", "cuanto", "factur", "how much", "invirti", "ranking", "dnit", "datos", "perfil", "informacion", "cluster", "cultura"]):
+        elif CLAVES_QUERY_FACTURACION.search(query_lower):
             query_type = "facturacion"
             rows = get_cliente_360(user_query, engine)
             rows = format_data_for_claude_360(rows, query_type)
             logger.info(f"🔍 Detectado: facturacion 360° con keywords - rows: {len(rows)}")
 
        # 3. ✅ CONSULTAS COMPLEJAS SIN CLAUDE
-        elif any(w in query_lower for w in ["comparar", "compare", "vs", "ranking", "clusters", "analisis", "estadisticas", "mercado", "completo", "datos completos"]):
-            from jarvis_360_integration import query_compleja_sin_claude_handler_puro
-            complex_result, status_code = query_compleja_sin_claude_handler_puro(user_query, engine)
-            return safe_jsonify(complex_result), status_code
+        elif CLAVES_QUERY_COMPLEJA.search(query_lower):
+            from jarvis_360_integration import query_compleja_sin_claude_handler
+            complex_result = query_compleja_sin_claude_handler(user_query, engine, despues_de=despues_de)
+            return safe_jsonify(complex_result), 200
         
         else:
             from jarvis_360_integration import es_consulta_de_cliente
@@ -818,7 +896,7 @@ def query(user_id):
             
             if cliente_detectado:
                 query_type = "facturacion"
-                rows = get_cliente_360(user_query, engine)
+                rows = get_cliente_360(user_query, engine, cliente_info=cliente_detectado)
                 rows = format_data_for_claude_360(rows, query_type)
                 logger.info(f"🔍 Detectado: cliente automático '{cliente_detectado['nombre']}' - rows: {len(rows)}")
             else:
@@ -930,10 +1008,14 @@ def query(user_id):
             if bd_session:
                 bd_session.close()
             
-        return safe_jsonify({
+        respuesta = {
             "success": True,
             "responses": responses
-        }), 200
+        }
+        if siguiente:
+            respuesta["siguiente"] = siguiente
+        
+        return safe_jsonify(respuesta), 200
         
     except Exception as e:
         logger.error(f"Error en query: {e}")
@@ -1250,6 +1332,76 @@ def get_feedback_categories(user_id):
     except Exception as e:
         return safe_jsonify({'error': str(e)}), 500
 
+@app.route('/api/trainer/aliases', methods=['POST'])
+@token_required
+def add_trainer_alias(user_id):
+    """
+    Agregar alias o regla negativa de identificación de clientes (sin deploy)
+    Alias:    {"anunciante_id": 12, "nombre_alias": "cerve", "confianza": 95}
+    Negativo: {"tipo": "negativo", "patron_query": "tigo", "patron_nombre": "tigo sports"}
+    """
+    try:
+        session = Session()
+        user = session.query(User).filter_by(id=user_id).first()
+        username = user.username if user else 'unknown'
+        session.close()
+        
+        if not user or user.role != 'trainer':
+            return safe_jsonify({'error': 'Solo trainers pueden agregar aliases'}), 403
+        
+        data = request.json or {}
+        tipo = data.get('tipo', 'alias')
+        
+        if tipo == 'negativo':
+            patron_query = (data.get('patron_query') or '').strip().lower()
+            patron_nombre = (data.get('patron_nombre') or '').strip().lower()
+            if not patron_query or not patron_nombre:
+                return safe_jsonify({'error': 'patron_query y patron_nombre son requeridos'}), 400
+            
+            with transaccion(engine) as conn:
+                conn.execute(text("""
+                    INSERT INTO dim_anunciante_alias_negativo (patron_query, patron_nombre, fuente, created_by)
+                    VALUES (:patron_query, :patron_nombre, 'trainer', :created_by)
+                    ON CONFLICT (patron_query, patron_nombre) DO NOTHING
+                """), {'patron_query': patron_query, 'patron_nombre': patron_nombre, 'created_by': username})
+            
+            details = f"Regla negativa: '{patron_query}' ≠ '{patron_nombre}'"
+        
+        else:
+            anunciante_id = data.get('anunciante_id')
+            nombre_alias = (data.get('nombre_alias') or '').strip()
+            confianza = int(data.get('confianza', 100))
+            if not anunciante_id or not nombre_alias:
+                return safe_jsonify({'error': 'anunciante_id y nombre_alias son requeridos'}), 400
+            
+            with transaccion(engine) as conn:
+                # created_at se actualiza para que el matcher detecte el cambio
+                conn.execute(text("""
+                    INSERT INTO dim_anunciante_aliases (anunciante_id, nombre_alias, fuente, confianza, created_by)
+                    VALUES (:anunciante_id, :nombre_alias, 'trainer', :confianza, :created_by)
+                    ON CONFLICT (nombre_alias) DO UPDATE SET
+                        anunciante_id = EXCLUDED.anunciante_id,
+                        fuente = EXCLUDED.fuente,
+                        confianza = EXCLUDED.confianza,
+                        created_by = EXCLUDED.created_by,
+                        created_at = NOW()
+                """), {'anunciante_id': anunciante_id, 'nombre_alias': nombre_alias,
+                       'confianza': confianza, 'created_by': username})
+            
+            details = f"Alias: '{nombre_alias}' → anunciante {anunciante_id} (confianza {confianza})"
+        
+        # Este proceso recarga de inmediato; los demás workers reciben el NOTIFY del trigger
+        invalidar_matcher_aliases()
+        invalidar_extractor_menciones()
+        
+        log_audit(user_id, username, 'ALIAS', details=details, ip_address=request.remote_addr)
+        
+        return safe_jsonify({'success': True, 'tipo': tipo, 'detalle': details}), 201
+        
+    except Exception as e:
+        logger.error(f"Error agregando alias: {e}")
+        return safe_jsonify({'error': str(e)}), 500
+
 @app.route('/api/trainer/upload', methods=['POST'])
 @token_required
 def upload_excel(user_id):
@@ -1290,7 +1442,7 @@ def upload_excel(user_id):
         
         # NUEVO: Verificar si tabla ya existe ANTES de validar 'id'
         table_exists = False
-        with engine.connect() as conn:
+        with conexion(engine) as conn:
             stmt = text(f"SELECT 1 FROM information_schema.tables WHERE table_name = '{table_name}'")
             result = conn.execute(stmt).first()
             table_exists = result is not None
@@ -1305,16 +1457,13 @@ def upload_excel(user_id):
             # Tabla existe: NO exige 'id'
             logger.info(f"✅ Tabla {table_name} existe, omitiendo validación de 'id'")
         
-        # NUEVO: Forzar rollback de transacciones previas
-        try:
-            with engine.connect() as conn:
-                conn.execute(text("ROLLBACK"))
-        except:
-            pass
+        # La sesión usa la misma conexión del request: cerrarla para que el DDL y los INSERT
+        # no queden dentro de su transacción
+        session.close()
         
         # Crear tabla o agregar datos
         try:
-            with engine.connect() as conn:
+            with conexion(engine) as conn:
                 rows_inserted = 0
                 errors = []
                 
@@ -1375,6 +1524,7 @@ def upload_excel(user_id):
                 meta_session.add(dynamic_table)
                 meta_session.commit()
                 meta_session.close()
+                invalidar_tablas_dinamicas()
             except Exception as meta_err:
                 logger.error(f"Error guardando metadata: {meta_err}")
         
@@ -1682,6 +1832,24 @@ def get_audit_logs(user_id):
         logger.error(f"Error obteniendo logs: {e}")
         return safe_jsonify({'error': str(e)}), 500
 
+@app.route('/api/trainer/cache-360', methods=['GET'])
+@token_required
+def get_cache_360_stats(user_id):
+    """Hits/misses del cache 360° de este proceso (ver cache_360.py)"""
+    try:
+        session = Session()
+        user = session.query(User).filter_by(id=user_id).first()
+        session.close()
+        
+        if not user or user.role != 'trainer':
+            return safe_jsonify({'error': 'Solo trainers pueden ver el cache'}), 403
+        
+        return safe_jsonify({'success': True, 'cache_360': get_estadisticas_cache_360()}), 200
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas de cache: {e}")
+        return safe_jsonify({'error': str(e)}), 500
+
 @app.route('/api/trainer/tables', methods=['GET'])
 @token_required
 
@@ -1708,7 +1876,7 @@ def get_tables(user_id):
         valid_tables = []
         for t in tables_from_db:
             try:
-                with engine.connect() as conn:
+                with conexion(engine) as conn:
                     stmt = text(f"SELECT 1 FROM information_schema.tables WHERE table_name = '{t.table_name}'")
                     exists = conn.execute(stmt).first()
                     if exists:
@@ -1758,7 +1926,7 @@ def export_template(user_id):
             return safe_jsonify({'error': 'table_name requerido'}), 400
         
         # Obtener columnas de la tabla de PostgreSQL
-        with engine.connect() as conn:
+        with conexion(engine) as conn:
             stmt = text(f"""
                 SELECT column_name 
                 FROM information_schema.columns 
@@ -1890,7 +2058,9 @@ def query_direct():
         if not any(word in query for word in ['top', 'ranking', 'clientes', 'principal']):
             return jsonify({"error": "Solo rankings directos"}), 400
         
-        with engine.connect() as conn:
+        # Solo facturas positivas por cliente_original del ERP: las cifras de abajo se verifican contra
+        # esta consulta, no contra el ranking por anunciante de ranking_clientes (que neta las notas de crédito)
+        with conexion(engine) as conn:
             stmt = text("""
                 SELECT 
                     cliente_original,
@@ -1905,46 +2075,46 @@ def query_direct():
                 LIMIT 10
             """)
             rows = conn.execute(stmt).fetchall()
-            
-            # Crear respuesta directa HTML
-            html_response = """
-            <div style="font-family: Arial, sans-serif; margin: 20px;">
-            <h2>🏆 Top 10 Clientes por Facturación 2025 (DATOS DIRECTOS BD)</h2>
-            <table style="border-collapse: collapse; width: 100%; margin-top: 20px;">
-            <tr style="background-color: #f0f0f0; border: 1px solid #ddd;">
-                <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">#</th>
-                <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">Cliente</th>
-                <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Registros</th>
-                <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Facturación (Gs)</th>
+        
+        # Crear respuesta directa HTML
+        html_response = """
+        <div style="font-family: Arial, sans-serif; margin: 20px;">
+        <h2>🏆 Top 10 Clientes por Facturación 2025 (DATOS DIRECTOS BD)</h2>
+        <table style="border-collapse: collapse; width: 100%; margin-top: 20px;">
+        <tr style="background-color: #f0f0f0; border: 1px solid #ddd;">
+            <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">#</th>
+            <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">Cliente</th>
+            <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Registros</th>
+            <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Facturación (Gs)</th>
+        </tr>
+        """
+        
+        for i, row in enumerate(rows, 1):
+            html_response += f"""
+            <tr style="border: 1px solid #ddd;">
+                <td style="padding: 10px; border: 1px solid #ddd;">{i}</td>
+                <td style="padding: 10px; border: 1px solid #ddd;">{row[0]}</td>
+                <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{row[1]:,}</td>
+                <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{float(row[2]):,.0f}</td>
             </tr>
             """
-            
-            for i, row in enumerate(rows, 1):
-                html_response += f"""
-                <tr style="border: 1px solid #ddd;">
-                    <td style="padding: 10px; border: 1px solid #ddd;">{i}</td>
-                    <td style="padding: 10px; border: 1px solid #ddd;">{row[0]}</td>
-                    <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{row[1]:,}</td>
-                    <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{float(row[2]):,.0f}</td>
-                </tr>
-                """
-            
-            html_response += """
-            </table>
-            <p style="margin-top: 20px; color: #666; font-size: 14px;">
-            ✅ Datos obtenidos directamente de la base de datos sin procesamiento de Claude.<br>
-            ✅ CERVEPAR debe mostrar: 1,136 registros y 26,057,164,652 Gs<br>
-            ✅ TELEFÓNICA debe mostrar: 186 registros y 9,213,656,412 Gs
-            </p>
-            </div>
-            """
-            
-            return jsonify({
-                "success": True,
-                "response": html_response,
-                "data_source": "BD_DIRECTA"
-            })
-            
+        
+        html_response += """
+        </table>
+        <p style="margin-top: 20px; color: #666; font-size: 14px;">
+        ✅ Datos obtenidos directamente de la base de datos sin procesamiento de Claude.<br>
+        ✅ CERVEPAR debe mostrar: 1,136 registros y 26,057,164,652 Gs<br>
+        ✅ TELEFÓNICA debe mostrar: 186 registros y 9,213,656,412 Gs
+        </p>
+        </div>
+        """
+        
+        return jsonify({
+            "success": True,
+            "response": html_response,
+            "data_source": "BD_DIRECTA"
+        })
+        
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1953,7 +2123,7 @@ def query_direct():
 def debug_connection():
     """Debug de conexión"""
     try:
-        with engine.connect() as conn:
+        with conexion(engine) as conn:
             # Info de conexión
             db_info = conn.execute(text("SELECT current_database(), current_user")).fetchone()
             
@@ -1989,7 +2159,9 @@ def query_direct_fixed():
         if not any(word in query for word in ['top', 'ranking', 'clientes', 'principal']):
             return jsonify({"error": "Solo rankings directos"}), 400
         
-        with engine.connect() as conn:
+        # Por cliente_original del ERP en todos los años: las cifras de abajo son las del debug,
+        # no las del ranking por anunciante de ranking_clientes
+        with conexion(engine) as conn:
             # LA MISMA CONSULTA QUE USA EL DEBUG QUE FUNCIONA
             stmt = text("""
                 SELECT 
@@ -2003,44 +2175,44 @@ def query_direct_fixed():
                 LIMIT 10
             """)
             rows = conn.execute(stmt).fetchall()
-            
-            html_response = """
-            <div style="font-family: Arial, sans-serif; margin: 20px;">
-            <h2>🏆 Top 10 Clientes CORREGIDO (MISMA CONSULTA QUE DEBUG)</h2>
-            <table style="border-collapse: collapse; width: 100%; margin-top: 20px;">
-            <tr style="background-color: #f0f0f0; border: 1px solid #ddd;">
-                <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">#</th>
-                <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">Cliente</th>
-                <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Registros</th>
-                <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Facturación (Gs)</th>
+        
+        html_response = """
+        <div style="font-family: Arial, sans-serif; margin: 20px;">
+        <h2>🏆 Top 10 Clientes CORREGIDO (MISMA CONSULTA QUE DEBUG)</h2>
+        <table style="border-collapse: collapse; width: 100%; margin-top: 20px;">
+        <tr style="background-color: #f0f0f0; border: 1px solid #ddd;">
+            <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">#</th>
+            <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">Cliente</th>
+            <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Registros</th>
+            <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Facturación (Gs)</th>
+        </tr>
+        """
+        
+        for i, row in enumerate(rows, 1):
+            html_response += f"""
+            <tr style="border: 1px solid #ddd;">
+                <td style="padding: 10px; border: 1px solid #ddd;">{i}</td>
+                <td style="padding: 10px; border: 1px solid #ddd;">{row[0]}</td>
+                <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{row[1]:,}</td>
+                <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{float(row[2]):,.0f}</td>
             </tr>
             """
-            
-            for i, row in enumerate(rows, 1):
-                html_response += f"""
-                <tr style="border: 1px solid #ddd;">
-                    <td style="padding: 10px; border: 1px solid #ddd;">{i}</td>
-                    <td style="padding: 10px; border: 1px solid #ddd;">{row[0]}</td>
-                    <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{row[1]:,}</td>
-                    <td style="padding: 10px; text-align: right; border: 1px solid #ddd;">{float(row[2]):,.0f}</td>
-                </tr>
-                """
-            
-            html_response += """
-            </table>
-            <p style="margin-top: 20px; color: #666; font-size: 14px;">
-            ✅ CONSULTA CORREGIDA - Misma que funciona en debug<br>
-            ✅ Debería mostrar CERVEPAR: 1,136 registros, 26,057,164,652 Gs
-            </p>
-            </div>
-            """
-            
-            return jsonify({
-                "success": True,
-                "response": html_response,
-                "data_source": "BD_CORREGIDA"
-            })
-            
+        
+        html_response += """
+        </table>
+        <p style="margin-top: 20px; color: #666; font-size: 14px;">
+        ✅ CONSULTA CORREGIDA - Misma que funciona en debug<br>
+        ✅ Debería mostrar CERVEPAR: 1,136 registros, 26,057,164,652 Gs
+        </p>
+        </div>
+        """
+        
+        return jsonify({
+            "success": True,
+            "response": html_response,
+            "data_source": "BD_CORREGIDA"
+        })
+        
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
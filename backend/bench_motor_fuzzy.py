@@ -0,0 +1,111 @@
+"""
+BENCHMARK: Motor fuzzy por lotes vs loops por fila
+Compara el scoring de motor_fuzzy contra los loops originales
+(SequenceMatcher de buscar_fuzzy_estricto y fuzz.token_set_ratio de find_similar_feedback)
+con 1k, 10k y 100k nombres sintéticos. No usa la base de datos.
+
+Uso: python bench_motor_fuzzy.py
+"""
+
+import difflib
+import random
+import time
+
+from fuzzywuzzy import fuzz
+
+from motor_fuzzy import CorpusFuzzy, puntuar_lote, top_k
+
+TAMANOS = [1_000, 10_000, 100_000]
+QUERIES = ["cervepar", "tigo paraguay", "banco familar", "unilever de paraguay", "supersies"]
+
+PALABRAS = [
+    "cervepar", "cerveza", "diosa", "tigo", "sports", "paraguay", "banco", "familiar",
+    "nacional", "fomento", "unilever", "nestle", "personal", "envios", "coca", "cola",
+    "superseis", "telefonica", "celular", "alex", "puma", "energy", "brahma", "garcia",
+    "distribuidora", "del", "de", "s.a.", "s.a.e.", "srl", "grupo", "comercial", "industrial",
+]
+
+
+def generar_nombres(cantidad, semilla=42):
+    """Nombres de empresas sintéticos (deterministas)"""
+    rnd = random.Random(semilla)
+    nombres = []
+    for i in range(cantidad):
+        palabras = [rnd.choice(PALABRAS) for _ in range(rnd.randint(1, 4))]
+        nombres.append(" ".join(palabras).upper() + f" {i}")
+    return nombres
+
+
+def loop_sequence_matcher(query, nombres):
+    """Loop original: un SequenceMatcher por candidato"""
+    best_pos, best_score = None, 0
+    for pos, nombre in enumerate(nombres):
+        score = difflib.SequenceMatcher(None, query.lower(), nombre.lower()).ratio()
+        if score < 0.75:
+            continue
+        if score > best_score:
+            best_pos, best_score = pos, score
+    return best_pos, best_score
+
+
+def lote_ratio(query, corpus):
+    """Motor por lotes: una sola llamada para todo el corpus"""
+    scores = corpus.puntuar(query, score_cutoff=0.75)
+    mejores = top_k(scores, k=1, score_cutoff=0.75)
+    return mejores[0] if mejores else (None, 0)
+
+
+def loop_token_set(query, textos):
+    """Loop original de find_similar_feedback"""
+    best_pos, best_score = None, 0
+    for pos, texto in enumerate(textos):
+        score = fuzz.token_set_ratio(query.lower(), texto.lower())
+        if score > best_score:
+            best_pos, best_score = pos, score
+    return best_pos, best_score
+
+
+def lote_token_set(query, textos_lower):
+    """Motor por lotes con token_set_ratio"""
+    scores = puntuar_lote(query.lower(), textos_lower, scorer='token_set_ratio')
+    mejores = top_k(scores, k=1, score_cutoff=0.01)
+    return mejores[0] if mejores else (None, 0)
+
+
+def medir(funcion, *args):
+    """Tiempo promedio por query en milisegundos"""
+    inicio = time.perf_counter()
+    for query in QUERIES:
+        funcion(query, *args)
+    return (time.perf_counter() - inicio) / len(QUERIES) * 1000
+
+
+def main():
+    print("🧪 BENCHMARK MOTOR FUZZY")
+    print("=" * 72)
+    print(f"{'nombres':>9} | {'scorer':<16} | {'loop ms/q':>10} | {'lote ms/q':>10} | {'speedup':>8}")
+    print("-" * 72)
+
+    for tamano in TAMANOS:
+        nombres = generar_nombres(tamano)
+        nombres_lower = [n.lower() for n in nombres]
+
+        inicio = time.perf_counter()
+        corpus = CorpusFuzzy(nombres)
+        construccion_ms = (time.perf_counter() - inicio) * 1000
+
+        t_loop = medir(loop_sequence_matcher, nombres)
+        t_lote = medir(lote_ratio, corpus)
+        print(f"{tamano:>9,} | {'ratio':<16} | {t_loop:>10.2f} | {t_lote:>10.2f} | {t_loop / t_lote:>7.1f}x")
+
+        t_loop = medir(loop_token_set, nombres)
+        t_lote = medir(lote_token_set, nombres_lower)
+        print(f"{tamano:>9,} | {'token_set_ratio':<16} | {t_loop:>10.2f} | {t_lote:>10.2f} | {t_loop / t_lote:>7.1f}x")
+
+        print(f"{'':>9} | construcción del corpus: {construccion_ms:.1f} ms (una vez por proceso)")
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+BENCHMARK: Normalización de queries antes/después de normalizacion.py
+Compara los normalizadores originales (re.sub por stopword con patrones armados en cada llamada)
+contra el pipeline precompilado, sin memo (cache limpio) y con memo LRU (queries repetidas).
+No usa la base de datos.
+
+Uso: python bench_normalizacion.py
+"""
+
+import re
+import time
+
+import normalizacion
+
+QUERIES = [
+    "Cuánto facturó CERVEPAR en 2024?",
+    "datos de unilever de paraguay",
+    "perfil y cluster de Nestlé Paraguay S.A.",
+    "cuanto invirtió tigo en tv",
+    "ranking dnit de banco familiar s.a.e.c.a.",
+    "información de coca cola paresa",
+    "Che, SUPERSEIS tiene departamento de marketing?",
+    "cultura de telefonica celular del paraguay",
+]
+REPETICIONES = 2000
+
+
+def normalizar_nombre_cliente_original(query):
+    """Versión original de jarvis_360_integration"""
+    stopwords = [
+        'cuanto', 'cuánto', 'facturo', 'facturó', 'invirtió', 'invirti',
+        'datos', 'informacion', 'perfil', 'de', 'la', 'el', 'en', 'y',
+        'tv', 'television', 'facturacion', 'ranking', 'cluster', 'cultura'
+    ]
+    query_clean = query.lower().strip()
+    for word in stopwords:
+        query_clean = re.sub(rf'\b{word}\b', '', query_clean, flags=re.IGNORECASE)
+    query_clean = re.sub(r'[^\w\s]', ' ', query_clean)
+    query_clean = re.sub(r'\s+', ' ', query_clean).strip()
+    return query_clean
+
+
+def limpiar_query_original(query):
+    """Versión original de jarvis_360_integration"""
+    stopwords = ['cuanto', 'cuánto', 'facturo', 'facturó', 'invirtió', 'invirti', 'de', 'la', 'el', 'en', 'y', 'tv', 'television']
+    query_clean = query.lower().strip()
+    for word in stopwords:
+        query_clean = query_clean.replace(word, ' ')
+    query_clean = re.sub(r'\s+', ' ', query_clean).strip()
+    return query_clean
+
+
+def palabras_cliente_original(query):
+    """Versión original de app.get_facturacion_enriched"""
+    query_limpio = query.replace('?', '').replace('!', '').replace(',', '').lower()
+    stopwords = ['cuanto', 'cuánto', 'facturo', 'facturó', 'facturacion', 'facturación',
+                 'de', 'la', 'el', 'en', 'y', 'o', 'para', 'con', 'a', 'un', 'una',
+                 'invirtio', 'invirti', 'invertir', 'inversion']
+    return [p for p in query_limpio.split() if p not in stopwords and len(p) > 2]
+
+
+def medir(funcion, limpiar_cache=None):
+    """Microsegundos por query"""
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        if limpiar_cache:
+            limpiar_cache()
+        for query in QUERIES:
+            funcion(query)
+    return (time.perf_counter() - inicio) / (REPETICIONES * len(QUERIES)) * 1_000_000
+
+
+def limpiar_caches():
+    for funcion in (normalizacion.normalizar_texto, normalizacion.normalizar_nombre_cliente,
+                    normalizacion.limpiar_query, normalizacion.palabras_cliente):
+        funcion.cache_clear()
+
+
+def main():
+    print("🧪 BENCHMARK NORMALIZACIÓN")
+    print("=" * 78)
+    print(f"{'función':<28} | {'original µs':>11} | {'sin memo µs':>11} | {'con memo µs':>11} | {'speedup':>7}")
+    print("-" * 78)
+
+    casos = [
+        ("normalizar_nombre_cliente", normalizar_nombre_cliente_original, normalizacion.normalizar_nombre_cliente),
+        ("limpiar_query", limpiar_query_original, normalizacion.limpiar_query),
+        ("palabras_cliente", palabras_cliente_original, normalizacion.palabras_cliente),
+    ]
+
+    for nombre, original, nueva in casos:
+        t_original = medir(original)
+        t_frio = medir(nueva, limpiar_cache=limpiar_caches)
+        limpiar_caches()
+        t_memo = medir(nueva)
+        print(f"{nombre:<28} | {t_original:>11.2f} | {t_frio:>11.2f} | {t_memo:>11.2f} | {t_original / t_memo:>6.0f}x")
+
+    print("=" * 78)
+    print("Ejemplos:")
+    for query in QUERIES[:4]:
+        print(f"  '{query}' → '{normalizacion.normalizar_nombre_cliente(query)}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,18 @@ from fuzzywuzzy import fuzz
 import logging
 from decimal import Decimal
 
+from normalizacion import normalizar_nombre
+from totales_mercado import get_totales_mercado
+from unidad_trabajo import conexion
+
 logger = logging.getLogger(__name__)
 
+# Similitud mínima (0-100) para aceptar un match de trigramas en buscar_anunciante
+UMBRAL_SIMILITUD_FUZZY = 60
+
+# Marca de "anunciante todavía no buscado" (None = se buscó y no existe)
+_SIN_BUSCAR = object()
+
 def convert_decimals_to_float(data):
     """Convierte objetos Decimal a float para serialización JSON"""
     if isinstance(data, list):
@@ -23,16 +33,43 @@ def convert_decimals_to_float(data):
 
 def buscar_anunciante(nombre_cliente, engine):
     """
-    Busca anunciante_id usando fuzzy matching
+    Busca anunciante_id: primero exacto por nombre normalizado (índices btree, ver 06_nombre_normalizado.sql),
+    después fuzzy matching con pg_trgm (ver 04_busqueda_trigram.sql)
+    Las condiciones LIKE usan los índices GIN de trigramas si existen; entre los nombres que contienen
+    el buscado gana el más corto (el que menos agrega), así no hace falta pg_trgm para ordenarlos
     """
     try:
-        with engine.connect() as conn:
-            # Buscar directo primero
+        with conexion(engine) as conn:
+            nombre_upper = nombre_cliente.upper()
+            
+            # Exacto por nombre normalizado ("Nestlé S.A." = "NESTLE"): nombre canónico y luego aliases
+            result = conn.execute(text("""
+                SELECT anunciante_id, nombre_canonico
+                FROM (
+                    SELECT anunciante_id, nombre_canonico, 1 as prioridad, 100 as confianza
+                    FROM dim_anunciante
+                    WHERE nombre_normalizado = :nombre_normalizado
+                    UNION ALL
+                    SELECT a.anunciante_id, a.nombre_canonico, 2, alias.confianza
+                    FROM dim_anunciante_aliases alias
+                    JOIN dim_anunciante a ON alias.anunciante_id = a.anunciante_id
+                    WHERE alias.nombre_normalizado = :nombre_normalizado
+                ) exactos
+                ORDER BY prioridad, confianza DESC, anunciante_id
+                LIMIT 1
+            """), {'nombre_normalizado': normalizar_nombre(nombre_cliente)}).fetchone()
+            
+            if result:
+                return result._asdict()
+            
+            # Buscar directo
             result = conn.execute(text("""
                 SELECT anunciante_id, nombre_canonico 
                 FROM dim_anunciante 
-                WHERE UPPER(nombre_canonico) LIKE :nombre
-            """), {'nombre': f'%{nombre_cliente.upper()}%'}).fetchone()
+                WHERE UPPER(nombre_canonico) LIKE :patron
+                ORDER BY LENGTH(nombre_canonico), POSITION(:nombre IN UPPER(nombre_canonico)), anunciante_id
+                LIMIT 1
+            """), {'patron': f'%{nombre_upper}%', 'nombre': nombre_upper}).fetchone()
             
             if result:
                 return result._asdict()
@@ -42,10 +79,23 @@ def buscar_anunciante(nombre_cliente, engine):
                 SELECT a.anunciante_id, a.nombre_canonico
                 FROM dim_anunciante_aliases alias
                 JOIN dim_anunciante a ON alias.anunciante_id = a.anunciante_id
-                WHERE UPPER(alias.nombre_alias) LIKE :nombre
-                ORDER BY alias.confianza DESC
+                WHERE UPPER(alias.nombre_alias) LIKE :patron
+                ORDER BY LENGTH(alias.nombre_alias), alias.confianza DESC,
+                         POSITION(:nombre IN UPPER(alias.nombre_alias)), alias.alias_id
                 LIMIT 1
-            """), {'nombre': f'%{nombre_cliente.upper()}%'}).fetchone()
+            """), {'patron': f'%{nombre_upper}%', 'nombre': nombre_upper}).fetchone()
+            
+            if result:
+                return result._asdict()
+            
+            # Último recurso: similitud de trigramas sobre aliases (typos, palabras cambiadas)
+            result = conn.execute(text("""
+                SELECT f.anunciante_id, a.nombre_canonico
+                FROM buscar_anunciante_fuzzy(:nombre, :umbral) f
+                JOIN dim_anunciante a ON f.anunciante_id = a.anunciante_id
+                ORDER BY f.similitud DESC
+                LIMIT 1
+            """), {'nombre': nombre_cliente, 'umbral': UMBRAL_SIMILITUD_FUZZY}).fetchone()
             
             if result:
                 return result._asdict()
@@ -56,19 +106,32 @@ def buscar_anunciante(nombre_cliente, engine):
     return None
 
 
-def get_facturacion_cliente(cliente_nombre, engine):
+def resolver_anunciante(anunciante, cliente_nombre, engine):
+    """
+    Anunciante ya resuelto en el request, o buscarlo si todavía no se buscó
+    Permite resolver una sola vez y pasar el resultado a todos los get_*_cliente
+    """
+    if anunciante is _SIN_BUSCAR:
+        return buscar_anunciante(cliente_nombre, engine)
+    return anunciante
+
+
+def get_facturacion_cliente(cliente_nombre, engine, anunciante=_SIN_BUSCAR):
     """
     Obtiene facturación de un cliente con búsqueda flexible
     """
     try:
         # Buscar anunciante_id
-        anunciante = buscar_anunciante(cliente_nombre, engine)
+        anunciante = resolver_anunciante(anunciante, cliente_nombre, engine)
         
         if not anunciante:
             logger.warning(f"Cliente {cliente_nombre} no encontrado en dim_anunciante")
             return []
         
-        with engine.connect() as conn:
+        # Total del mercado cacheado por data_version (totales_mercado.py)
+        total_mercado = get_totales_mercado(engine)['total']
+        
+        with conexion(engine) as conn:
             result = conn.execute(text("""
                 SELECT 
                     a.nombre_canonico as cliente,
@@ -77,7 +140,7 @@ def get_facturacion_cliente(cliente_nombre, engine):
                     ROUND(AVG(f.facturacion), 2) as promedio_mensual,
                     ROUND(
                         SUM(f.facturacion) * 100.0 / 
-                        (SELECT SUM(facturacion) FROM fact_facturacion), 
+                        NULLIF(CAST(:total_mercado AS NUMERIC), 0), 
                         2
                     ) as market_share,
                     MIN(f.anio) as anio_inicio,
@@ -86,7 +149,7 @@ def get_facturacion_cliente(cliente_nombre, engine):
                 JOIN dim_anunciante a ON f.anunciante_id = a.anunciante_id
                 WHERE f.anunciante_id = :anunciante_id
                 GROUP BY a.anunciante_id, a.nombre_canonico
-            """), {'anunciante_id': anunciante['anunciante_id']}).fetchall()
+            """), {'anunciante_id': anunciante['anunciante_id'], 'total_mercado': total_mercado}).fetchall()
             
             return convert_decimals_to_float([dict(row._mapping) for row in result])
             
@@ -95,14 +158,15 @@ def get_facturacion_cliente(cliente_nombre, engine):
         return []
 
 
-def get_inversion_medios_cliente(cliente_nombre, engine, filtros=None):
+def get_inversion_medios_cliente(cliente_nombre, engine, filtros=None, anunciante=_SIN_BUSCAR):
     """
     Obtiene inversión en medios de un cliente con filtros opcionales
     filtros = {'medio': 'TV'} para filtrar por medio específico
+    anunciante: resultado de buscar_anunciante ya obtenido en el request (opcional)
     """
     try:
         # Buscar anunciante_id
-        anunciante = buscar_anunciante(cliente_nombre, engine)
+        anunciante = resolver_anunciante(anunciante, cliente_nombre, engine)
         
         if not anunciante:
             # Si no está en dim_anunciante, buscar directo en fact_inversion_medios
@@ -116,7 +180,7 @@ def get_inversion_medios_cliente(cliente_nombre, engine, filtros=None):
                 where_clause += " AND UPPER(medio) LIKE :filtro_medio"
                 params['filtro_medio'] = f'%{filtros["medio"].upper()}%'
             
-            with engine.connect() as conn:
+            with conexion(engine) as conn:
                 result = conn.execute(text(f"""
                     SELECT 
                         nombre_anunciante as cliente,
@@ -133,7 +197,7 @@ def get_inversion_medios_cliente(cliente_nombre, engine, filtros=None):
                 
                 return convert_decimals_to_float([dict(row._mapping) for row in result])
         
-        # Si existe en dim_anunciante, buscar por anunciante_id
+        # Si existe en dim_anunciante, leer el cubo agregado (11_cubo_inversion_medios.sql)
         where_clause = "anunciante_id = :anunciante_id"
         params = {'anunciante_id': anunciante['anunciante_id']}
         
@@ -142,16 +206,16 @@ def get_inversion_medios_cliente(cliente_nombre, engine, filtros=None):
             where_clause += " AND UPPER(medio) LIKE :filtro_medio"
             params['filtro_medio'] = f'%{filtros["medio"].upper()}%'
         
-        with engine.connect() as conn:
+        with conexion(engine) as conn:
             result = conn.execute(text(f"""
                 SELECT 
                     :nombre_cliente as cliente,
                     medio,
-                    COUNT(*) as registros,
+                    SUM(registros) as registros,
                     ROUND(SUM(monto_usd), 2) as inversion_usd,
                     ROUND(SUM(monto_gs), 2) as inversion_gs,
                     2024 as anio
-                FROM fact_inversion_medios
+                FROM fact_inversion_medios_cubo
                 WHERE {where_clause}
                 GROUP BY medio
                 ORDER BY inversion_usd DESC
@@ -164,17 +228,17 @@ def get_inversion_medios_cliente(cliente_nombre, engine, filtros=None):
         return []
 
 
-def get_ranking_dnit_cliente(cliente_nombre, engine):
+def get_ranking_dnit_cliente(cliente_nombre, engine, anunciante=_SIN_BUSCAR):
     """
     Obtiene ranking DNIT de un cliente
     """
     try:
         # Buscar anunciante_id primero
-        anunciante = buscar_anunciante(cliente_nombre, engine)
+        anunciante = resolver_anunciante(anunciante, cliente_nombre, engine)
         
         if anunciante:
             # Buscar por anunciante_id si existe
-            with engine.connect() as conn:
+            with conexion(engine) as conn:
                 result = conn.execute(text("""
                     SELECT 
                         d.ranking,
@@ -189,8 +253,24 @@ def get_ranking_dnit_cliente(cliente_nombre, engine):
                 if result:
                     return convert_decimals_to_float([dict(row._mapping) for row in result])
         
-        # Si no encuentra por anunciante_id, buscar directo por nombre
-        with engine.connect() as conn:
+        # Si no encuentra por anunciante_id, buscar directo por nombre (exacto normalizado, luego parcial)
+        with conexion(engine) as conn:
+            result = conn.execute(text("""
+                SELECT 
+                    ranking,
+                    razon_social as cliente,
+                    aporte_gs,
+                    ruc,
+                    'direct_match' as status
+                FROM dim_posicionamiento_dnit
+                WHERE nombre_normalizado = :nombre_normalizado
+                ORDER BY ranking
+                LIMIT 1
+            """), {'nombre_normalizado': normalizar_nombre(cliente_nombre)}).fetchall()
+            
+            if result:
+                return convert_decimals_to_float([dict(row._mapping) for row in result])
+            
             result = conn.execute(text("""
                 SELECT 
                     ranking,
@@ -211,19 +291,19 @@ def get_ranking_dnit_cliente(cliente_nombre, engine):
         return []
 
 
-def get_perfil_adlens_cliente(cliente_nombre, engine):
+def get_perfil_adlens_cliente(cliente_nombre, engine, anunciante=_SIN_BUSCAR):
     """
     Obtiene perfil AdLens de un cliente
     """
     try:
         # Buscar anunciante_id
-        anunciante = buscar_anunciante(cliente_nombre, engine)
+        anunciante = resolver_anunciante(anunciante, cliente_nombre, engine)
         
         if not anunciante:
             logger.warning(f"Cliente {cliente_nombre} no encontrado para perfil AdLens")
             return []
         
-        with engine.connect() as conn:
+        with conexion(engine) as conn:
             result = conn.execute(text("""
                 SELECT 
                     p.*,
@@ -0,0 +1,132 @@
+"""
+JARVIS - Cache de filas 360°
+Guarda las filas de consulta_360 por (anunciante_id, data_version): entre cargas los datos no
+cambian y los mismos clientes se consultan miles de veces. Cada carga incrementa data_version
+(refrescar_resumenes_jarvis(), ver 09_data_version.sql) y las entradas anteriores dejan de usarse
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from escucha_cache import escucha_activa
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+# Entradas máximas (una fila por anunciante); se descartan las menos usadas
+MAX_ENTRADAS = 5000
+
+# Cada cuánto se relee data_version
+# (solo sin escucha de NOTIFY: con escucha_cache activa la versión se invalida al cambiar)
+INTERVALO_VERIFICACION_SEG = 30
+
+_filas = OrderedDict()
+_version = None
+_ultima_verificacion = 0.0
+_estadisticas = {'hits': 0, 'misses': 0, 'invalidaciones': 0}
+_cache_lock = threading.Lock()
+
+
+def _leer_version(db_engine):
+    """data_version actual (None si falta 09_data_version.sql: el cache queda desactivado)"""
+    try:
+        with conexion(db_engine) as conn:
+            return conn.execute(text("SELECT data_version FROM jarvis_data_version WHERE id = 1")).scalar()
+    except Exception as e:
+        logger.warning(f"⚠️ Sin data_version, cache 360° desactivado: {e}")
+        return None
+
+
+def get_data_version(db_engine):
+    """
+    Versión de los datos cargados
+    Sin escucha de NOTIFY, como máximo cada INTERVALO_VERIFICACION_SEG se relee de la base
+    """
+    global _version, _ultima_verificacion
+
+    if _ultima_verificacion and (
+        escucha_activa() or time.monotonic() - _ultima_verificacion < INTERVALO_VERIFICACION_SEG
+    ):
+        return _version
+
+    version = _leer_version(db_engine)
+
+    with _cache_lock:
+        if version != _version:
+            if _version is not None:
+                logger.info(f"🔄 data_version {_version} → {version}, cache 360° descartado")
+            # Las entradas de la versión anterior ya no se pueden pedir
+            _filas.clear()
+            _version = version
+        _ultima_verificacion = time.monotonic()
+
+    return version
+
+
+def get_filas_cacheadas(db_engine, anunciante_ids, consultar):
+    """
+    Filas 360° desde el cache; las que faltan se piden juntas con consultar(db_engine, ids)
+    Retorna {anunciante_id: fila} como consulta_360.get_filas_360
+    """
+    version = get_data_version(db_engine)
+    if version is None:
+        return consultar(db_engine, anunciante_ids)
+
+    filas = {}
+    faltantes = []
+    with _cache_lock:
+        for anunciante_id in anunciante_ids:
+            clave = (anunciante_id, version)
+            if clave in _filas:
+                _filas.move_to_end(clave)
+                filas[anunciante_id] = _filas[clave]
+            else:
+                faltantes.append(anunciante_id)
+        _estadisticas['hits'] += len(filas)
+        _estadisticas['misses'] += len(faltantes)
+
+    if faltantes:
+        nuevas = consultar(db_engine, faltantes)
+        filas.update(nuevas)
+
+        with _cache_lock:
+            # Si la versión cambió mientras se consultaba, no guardar filas de dudosa versión
+            if version == _version:
+                for anunciante_id, fila in nuevas.items():
+                    _filas[(anunciante_id, version)] = fila
+                while len(_filas) > MAX_ENTRADAS:
+                    _filas.popitem(last=False)
+
+    return filas
+
+
+def invalidar_cache_360():
+    """Descartar la versión conocida para que se relea en la próxima consulta"""
+    global _version, _ultima_verificacion
+
+    with _cache_lock:
+        _version = None
+        _ultima_verificacion = 0.0
+        _filas.clear()
+        _estadisticas['invalidaciones'] += 1
+
+    logger.info("🔄 Cache 360° invalidado")
+
+
+def get_estadisticas_cache_360():
+    """Contadores de hits/misses del proceso"""
+    with _cache_lock:
+        consultas = _estadisticas['hits'] + _estadisticas['misses']
+        return {
+            'data_version': _version,
+            'entradas': len(_filas),
+            'max_entradas': MAX_ENTRADAS,
+            'hits': _estadisticas['hits'],
+            'misses': _estadisticas['misses'],
+            'hit_rate': round(_estadisticas['hits'] / consultas, 4) if consultas else 0.0,
+            'invalidaciones': _estadisticas['invalidaciones'],
+        }
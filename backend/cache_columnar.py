@@ -0,0 +1,268 @@
+"""
+JARVIS - Cache columnar de hechos (opcional)
+Carga fact_facturacion en arrays NumPy con cliente, división, arena y cluster codificados como
+diccionario (códigos enteros + categorías). Las sumas por grupo, top N y filtros se resuelven con
+operaciones vectorizadas (bincount / máscaras) sin ir a Postgres.
+
+Se activa con JARVIS_CACHE_COLUMNAR=1. La carga corre en un hilo de fondo al arrancar y cada vez que
+cambia data_version (09_data_version.sql); mientras carga, get_hechos_columnares() devuelve None y los
+helpers (ranking_clientes, totales_mercado) siguen consultando la base.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from cache_360 import get_data_version
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLUMNAR_HABILITADO = os.getenv('JARVIS_CACHE_COLUMNAR', '').lower() in ('1', 'true', 'si')
+
+# Código de "sin valor" en las columnas codificadas
+SIN_CODIGO = -1
+
+_SQL_VERSION = text("SELECT data_version FROM jarvis_data_version WHERE id = 1")
+
+# Cliente = anunciante (nombre canónico) o, sin anunciante_id, el cliente_original (igual que ranking_clientes)
+_SQL_FACTURACION = text("""
+    SELECT
+        CASE
+            WHEN f.anunciante_id IS NOT NULL THEN 'a' || f.anunciante_id
+            ELSE 'c' || NULLIF(BTRIM(f.cliente_original), '')
+        END as clave,
+        f.anunciante_id,
+        COALESCE(a.nombre_canonico, NULLIF(BTRIM(f.cliente_original), ''), 'ANUNCIANTE ' || f.anunciante_id) as cliente,
+        COALESCE(f.anio, EXTRACT(YEAR FROM f.fecha_fact)::INTEGER) as anio,
+        NULLIF(f.division, '') as division,
+        NULLIF(f.arena, '') as arena,
+        COALESCE(f.facturacion, 0)::FLOAT as facturacion,
+        COALESCE(f.revenue, 0)::FLOAT as revenue
+    FROM fact_facturacion f
+    LEFT JOIN dim_anunciante a ON a.anunciante_id = f.anunciante_id
+""")
+
+_SQL_PERFILES = text("SELECT anunciante_id, cluster FROM dim_anunciante_perfil_tipado")
+
+_hechos = None
+_cargando = False
+_cache_lock = threading.Lock()
+
+
+def _codificar(serie):
+    """(códigos int32 con SIN_CODIGO para NULL, categorías)"""
+    codigos, categorias = pd.factorize(serie, use_na_sentinel=True)
+    return codigos.astype(np.int32), np.asarray(categorias, dtype=object)
+
+
+def _codigo(categorias, valor):
+    """Código de un valor en el diccionario (None si no existe: el filtro no coincide con nada)"""
+    posiciones = np.flatnonzero(categorias == valor)
+    return int(posiciones[0]) if len(posiciones) else None
+
+
+class HechosColumnares:
+    """
+    Facturación en arrays columnares de una data_version
+    Filtros admitidos: anio, division, arena, cluster (cualquier combinación)
+    """
+
+    def __init__(self, facturacion, perfiles, version):
+        self.version = version
+
+        # Perfil AdLens: cluster por anunciante
+        cluster_por_anunciante = dict(zip(perfiles['anunciante_id'], perfiles['cluster']))
+        self.anunciantes_con_perfil = frozenset(perfiles['anunciante_id'])
+
+        # Facturación
+        self.clave, _ = _codificar(facturacion['clave'])
+        por_cliente = facturacion[self.clave != SIN_CODIGO].groupby(self.clave[self.clave != SIN_CODIGO])
+        self.clientes = por_cliente['cliente'].min().to_numpy(dtype=object)
+        self.anunciante_cliente = np.array(
+            [int(a) if pd.notna(a) else None for a in por_cliente['anunciante_id'].max()], dtype=object
+        )
+        self.cliente_con_perfil = np.array([a in self.anunciantes_con_perfil for a in self.anunciante_cliente])
+        # Desempate alfabético del ranking (mismo orden que ORDER BY facturacion DESC, cliente)
+        self.orden_nombre = np.argsort(np.argsort(self.clientes.astype(str), kind='stable'))
+
+        self.anio = facturacion['anio'].fillna(0).to_numpy(dtype=np.int32)
+        self.division, self.divisiones = _codificar(facturacion['division'])
+        self.arena, self.arenas = _codificar(facturacion['arena'])
+        self.cluster, self.clusters = _codificar(facturacion['anunciante_id'].map(cluster_por_anunciante))
+        self.facturacion = facturacion['facturacion'].to_numpy(dtype=np.float64)
+        self.revenue = facturacion['revenue'].to_numpy(dtype=np.float64)
+
+    def _mascara(self, columnas, anio=None, division=None, arena=None, cluster=None):
+        """Máscara booleana de las filas que cumplen los filtros"""
+        mascara = np.ones(len(columnas['anio']), dtype=bool)
+        if anio is not None:
+            mascara &= columnas['anio'] == int(anio)
+        for nombre, valor, categorias in (('division', division, self.divisiones),
+                                          ('arena', arena, self.arenas),
+                                          ('cluster', cluster, self.clusters)):
+            if valor is None:
+                continue
+            codigo = _codigo(categorias, valor)
+            if codigo is None:
+                return np.zeros_like(mascara)
+            mascara &= columnas[nombre] == codigo
+        return mascara
+
+    def _columnas_facturacion(self):
+        return {'anio': self.anio, 'division': self.division, 'arena': self.arena, 'cluster': self.cluster}
+
+    def total_facturacion(self, **filtros):
+        """Facturación total del mercado (o de un corte)"""
+        return float(self.facturacion[self._mascara(self._columnas_facturacion(), **filtros)].sum())
+
+    def facturacion_por(self, dimension, **filtros):
+        """{valor: facturación} agrupando por anio, division, arena o cluster"""
+        mascara = self._mascara(self._columnas_facturacion(), **filtros)
+        if dimension == 'anio':
+            anios, inversa = np.unique(self.anio[mascara], return_inverse=True)
+            sumas = np.bincount(inversa, weights=self.facturacion[mascara], minlength=len(anios))
+            return {int(anio): float(suma) for anio, suma in zip(anios, sumas) if anio}
+
+        codigos, categorias = {
+            'division': (self.division, self.divisiones),
+            'arena': (self.arena, self.arenas),
+            'cluster': (self.cluster, self.clusters),
+        }[dimension]
+        con_valor = mascara & (codigos != SIN_CODIGO)
+        sumas = np.bincount(codigos[con_valor], weights=self.facturacion[con_valor], minlength=len(categorias))
+        return {categoria: float(suma) for categoria, suma in zip(categorias, sumas) if suma}
+
+    def top_clientes(self, limite=10, solo_con_perfil=False, despues_de=None, **filtros):
+        """
+        Top N clientes del corte, mismo formato que ranking_clientes.get_ranking
+        (posición DENSE_RANK y shares sobre toda la facturación del corte)
+        despues_de: {'posicion', 'cliente'} de la última fila de la página anterior
+        """
+        mascara = self._mascara(self._columnas_facturacion(), **filtros)
+        total = self.facturacion[mascara].sum()
+
+        con_cliente = mascara & (self.clave != SIN_CODIGO)
+        n_clientes = len(self.clientes)
+        facturacion = np.bincount(self.clave[con_cliente], weights=self.facturacion[con_cliente], minlength=n_clientes)
+        revenue = np.bincount(self.clave[con_cliente], weights=self.revenue[con_cliente], minlength=n_clientes)
+        registros = np.bincount(self.clave[con_cliente], minlength=n_clientes)
+
+        presentes = np.flatnonzero(registros)
+        orden = presentes[np.lexsort((self.orden_nombre[presentes], -facturacion[presentes]))]
+
+        # DENSE_RANK() OVER (ORDER BY facturacion DESC, cliente): la posición sube cuando cambia la
+        # facturación o el nombre (solo comparten posición dos claves con el mismo nombre y facturación)
+        nombres = self.clientes[orden]
+        cambios = (np.diff(facturacion[orden]) != 0) | (nombres[1:] != nombres[:-1])
+        posiciones = np.cumsum(np.r_[True, cambios]) if len(orden) else np.array([], dtype=int)
+        acumulada = np.cumsum(facturacion[orden])
+
+        if solo_con_perfil:
+            con_perfil = self.cliente_con_perfil[orden]
+            orden, posiciones, acumulada = orden[con_perfil], posiciones[con_perfil], acumulada[con_perfil]
+
+        if despues_de:
+            posicion = despues_de['posicion']
+            siguientes = (posiciones > posicion) | ((posiciones == posicion) & (self.clientes[orden] > despues_de['cliente']))
+            orden, posiciones, acumulada = orden[siguientes], posiciones[siguientes], acumulada[siguientes]
+
+        return [
+            {
+                'posicion': int(posicion),
+                'anunciante_id': self.anunciante_cliente[codigo],
+                'cliente': self.clientes[codigo],
+                'facturacion': float(facturacion[codigo]),
+                'revenue': float(revenue[codigo]),
+                'registros': int(registros[codigo]),
+                'market_share': float(facturacion[codigo] * 100.0 / total) if total else 0.0,
+                'share_acumulado': float(suma * 100.0 / total) if total else 0.0,
+            }
+            for codigo, posicion, suma in zip(orden[:limite], posiciones[:limite], acumulada[:limite])
+        ]
+
+    def estadisticas(self):
+        return {
+            'data_version': self.version,
+            'filas_facturacion': len(self.facturacion),
+            'clientes': len(self.clientes),
+            'memoria_mb': round(sum(
+                valor.nbytes for valor in vars(self).values() if isinstance(valor, np.ndarray)
+            ) / 1024 / 1024, 1),
+        }
+
+
+def cargar_hechos_columnares(db_engine):
+    """Leer los hechos en una sola foto de la base (REPEATABLE READ) junto con su data_version"""
+    inicio = time.perf_counter()
+
+    with conexion(db_engine) as conn:
+        conn = conn.execution_options(isolation_level='REPEATABLE READ')
+        version = conn.execute(_SQL_VERSION).scalar()
+        facturacion = pd.read_sql(_SQL_FACTURACION, conn)
+        perfiles = pd.read_sql(_SQL_PERFILES, conn)
+
+    hechos = HechosColumnares(facturacion, perfiles, version)
+    logger.info(f"✅ Cache columnar cargado en {time.perf_counter() - inicio:.1f}s: {hechos.estadisticas()}")
+    return hechos
+
+
+def _cargar_en_fondo(db_engine):
+    global _hechos, _cargando
+
+    try:
+        hechos = cargar_hechos_columnares(db_engine)
+        with _cache_lock:
+            _hechos = hechos
+    except Exception as e:
+        logger.error(f"❌ Error cargando cache columnar: {e}")
+    finally:
+        with _cache_lock:
+            _cargando = False
+
+
+def get_hechos_columnares(db_engine):
+    """
+    Hechos columnares de la data_version actual, o None si el cache está desactivado,
+    todavía cargando o sin data_version (los helpers consultan la base)
+    """
+    global _cargando
+
+    if not CACHE_COLUMNAR_HABILITADO:
+        return None
+
+    version = get_data_version(db_engine)
+    if version is None:
+        return None
+
+    hechos = _hechos
+    if hechos is not None and hechos.version == version:
+        return hechos
+
+    with _cache_lock:
+        if _cargando:
+            return None
+        _cargando = True
+
+    threading.Thread(target=_cargar_en_fondo, args=(db_engine,), daemon=True, name='jarvis-cache-columnar').start()
+    return None
+
+
+def precargar_cache_columnar(db_engine):
+    """Iniciar la carga al arrancar el proceso (no hace nada si el cache está desactivado)"""
+    get_hechos_columnares(db_engine)
+
+
+def invalidar_cache_columnar():
+    """Descartar los arrays; la próxima consulta dispara la recarga en fondo"""
+    global _hechos
+
+    with _cache_lock:
+        _hechos = None
+
+    logger.info("🔄 Cache columnar invalidado")
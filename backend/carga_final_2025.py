@@ -6,6 +6,9 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import logging
 
+from normalizacion import normalizar_nombre
+from post_carga import refrescar_resumenes
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -109,14 +112,18 @@ def carga_final_2025():
         
         # Mapear clientes
         logger.info("🔗 Mapeando clientes...")
-        anunciantes_query = text("SELECT anunciante_id, nombre_canonico FROM dim_anunciante")
-        anunciantes_df = pd.read_sql(anunciantes_query, conn)
+        # Por nombre normalizado (06_nombre_normalizado.sql): "CERVEPAR SA" = "CERVEPAR S.A."
+        anunciantes_query = text("""
+            SELECT DISTINCT ON (nombre_normalizado) nombre_normalizado, anunciante_id
+            FROM dim_anunciante
+            ORDER BY nombre_normalizado, anunciante_id
+        """)
+        anunciantes_por_nombre = dict(conn.execute(anunciantes_query).fetchall())
         
         def mapear_cliente(cliente_nombre):
             if pd.isna(cliente_nombre):
                 return None
-            match = anunciantes_df[anunciantes_df['nombre_canonico'] == str(cliente_nombre)]
-            return match.iloc[0]['anunciante_id'] if not match.empty else None
+            return anunciantes_por_nombre.get(normalizar_nombre(str(cliente_nombre)))
         
         if 'cliente_original' in df_rename.columns:
             df_rename['anunciante_id'] = df_rename['cliente_original'].apply(mapear_cliente)
@@ -153,5 +160,8 @@ def carga_final_2025():
         logger.info("🎉 CARGA COMPLETADA")
         logger.info("✅ Datos frescos cargados")
 
+    # Resúmenes 360° (mv_anunciante_360) con los datos recién cargados
+    refrescar_resumenes(engine)
+
 if __name__ == "__main__":
     carga_final_2025()
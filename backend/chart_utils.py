@@ -5,9 +5,63 @@ Sistema que separa completamente gráficos de análisis de texto
 
 import logging
 
+from normalizacion import compilar_claves, normalizar_texto
+
 logger = logging.getLogger(__name__)
 
 
+# Keywords de gráficos
+CHART_KEYWORDS = compilar_claves([
+    'gráfico', 'grafico', 'chart', 
+    'visualiz', 'gráfica', 'grafica',
+    'mostrar en gráfico', 'mostrame en gráfico',
+    'barra', 'barras', 'bar',
+    'línea', 'linea', 'line',
+    'torta', 'pie', 'circular',
+    'donut', 'dona', 'rosquilla',
+    'horizontal', 'burbuja', 'burbujas', 'bubble',
+    'scatter', 'dispersión', 'dispersion',
+    'gauge', 'indicador', 'velocímetro', 'velocimetro',
+    'radial'
+])
+
+# Keywords de tabla
+TABLE_KEYWORDS = compilar_claves([
+    'tabla', 'table', 'listado', 'lista detallada',
+    'en tabla', 'formato tabla', 'mostrame en tabla'
+])
+
+# Keywords de KPI/cuadro
+KPI_KEYWORDS = compilar_claves([
+    'kpi', 'métrica', 'metrica', 'indicador',
+    'cuadro', 'resumen', 'dashboard',
+    'tarjeta', 'card', 'resultado'
+])
+
+# Keywords de análisis
+ANALYSIS_KEYWORDS = compilar_claves([
+    'análisis', 'analisis', 'analyze',
+    'explicame', 'explicación', 'explicacion',
+    'detalle', 'detallado', 'profund',
+    'por qué', 'porque', 'razón'
+])
+
+# Detección de "y" o "también" que indica ambos
+BOTH_CONNECTOR_KEYWORDS = compilar_claves([' y ', ' e ', ' también', ' tambien', ' además', ' ademas'])
+
+# Keywords por tipo de gráfico (en orden de prioridad)
+DONUT_KEYWORDS = compilar_claves(['donut', 'dona', 'rosquilla', 'anillo'])
+HORIZONTAL_BAR_KEYWORDS = compilar_claves(['horizontal', 'barra horizontal', 'barras horizontales'])
+BUBBLE_KEYWORDS = compilar_claves(['burbuja', 'burbujas', 'bubble'])
+SCATTER_KEYWORDS = compilar_claves(['scatter', 'dispersión', 'dispersion', 'puntos'])
+GAUGE_KEYWORDS = compilar_claves(['gauge', 'indicador', 'velocímetro', 'velocimetro', 'radial', 'medidor'])
+BAR_KEYWORDS = compilar_claves(['barra', 'barras', 'bar'])
+PIE_KEYWORDS = compilar_claves(['torta', 'pie', 'circular', 'pastel'])
+LINE_KEYWORDS = compilar_claves(['línea', 'linea', 'line', 'tendencia'])
+TEMPORAL_KEYWORDS = compilar_claves(['evolución', 'evolucion', 'temporal', 'tiempo', 'mes', 'año', 'años'])
+DISTRIBUTION_KEYWORDS = compilar_claves(['distribución', 'distribucion', 'proporción', 'proporcion', 'share'])
+
+
 def detect_query_intent(user_query):
     """
     Detecta la intención del usuario:
@@ -17,51 +71,13 @@ def detect_query_intent(user_query):
     - table_only: Solo tabla
     - kpi_only: Solo KPI/cuadro de resultados
     """
-    query_lower = user_query.lower()
-    
-    # Keywords de gráficos
-    chart_keywords = [
-        'gráfico', 'grafico', 'chart', 
-        'visualiz', 'gráfica', 'grafica',
-        'mostrar en gráfico', 'mostrame en gráfico',
-        'barra', 'barras', 'bar',
-        'línea', 'linea', 'line',
-        'torta', 'pie', 'circular',
-        'donut', 'dona', 'rosquilla',
-        'horizontal', 'burbuja', 'burbujas', 'bubble',
-        'scatter', 'dispersión', 'dispersion',
-        'gauge', 'indicador', 'velocímetro', 'velocimetro',
-        'radial'
-    ]
-    
-    # Keywords de tabla
-    table_keywords = [
-        'tabla', 'table', 'listado', 'lista detallada',
-        'en tabla', 'formato tabla', 'mostrame en tabla'
-    ]
-    
-    # Keywords de KPI/cuadro
-    kpi_keywords = [
-        'kpi', 'métrica', 'metrica', 'indicador',
-        'cuadro', 'resumen', 'dashboard',
-        'tarjeta', 'card', 'resultado'
-    ]
-    
-    # Keywords de análisis
-    analysis_keywords = [
-        'análisis', 'analisis', 'analyze',
-        'explicame', 'explicación', 'explicacion',
-        'detalle', 'detallado', 'profund',
-        'por qué', 'porque', 'razón'
-    ]
-    
-    has_chart = any(kw in query_lower for kw in chart_keywords)
-    has_table = any(kw in query_lower for kw in table_keywords)
-    has_kpi = any(kw in query_lower for kw in kpi_keywords)
-    has_analysis = any(kw in query_lower for kw in analysis_keywords)
+    query_norm = normalizar_texto(user_query)
     
-    # Detección de "y" o "también" que indica ambos
-    has_both_connector = any(word in query_lower for word in [' y ', ' e ', ' también', ' tambien', ' además', ' ademas'])
+    has_chart = bool(CHART_KEYWORDS.search(query_norm))
+    has_table = bool(TABLE_KEYWORDS.search(query_norm))
+    has_kpi = bool(KPI_KEYWORDS.search(query_norm))
+    has_analysis = bool(ANALYSIS_KEYWORDS.search(query_norm))
+    has_both_connector = bool(BOTH_CONNECTOR_KEYWORDS.search(query_norm))
     
     # Prioridad de detección
     if has_table and not has_chart:
@@ -83,39 +99,39 @@ def detect_chart_type(user_query):
     Detecta el tipo de gráfico solicitado
     Soporta: bar, pie, line, donut, horizontalBar, bubble, scatter, gauge
     """
-    query_lower = user_query.lower()
+    query_norm = normalizar_texto(user_query)
     
     # Donut (prioridad alta - más específico)
-    if any(kw in query_lower for kw in ['donut', 'dona', 'rosquilla', 'anillo']):
+    if DONUT_KEYWORDS.search(query_norm):
         return 'donut'
     
     # Horizontal Bar
-    elif any(kw in query_lower for kw in ['horizontal', 'barra horizontal', 'barras horizontales']):
+    elif HORIZONTAL_BAR_KEYWORDS.search(query_norm):
         return 'horizontalBar'
     
     # Bubble/Scatter
-    elif any(kw in query_lower for kw in ['burbuja', 'burbujas', 'bubble']):
+    elif BUBBLE_KEYWORDS.search(query_norm):
         return 'bubble'
-    elif any(kw in query_lower for kw in ['scatter', 'dispersión', 'dispersion', 'puntos']):
+    elif SCATTER_KEYWORDS.search(query_norm):
         return 'scatter'
     
     # Gauge/Radial
-    elif any(kw in query_lower for kw in ['gauge', 'indicador', 'velocímetro', 'velocimetro', 'radial', 'medidor']):
+    elif GAUGE_KEYWORDS.search(query_norm):
         return 'gauge'
     
     # Tipos básicos (ya existentes)
-    elif any(kw in query_lower for kw in ['barra', 'barras', 'bar']) and 'horizontal' not in query_lower:
+    elif BAR_KEYWORDS.search(query_norm) and 'horizontal' not in query_norm:
         return 'bar'
-    elif any(kw in query_lower for kw in ['torta', 'pie', 'circular', 'pastel']) and 'donut' not in query_lower:
+    elif PIE_KEYWORDS.search(query_norm) and 'donut' not in query_norm:
         return 'pie'
-    elif any(kw in query_lower for kw in ['línea', 'linea', 'line', 'tendencia']):
+    elif LINE_KEYWORDS.search(query_norm):
         return 'line'
     
     else:
         # Default según contexto de query
-        if any(kw in query_lower for kw in ['evolución', 'evolucion', 'temporal', 'tiempo', 'mes', 'año']):
+        if TEMPORAL_KEYWORDS.search(query_norm):
             return 'line'
-        elif any(kw in query_lower for kw in ['distribución', 'distribucion', 'proporción', 'proporcion', 'share']):
+        elif DISTRIBUTION_KEYWORDS.search(query_norm):
             return 'donut'  # Donut es más moderno que pie para distribuciones
         else:
             return 'bar'  # Default
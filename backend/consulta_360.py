@@ -0,0 +1,152 @@
+"""
+JARVIS - Consulta 360° en un solo roundtrip
+Lee de mv_anunciante_360 (08_resumen_anunciante_360.sql) la fila precalculada por anunciante
+con los agregados ERP, el perfil AdLens y el ranking DNIT, más la evolución mensual desde
+fact_facturacion_mensual y la inversión por mes y medio desde fact_inversion_medios_cubo;
+acepta una lista de ids para comparaciones y top N.
+Resumen y rollup se actualizan al final de cada carga (post_carga.py)
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from cache_360 import get_filas_cacheadas
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+_SQL_360 = text("""
+    WITH ids AS (
+        SELECT DISTINCT UNNEST(CAST(:ids AS INTEGER[])) as anunciante_id
+    ),
+    evolucion AS (
+        -- Serie mensual desde el rollup (10_facturacion_mensual.sql): unas decenas de filas por cliente
+        SELECT
+            anunciante_id,
+            JSON_AGG(JSON_BUILD_OBJECT(
+                'anio', anio,
+                'mes', mes,
+                'facturacion', facturacion,
+                'revenue', revenue,
+                'costo', costo,
+                'facturas', facturas
+            ) ORDER BY anio, mes) as evolucion_mensual
+        FROM (
+            SELECT
+                anunciante_id,
+                anio,
+                mes,
+                SUM(facturacion) as facturacion,
+                SUM(revenue) as revenue,
+                SUM(costo) as costo,
+                SUM(facturas) as facturas
+            FROM fact_facturacion_mensual
+            WHERE anunciante_id = ANY(CAST(:ids AS INTEGER[]))
+            GROUP BY anunciante_id, anio, mes
+        ) meses
+        GROUP BY anunciante_id
+    ),
+    inversion AS (
+        -- Inversión AdLens por mes y medio desde el cubo (11_cubo_inversion_medios.sql)
+        SELECT
+            anunciante_id,
+            JSON_AGG(JSON_BUILD_OBJECT(
+                'anio', anio,
+                'mes', mes,
+                'medio', medio,
+                'monto_usd', monto_usd,
+                'monto_gs', monto_gs,
+                'registros', registros
+            ) ORDER BY anio, mes, medio) as inversion_medios
+        FROM (
+            SELECT
+                anunciante_id,
+                anio,
+                mes,
+                medio,
+                SUM(monto_usd) as monto_usd,
+                SUM(monto_gs) as monto_gs,
+                SUM(registros) as registros
+            FROM fact_inversion_medios_cubo
+            WHERE anunciante_id = ANY(CAST(:ids AS INTEGER[]))
+            GROUP BY anunciante_id, anio, mes, medio
+        ) medios
+        GROUP BY anunciante_id
+    )
+    SELECT
+        ids.anunciante_id,
+
+        -- ERP
+        r.facturacion_total,
+        r.revenue_total,
+        r.costo_total,
+        r.promedio_mensual,
+        COALESCE(r.registros, 0) as registros,
+        r.primera_fecha,
+        r.ultima_fecha,
+        r.divisiones,
+        r.arenas,
+        evolucion.evolucion_mensual,
+        inversion.inversion_medios,
+
+        -- AdLens (tiene_perfil distingue "sin perfil" de columnas NULL)
+        COALESCE(r.tiene_perfil, FALSE) as tiene_perfil,
+        r.nombre_anunciante,
+        r.rubro_principal,
+        r.tamano_de_la_empresa_cantidad_de_empleados,
+        r.cluster,
+        r.tipo_de_cluster,
+        r.cultura,
+        r.ejecucion,
+        r.estructura,
+        r.competitividad,
+        r.puntaje_total,
+        r.inv_tv,
+        r.inv_radio,
+        r.inv_cable,
+        r.inv_revistas,
+        r.inv_diarios,
+        r.inv_pdv,
+        r.central_de_medios,
+        r.tiene_la_empresa_departamento_de_marketing,
+        r.en_que_medios_invierte_la_empresa_principalmente,
+        r.la_empresa_invierte_en_digital,
+
+        -- DNIT
+        COALESCE(r.tiene_dnit, FALSE) as tiene_dnit,
+        r.ranking,
+        r.aporte_gs,
+        r.ingreso_estimado_gs,
+        r.razon_social
+    FROM ids
+    LEFT JOIN mv_anunciante_360 r ON r.anunciante_id = ids.anunciante_id
+    LEFT JOIN evolucion ON evolucion.anunciante_id = ids.anunciante_id
+    LEFT JOIN inversion ON inversion.anunciante_id = ids.anunciante_id
+""")
+
+
+def get_filas_360(db_engine, anunciante_ids):
+    """
+    Filas 360° de varios anunciantes; los que no están en cache_360 se piden en una sola consulta
+    Retorna {anunciante_id: fila}; los ids sin datos en ninguna fuente igual tienen fila (registros = 0)
+    """
+    ids = [int(anunciante_id) for anunciante_id in dict.fromkeys(anunciante_ids)]
+    if not ids:
+        return {}
+
+    return get_filas_cacheadas(db_engine, ids, _consultar_filas_360)
+
+
+def _consultar_filas_360(db_engine, ids):
+    """Filas 360° de la base en un roundtrip"""
+    with conexion(db_engine) as conn:
+        filas = conn.execute(_SQL_360, {'ids': ids}).fetchall()
+
+    logger.info(f"📦 Consulta 360° de {len(ids)} anunciantes en un roundtrip")
+    return {fila.anunciante_id: fila for fila in filas}
+
+
+def get_fila_360(db_engine, anunciante_id):
+    """Fila 360° de un anunciante"""
+    return get_filas_360(db_engine, [anunciante_id]).get(anunciante_id)
@@ -0,0 +1,157 @@
+"""
+JARVIS - Escucha de cambios en la base (LISTEN/NOTIFY)
+Un hilo por proceso escucha el canal 'jarvis_cache' (ver 07_notificar_cambios_cache.sql)
+y ejecuta los invalidadores registrados para la tabla modificada
+Los hijos de un fork (gunicorn --preload) inician su propio hilo al nacer (os.register_at_fork);
+si igual quedan sin escucha, los caches vuelven a sondear data_version (ver cache_360.py)
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'jarvis_cache'
+
+# Espera máxima de select() antes de volver a revisar la conexión
+TIMEOUT_ESPERA_SEG = 60
+
+# Pausa antes de reintentar tras perder la conexión
+REINTENTO_SEG = 5
+
+_invalidadores = defaultdict(list)
+_escucha = None
+_escucha_pid = None
+_escucha_engine = None
+_escucha_activa = threading.Event()
+_escucha_lock = threading.Lock()
+
+
+def registrar_invalidador(tablas, invalidador):
+    """Ejecutar invalidador() cuando cambie cualquiera de las tablas"""
+    if isinstance(tablas, str):
+        tablas = [tablas]
+
+    with _escucha_lock:
+        for tabla in tablas:
+            if invalidador not in _invalidadores[tabla]:
+                _invalidadores[tabla].append(invalidador)
+
+
+def escucha_activa():
+    """True si este proceso está recibiendo notificaciones (los caches no necesitan sondear la base)"""
+    return _escucha_activa.is_set() and _escucha_pid == os.getpid()
+
+
+def _despachar(tablas):
+    """Ejecutar una sola vez cada invalidador afectado por las tablas modificadas"""
+    with _escucha_lock:
+        invalidadores = []
+        for tabla in tablas:
+            for invalidador in _invalidadores.get(tabla, ()):
+                if invalidador not in invalidadores:
+                    invalidadores.append(invalidador)
+
+    for invalidador in invalidadores:
+        try:
+            invalidador()
+        except Exception as e:
+            logger.error(f"Error invalidando cache ({invalidador.__name__}): {e}")
+
+
+def _despachar_todos():
+    """Al (re)conectar pudo haber cambios sin notificar: invalidar todo"""
+    with _escucha_lock:
+        tablas = list(_invalidadores)
+    _despachar(tablas)
+
+
+def _conectar(db_engine):
+    """Conexión psycopg2 propia (fuera del pool) en autocommit, suscripta al canal"""
+    conexion = db_engine.raw_connection()
+    dbapi = conexion.driver_connection
+    conexion.detach()
+    dbapi.autocommit = True
+    with dbapi.cursor() as cursor:
+        cursor.execute(f"LISTEN {CANAL}")
+    return dbapi
+
+
+def _escuchar(db_engine):
+    while True:
+        dbapi = None
+        try:
+            dbapi = _conectar(db_engine)
+            _escucha_activa.set()
+            logger.info(f"👂 Escuchando cambios en el canal {CANAL}")
+
+            _despachar_todos()
+
+            while True:
+                if select.select([dbapi], [], [], TIMEOUT_ESPERA_SEG) == ([], [], []):
+                    # Sin avisos: verificar que la conexión siga viva
+                    with dbapi.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    continue
+
+                dbapi.poll()
+                tablas = {notificacion.payload for notificacion in dbapi.notifies}
+                dbapi.notifies.clear()
+
+                if tablas:
+                    logger.info(f"🔔 Cambios notificados en: {', '.join(sorted(tablas))}")
+                    _despachar(tablas)
+
+        except Exception as e:
+            logger.error(f"Error escuchando {CANAL}, reintentando en {REINTENTO_SEG}s: {e}")
+        finally:
+            _escucha_activa.clear()
+            if dbapi is not None:
+                try:
+                    dbapi.close()
+                except Exception:
+                    pass
+
+        time.sleep(REINTENTO_SEG)
+
+
+def iniciar_escucha(db_engine):
+    """
+    Iniciar el hilo de escucha de este proceso (idempotente)
+    Tras un fork (workers de gunicorn) el hilo del padre no existe en el hijo: se inicia uno nuevo
+    """
+    global _escucha, _escucha_pid, _escucha_engine
+
+    with _escucha_lock:
+        if _escucha is not None and _escucha_pid == os.getpid():
+            return _escucha
+
+        _escucha_activa.clear()
+        _escucha_pid = os.getpid()
+        _escucha_engine = db_engine
+        _escucha = threading.Thread(target=_escuchar, args=(db_engine,), name='escucha_cache', daemon=True)
+        _escucha.start()
+
+    return _escucha
+
+
+def _rearmar_en_hijo():
+    """Después de un fork: el hilo y la conexión de escucha del padre no existen en el hijo"""
+    global _escucha_lock, _escucha_activa
+
+    if _escucha_engine is None:
+        return
+
+    # Otro hilo del padre pudo tener los locks tomados al momento del fork
+    _escucha_lock = threading.Lock()
+    _escucha_activa = threading.Event()
+    # Las conexiones del pool son del padre: el hijo abre las suyas
+    _escucha_engine.dispose(close=False)
+    iniciar_escucha(_escucha_engine)
+
+
+os.register_at_fork(after_in_child=_rearmar_en_hijo)
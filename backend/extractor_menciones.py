@@ -0,0 +1,199 @@
+"""
+JARVIS - Extractor de menciones de anunciantes (Aho-Corasick)
+Autómata construido con todos los nombres canónicos y aliases; encuentra todas las
+menciones de clientes de un query en una sola pasada lineal
+"""
+
+import logging
+import threading
+from collections import deque
+
+from sqlalchemy import text
+
+from cache_360 import get_data_version
+from normalizacion import normalizar_nombre
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+# Patrones más cortos generan demasiados falsos positivos ("sa", "de", siglas)
+LONGITUD_MINIMA_PATRON = 3
+
+_extractor = None
+_extractor_version = None
+_extractor_lock = threading.Lock()
+
+
+def _es_limite(texto, posicion):
+    """True si la posición está fuera del texto o no es letra/dígito"""
+    return posicion < 0 or posicion >= len(texto) or not texto[posicion].isalnum()
+
+
+class ExtractorMenciones:
+    """
+    Autómata Aho-Corasick sobre nombres de anunciantes normalizados (normalizar_nombre).
+    Cada nodo guarda sus transiciones, su enlace de falla y los patrones que terminan en él
+    (propios + heredados por el enlace de falla).
+    """
+
+    def __init__(self, patrones):
+        """
+        patrones: iterable de (texto, anunciante_id, nombre) en orden de prioridad;
+        si un texto aparece repetido gana la primera aparición
+        """
+        self.transiciones = [{}]
+        self.fallas = [0]
+        self.salidas = [[]]
+        self.patrones = {}
+
+        for texto_patron, anunciante_id, nombre in patrones:
+            texto_patron = normalizar_nombre(texto_patron)
+            if len(texto_patron) < LONGITUD_MINIMA_PATRON or texto_patron.isdigit():
+                continue
+            if texto_patron in self.patrones:
+                continue
+
+            self.patrones[texto_patron] = (anunciante_id, nombre)
+            self._agregar(texto_patron)
+
+        self._construir_fallas()
+
+        logger.info(f"🔤 Extractor de menciones construido: {len(self.patrones)} patrones, "
+                    f"{len(self.transiciones)} estados")
+
+    def __len__(self):
+        return len(self.patrones)
+
+    def _agregar(self, patron):
+        nodo = 0
+        for caracter in patron:
+            siguiente = self.transiciones[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self.transiciones)
+                self.transiciones.append({})
+                self.fallas.append(0)
+                self.salidas.append([])
+                self.transiciones[nodo][caracter] = siguiente
+            nodo = siguiente
+        self.salidas[nodo].append(patron)
+
+    def _construir_fallas(self):
+        """Enlaces de falla por BFS (los nodos de profundidad 1 fallan a la raíz)"""
+        cola = deque(self.transiciones[0].values())
+
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self.transiciones[nodo].items():
+                falla = self.fallas[nodo]
+                while falla and caracter not in self.transiciones[falla]:
+                    falla = self.fallas[falla]
+                destino = self.transiciones[falla].get(caracter, 0)
+                self.fallas[hijo] = destino if destino != hijo else 0
+                self.salidas[hijo] = self.salidas[hijo] + self.salidas[self.fallas[hijo]]
+                cola.append(hijo)
+
+    def _coincidencias(self, texto):
+        """Todas las coincidencias (inicio, fin, patron) que respetan límites de palabra"""
+        nodo = 0
+        coincidencias = []
+
+        for posicion, caracter in enumerate(texto):
+            while nodo and caracter not in self.transiciones[nodo]:
+                nodo = self.fallas[nodo]
+            nodo = self.transiciones[nodo].get(caracter, 0)
+
+            for patron in self.salidas[nodo]:
+                inicio = posicion - len(patron) + 1
+                if _es_limite(texto, inicio - 1) and _es_limite(texto, posicion + 1):
+                    coincidencias.append((inicio, posicion + 1, patron))
+
+        return coincidencias
+
+    def extraer(self, query):
+        """
+        Menciones de anunciantes en el query, en orden de aparición y sin repetir cliente.
+        Con solapamientos gana la coincidencia más larga (y a igual largo, la primera).
+        """
+        texto = normalizar_nombre(query)
+        coincidencias = self._coincidencias(texto)
+
+        coincidencias.sort(key=lambda c: (-(c[1] - c[0]), c[0]))
+        ocupado = [False] * len(texto)
+        elegidas = []
+
+        for inicio, fin, patron in coincidencias:
+            if any(ocupado[inicio:fin]):
+                continue
+            ocupado[inicio:fin] = [True] * (fin - inicio)
+            elegidas.append((inicio, fin, patron))
+
+        menciones = []
+        vistos = set()
+        for inicio, fin, patron in sorted(elegidas):
+            anunciante_id, nombre = self.patrones[patron]
+            if anunciante_id in vistos:
+                continue
+            vistos.add(anunciante_id)
+            menciones.append({
+                'anunciante_id': anunciante_id,
+                'nombre': nombre,
+                'mencion': texto[inicio:fin],
+                'inicio': inicio,
+                'fin': fin
+            })
+
+        return menciones
+
+
+def get_extractor_menciones(db_engine):
+    """Obtener el extractor del proceso, construyéndolo la primera vez y en cada data_version nueva"""
+    global _extractor, _extractor_version
+
+    # Sin escucha de NOTIFY los cambios no llegan como invalidación: se reconstruye en cada carga
+    version = get_data_version(db_engine)
+
+    if _extractor is not None and (version is None or _extractor_version == version):
+        return _extractor
+
+    with _extractor_lock:
+        if _extractor is None or (version is not None and _extractor_version != version):
+            with conexion(db_engine) as conn:
+                # Prioridad: aliases curados > nombre AdLens > nombre canónico
+                stmt = text("""
+                    SELECT patron, anunciante_id, nombre
+                    FROM (
+                        SELECT a.nombre_alias as patron, a.anunciante_id,
+                               COALESCE(p.nombre_anunciante, d.nombre_canonico) as nombre,
+                               1 as prioridad, a.confianza
+                        FROM dim_anunciante_aliases a
+                        LEFT JOIN dim_anunciante_perfil p ON a.anunciante_id = p.anunciante_id
+                        LEFT JOIN dim_anunciante d ON a.anunciante_id = d.anunciante_id
+                        UNION ALL
+                        SELECT p.nombre_anunciante, p.anunciante_id, p.nombre_anunciante, 2, 100
+                        FROM dim_anunciante_perfil p
+                        WHERE p.nombre_anunciante IS NOT NULL
+                        UNION ALL
+                        SELECT d.nombre_canonico, d.anunciante_id,
+                               COALESCE(p.nombre_anunciante, d.nombre_canonico), 3, 100
+                        FROM dim_anunciante d
+                        LEFT JOIN dim_anunciante_perfil p ON d.anunciante_id = p.anunciante_id
+                        WHERE d.nombre_canonico IS NOT NULL
+                    ) patrones
+                    ORDER BY prioridad, confianza DESC, anunciante_id
+                """)
+                patrones = conn.execute(stmt).fetchall()
+
+            _extractor = ExtractorMenciones(patrones)
+            _extractor_version = version
+
+    return _extractor
+
+
+def invalidar_extractor_menciones():
+    """Descartar el autómata para que se reconstruya en la próxima consulta"""
+    global _extractor
+
+    with _extractor_lock:
+        _extractor = None
+
+    logger.info("🔄 Extractor de menciones invalidado")
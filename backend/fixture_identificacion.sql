@@ -0,0 +1,96 @@
+-- ============================================================================
+-- FIXTURE: Anunciantes para benchmark_identificacion.py
+-- Base local de prueba con los anunciantes de corpus_identificacion.csv,
+-- incluidos los pares que generan falsos positivos (cervepar / cerveza diosa,
+-- tigo / tigo sports, personal / personal envios, banco nacional / BNF)
+-- ⚠️ BORRA las tablas de anunciantes: usar SOLO en una base local de prueba
+-- Después se aplican 03, 04 (si hay pg_trgm), 05 y 06 (ver benchmark_identificacion.py)
+-- ============================================================================
+
+DROP TABLE IF EXISTS dim_anunciante_alias_negativo CASCADE;
+DROP TABLE IF EXISTS dim_anunciante_aliases CASCADE;
+DROP TABLE IF EXISTS dim_posicionamiento_dnit CASCADE;
+DROP TABLE IF EXISTS dim_anunciante_perfil CASCADE;
+DROP TABLE IF EXISTS dim_anunciante CASCADE;
+
+CREATE TABLE dim_anunciante (
+    anunciante_id SERIAL PRIMARY KEY,
+    nombre_canonico VARCHAR(300) NOT NULL
+);
+
+CREATE TABLE dim_anunciante_perfil (
+    anunciante_id INTEGER PRIMARY KEY REFERENCES dim_anunciante(anunciante_id),
+    nombre_anunciante VARCHAR(300),
+    rubro_principal VARCHAR(200),
+    cluster VARCHAR(50)
+);
+
+CREATE TABLE dim_posicionamiento_dnit (
+    id SERIAL PRIMARY KEY,
+    anunciante_id INTEGER REFERENCES dim_anunciante(anunciante_id),
+    ranking INTEGER,
+    ruc BIGINT,
+    razon_social VARCHAR(300),
+    aporte_gs NUMERIC
+);
+
+
+-- ANUNCIANTES (id fijo: corpus_identificacion.csv referencia estos ids)
+-- ============================================================================
+INSERT INTO dim_anunciante (anunciante_id, nombre_canonico) VALUES
+    (1, 'CERVECERIA PARAGUAYA S.A. (CERVEPAR)'),
+    (2, 'CERVEZA DIOSA S.A.'),
+    (3, 'TIGO SPORTS'),
+    (4, 'TELEFONICA CELULAR DEL PARAGUAY S.A.E. (TIGO)'),
+    (5, 'UNILEVER DE PARAGUAY S.A.'),
+    (6, 'NESTLE PARAGUAY S.A.'),
+    (7, 'BANCO FAMILIAR S.A.E.C.A.'),
+    (8, 'COCA COLA PARESA'),
+    (9, 'BANCO NACIONAL DE FOMENTO'),
+    (10, 'NUCLEO S.A. (PERSONAL)'),
+    (11, 'PERSONAL ENVIOS S.A.'),
+    (12, 'SUPERSEIS S.A.'),
+    (13, 'BANCO CONTINENTAL S.A.E.C.A.'),
+    (14, 'CARREFOUR PARAGUAY'),
+    (15, 'BRAHMA'),
+    (16, 'BRAHMA GARCIA HNOS S.R.L.'),
+    (17, 'DISTRIBUIDORA DEL PARAGUAY S.A.'),
+    (18, 'PILSEN'),
+    (19, 'BANCO CENTRAL DEL PARAGUAY'),
+    (20, 'MERCADO CENTRAL DE ABASTO'),
+    (21, 'ALEX S.A.'),
+    (22, 'PUMA ENERGY PARAGUAY S.A.'),
+    (23, 'AUTOMOTOR S.A.'),
+    (24, 'FARMACENTER S.A.'),
+    (25, 'BIGGIE S.A.'),
+    (26, 'ÁGUILA SAVEIRO S.R.L.'),
+    (27, 'LA CHOLITA'),
+    (28, 'EL CORRAL'),
+    (29, 'UENO BANK S.A.'),
+    (30, 'CLARO PARAGUAY (AMX)');
+
+SELECT setval('dim_anunciante_anunciante_id_seq', (SELECT MAX(anunciante_id) FROM dim_anunciante));
+
+-- Nombre AdLens = canónico salvo algunas variaciones reales (acentos, marca comercial)
+INSERT INTO dim_anunciante_perfil (anunciante_id, nombre_anunciante, rubro_principal, cluster)
+SELECT
+    anunciante_id,
+    CASE anunciante_id
+        WHEN 4 THEN 'TIGO PARAGUAY'
+        WHEN 6 THEN 'NESTLÉ PARAGUAY S.A.'
+        WHEN 10 THEN 'PERSONAL'
+        WHEN 30 THEN 'CLARO PARAGUAY'
+        ELSE nombre_canonico
+    END,
+    'Rubro ' || anunciante_id,
+    'Cluster ' || (anunciante_id % 4 + 1)
+FROM dim_anunciante;
+
+INSERT INTO dim_posicionamiento_dnit (anunciante_id, ranking, ruc, razon_social, aporte_gs)
+SELECT
+    anunciante_id,
+    anunciante_id,
+    80000000 + anunciante_id,
+    nombre_canonico,
+    1000000000 - anunciante_id * 1000000
+FROM dim_anunciante;
@@ -0,0 +1,176 @@
+"""
+JARVIS - Índice en memoria de anunciantes
+Se construye una sola vez por proceso a partir de dim_anunciante_perfil y reduce
+los candidatos antes de aplicar las reglas de identificación de clientes
+"""
+
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+from sqlalchemy import text
+
+from cache_360 import get_data_version
+from motor_fuzzy import CorpusFuzzy
+from normalizacion import normalizar_nombre
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+_indice = None
+_indice_version = None
+_indice_lock = threading.Lock()
+
+
+class IndiceAnunciantes:
+    """
+    Índice de nombres de anunciantes:
+    - mapa hash nombre exacto → posiciones
+    - índice invertido palabra → posiciones
+
+    Las posiciones respetan el orden por anunciante_id de la consulta original,
+    así las reglas de identificación devuelven el mismo cliente que el escaneo completo.
+    """
+
+    def __init__(self, clientes):
+        self.clientes = list(clientes)
+        self.nombres = [normalizar_nombre(c.nombre) for c in self.clientes]
+
+        self.exactos = defaultdict(set)
+        self.palabras = defaultdict(set)
+        self.prefijo_primera_palabra = defaultdict(set)
+        self.primera_palabra_corta = set()
+
+        for pos, nombre in enumerate(self.nombres):
+            self.exactos[nombre].add(pos)
+
+            for palabra in set(nombre.split()):
+                self.palabras[palabra].add(pos)
+
+            # Regla "primera palabra" de buscar_fuzzy_estricto (solo aplica con >= 4 letras)
+            primera = nombre.split()[0] if nombre.split() else ""
+            if len(primera) >= 4:
+                self.prefijo_primera_palabra[primera[:3]].add(pos)
+            else:
+                self.primera_palabra_corta.add(pos)
+
+        # Nombres ordenados (para prefijos) y longitudes ordenadas (para ventana de longitud)
+        self.nombres_ordenados = sorted((nombre, pos) for pos, nombre in enumerate(self.nombres))
+        self.longitudes_ordenadas = sorted((len(nombre), pos) for pos, nombre in enumerate(self.nombres))
+        self._claves_longitud = [longitud for longitud, _ in self.longitudes_ordenadas]
+        self._corpus = None
+
+        logger.info(f"📇 Índice de anunciantes construido: {len(self.clientes)} nombres, "
+                    f"{len(self.palabras)} palabras")
+
+    def __len__(self):
+        return len(self.clientes)
+
+    @property
+    def corpus(self):
+        """Corpus para scoring fuzzy por lotes sobre todos los nombres (se arma la primera vez)"""
+        if self._corpus is None:
+            self._corpus = CorpusFuzzy(self.nombres)
+        return self._corpus
+
+    def _filas(self, posiciones):
+        """Filas originales en orden de anunciante_id"""
+        return [self.clientes[pos] for pos in sorted(posiciones)]
+
+    def _posiciones_con_prefijo(self, prefijo):
+        """Posiciones cuyo nombre empieza con el prefijo (búsqueda binaria)"""
+        inicio = bisect.bisect_left(self.nombres_ordenados, (prefijo,))
+        posiciones = set()
+        for nombre, pos in self.nombres_ordenados[inicio:]:
+            if not nombre.startswith(prefijo):
+                break
+            posiciones.add(pos)
+        return posiciones
+
+    def candidatos_exactos(self, query_clean):
+        """
+        Candidatos para buscar_coincidencia_exacta:
+        nombre idéntico, todas las palabras del query en el nombre, o nombre que empieza con el query
+        """
+        query_lower = query_clean.lower()
+        query_words = set(query_lower.split())
+
+        posiciones = set(self.exactos.get(query_lower, ()))
+
+        if query_words:
+            postings = sorted((self.palabras.get(p, set()) for p in query_words), key=len)
+            posiciones |= set.intersection(*postings)
+        elif self.clientes:
+            # Un conjunto vacío es subconjunto de cualquier nombre: gana el primero
+            posiciones.add(0)
+
+        if len(query_clean) >= 5:
+            posiciones |= self._posiciones_con_prefijo(query_lower)
+
+        return self._filas(posiciones)
+
+    def candidatos_fuzzy(self, query_clean, score_minimo=0.8):
+        """
+        Candidatos para buscar_fuzzy_estricto: solo los que pueden pasar
+        la validación de longitud, la de primera palabra y el score mínimo final.
+        El ratio de SequenceMatcher nunca supera 2 * min(len) / (len_a + len_b).
+        """
+        longitud = len(query_clean)
+        margen = longitud * 0.7
+
+        # Tolerancia para no perder empates exactos en el límite por redondeo
+        minimo = max(longitud - margen, longitud * score_minimo / (2 - score_minimo)) - 1e-9
+        maximo = min(longitud + margen, longitud * (2 - score_minimo) / score_minimo) + 1e-9
+
+        inicio = bisect.bisect_left(self._claves_longitud, minimo)
+        fin = bisect.bisect_right(self._claves_longitud, maximo)
+        posiciones = {pos for _, pos in self.longitudes_ordenadas[inicio:fin]}
+
+        query_first = query_clean.split()[0].lower() if query_clean.split() else ""
+        if len(query_first) >= 4:
+            compatibles = self.prefijo_primera_palabra.get(query_first[:3], set()) | self.primera_palabra_corta
+            posiciones &= compatibles
+
+        return self._filas(posiciones)
+
+
+def get_indice_anunciantes(db_engine):
+    """Obtener el índice del proceso, construyéndolo la primera vez y en cada data_version nueva"""
+    global _indice, _indice_version
+
+    # Sin escucha de NOTIFY los cambios no llegan como invalidación: se reconstruye en cada carga
+    version = get_data_version(db_engine)
+
+    if _indice is not None and (version is None or _indice_version == version):
+        return _indice
+
+    with _indice_lock:
+        if _indice is None or (version is not None and _indice_version != version):
+            with conexion(db_engine) as conn:
+                stmt = text("""
+                    SELECT
+                        p.anunciante_id,
+                        p.nombre_anunciante as nombre,
+                        p.cluster,
+                        p.rubro_principal
+                    FROM dim_anunciante_perfil p
+                    WHERE p.nombre_anunciante IS NOT NULL
+                    ORDER BY p.anunciante_id
+                """)
+                clientes = conn.execute(stmt).fetchall()
+
+            _indice = IndiceAnunciantes(clientes)
+            _indice_version = version
+
+    return _indice
+
+
+def invalidar_indice_anunciantes():
+    """Descartar el índice para que se reconstruya en la próxima consulta"""
+    global _indice
+
+    with _indice_lock:
+        _indice = None
+
+    logger.info("🔄 Índice de anunciantes invalidado")
@@ -10,6 +10,18 @@ import re
 from sqlalchemy import text
 import json
 from decimal import Decimal
+import numpy as np
+from indice_anunciantes import get_indice_anunciantes
+from extractor_menciones import get_extractor_menciones
+from matcher_aliases import get_matcher_aliases
+from normalizacion import (
+    compilar_claves, limpiar_query, normalizar_nombre, normalizar_nombre_cliente, normalizar_texto
+)
+from motor_fuzzy import CorpusFuzzy, top_k
+from consulta_360 import get_fila_360, get_filas_360
+from totales_mercado import calcular_market_share, get_totales_mercado
+from ranking_clientes import get_pagina_ranking, get_ranking, parsear_consulta_ranking
+from unidad_trabajo import conexion
 
 logger = logging.getLogger(__name__)
 
@@ -18,36 +30,60 @@ logger = logging.getLogger(__name__)
  #       return float(obj)
  #   raise TypeError
 
-def get_cliente_360(user_query, db_engine):
+# Palabras que indican una consulta estratégica compleja (nombre del cliente embebido en la pregunta)
+STRATEGIC_KEYWORDS = ['se nota', 'perfil', 'innovador', 'captura', 'escapando', 'departamento', 'agencia', 'crece más', 'refleja', 'coincide', 'típico', 'madurez', 'perdiendo oportunidades']
+
+_CLAVES_ESTRATEGICAS = compilar_claves(STRATEGIC_KEYWORDS)
+
+def es_consulta_estrategica(user_query):
+    """Detectar si es una consulta estratégica compleja"""
+    return bool(_CLAVES_ESTRATEGICAS.search(normalizar_texto(user_query)))
+
+def resolver_identidad_cliente(user_query, db_engine):
     """
-    Análisis 360° con identificación estratégica mejorada
+    Identificar el cliente de la query UNA sola vez por request
+    El resultado (cliente_info) se pasa a get_cliente_360 y demás fetchers para no repetir la identificación
     """
+    if es_consulta_estrategica(user_query):
+        return identify_cliente_strategic_enhanced(user_query, db_engine)
     
-    # Detectar si es una consulta estratégica compleja
-    strategic_keywords = ['se nota', 'perfil', 'innovador', 'captura', 'escapando', 'departamento', 'agencia', 'crece más', 'refleja', 'coincide', 'típico', 'madurez', 'perdiendo oportunidades']
+    return identify_cliente_automatico_robusto(user_query, db_engine)
+
+def get_cliente_360(user_query, db_engine, cliente_info=None):
+    """
+    Análisis 360° con identificación estratégica mejorada
+    cliente_info: identidad ya resuelta en el request (resolver_identidad_cliente); si falta se identifica aquí
+    """
     
-    if any(keyword in user_query.lower() for keyword in strategic_keywords):
+    if es_consulta_estrategica(user_query):
         # Usar análisis estratégico mejorado
-        return get_cliente_360_strategic(user_query, db_engine)
+        return get_cliente_360_strategic(user_query, db_engine, cliente_info=cliente_info)
     else:
         # Usar análisis normal existente
         logger.info(f"🔍 Iniciando análisis 360° normal para: {user_query}")
         
-        cliente_info = identify_cliente_automatico_robusto(user_query, db_engine)
+        if cliente_info is None:
+            cliente_info = identify_cliente_automatico_robusto(user_query, db_engine)
         
         if not cliente_info:
             logger.warning(f"❌ Cliente no encontrado: {user_query}")
             return []
         
-        # Obtener datos ERP completos
-        datos_erp = get_facturacion_erp_completa(db_engine.connect(), cliente_info['anunciante_id'])
+        # ERP + AdLens + DNIT en una sola consulta
+        try:
+            fila = get_fila_360(db_engine, cliente_info['anunciante_id'])
+        except Exception as e:
+            logger.error(f"❌ Error en consulta 360° de {cliente_info['nombre']}: {e}")
+            return []
         
-        if not datos_erp or datos_erp['registros'] == 0:
+        datos_erp = formatear_erp_360(fila)
+        
+        if datos_erp['registros'] == 0:
             logger.warning(f"❌ No hay datos ERP para {cliente_info['nombre']}")
             return []
         
-        # Enriquecer con datos AdLens y DNIT
-        datos_enriquecidos = enrich_with_adlens_and_dnit(datos_erp, cliente_info['anunciante_id'], db_engine)
+        datos_enriquecidos = formatear_enriquecido_360(datos_erp, fila)
+        datos_enriquecidos['market_share'] = calcular_market_share(datos_erp['facturacion_total'], get_totales_mercado(db_engine))
         
         # Estructurar resultado
         resultado = {
@@ -66,62 +102,70 @@ def identify_cliente_fuzzy_360(user_query,db_engine):
     """
     
     try:
-        with db_engine.connect() as conn: 
-            # Buscar en dim_anunciante_perfil (fuente principal AdLens)
-            stmt = text("""
-            SELECT 
-                p.anunciante_id,
-                p.nombre_anunciante as nombre,
-                p.nombre_anunciante as nombre_oficial
-            FROM dim_anunciante_perfil p
-            WHERE p.nombre_anunciante IS NOT NULL
-            ORDER BY p.anunciante_id
-        """)
-            
-            clientes = conn.execute(stmt).fetchall()
-            
-            # Fuzzy matching mejorado
-            from difflib import SequenceMatcher
-            
-            query_clean = limpiar_query(user_query)
-            best_match = None
-            best_score = 0
-            
-            for cliente in clientes:
-                nombre = cliente.nombre or ""
-                nombre_oficial = cliente.nombre_oficial or ""
-                
-                # Calcular scores para ambos nombres
-                score1 = SequenceMatcher(None, query_clean, nombre.lower()).ratio()
-                score2 = SequenceMatcher(None, query_clean, nombre_oficial.lower()).ratio()
-                
-                # Tomar el mejor score
-                score = max(score1, score2)
-                
-                # Bonus por match exacto en substring
-                if query_clean in nombre.lower() or query_clean in nombre_oficial.lower():
-                    score += 0.3
-                
-                if score > best_score and score > 0.7:  # Threshold más bajo
-                    best_score = score
-                    best_match = {
-                        'anunciante_id': cliente.anunciante_id,
-                        'nombre': nombre,
-                        'nombre_oficial': nombre_oficial,
-                        'score': score
-                    }
-            
-            if best_match:
-                logger.info(f"✅ Fuzzy match: {query_clean} → {best_match['nombre']} (score: {best_match['score']:.2f})")
-                return best_match
-            else:
-                logger.warning(f"❌ Sin match fuzzy para: {query_clean}")
-                return None
+        # Nombres de dim_anunciante_perfil (fuente principal AdLens) desde el índice en memoria
+        indice = get_indice_anunciantes(db_engine)
+        clientes = indice.clientes
+        
+        # Fuzzy matching mejorado (scoring por lotes)
+        query_clean = limpiar_query(user_query)
+        scores = indice.corpus.puntuar(query_clean)
+        
+        # Bonus por match exacto en substring
+        scores = scores + np.where(indice.corpus.contiene(query_clean), 0.3, 0.0)
+        
+        mejores = top_k(scores, k=1, mascara=scores > 0.7)  # Threshold más bajo
+        
+        if mejores:
+            pos, score = mejores[0]
+            cliente = clientes[pos]
+            best_match = {
+                'anunciante_id': cliente.anunciante_id,
+                'nombre': cliente.nombre,
+                'nombre_oficial': cliente.nombre,
+                'score': score
+            }
+            logger.info(f"✅ Fuzzy match: {query_clean} → {best_match['nombre']} (score: {best_match['score']:.2f})")
+            return best_match
+        else:
+            logger.warning(f"❌ Sin match fuzzy para: {query_clean}")
+            return None
                 
     except Exception as e:
         logger.error(f"❌ Error en fuzzy matching: {e}")
         return None
     
+def get_evolucion_mensual(conn, anunciante_id):
+    """
+    Serie mensual de facturación desde fact_facturacion_mensual (10_facturacion_mensual.sql)
+    [{'anio', 'mes', 'facturacion', 'revenue', 'costo', 'facturas'}, ...] ordenada por período
+    """
+    
+    stmt = text("""
+        SELECT 
+            anio,
+            mes,
+            SUM(facturacion) as facturacion,
+            SUM(revenue) as revenue,
+            SUM(costo) as costo,
+            SUM(facturas) as facturas
+        FROM fact_facturacion_mensual
+        WHERE anunciante_id = :anunciante_id
+        GROUP BY anio, mes
+        ORDER BY anio, mes
+    """)
+    
+    return [
+        {
+            'anio': row.anio,
+            'mes': row.mes,
+            'facturacion': float(row.facturacion),
+            'revenue': float(row.revenue),
+            'costo': float(row.costo),
+            'facturas': int(row.facturas)
+        }
+        for row in conn.execute(stmt, {"anunciante_id": anunciante_id})
+    ]
+
 def get_facturacion_erp_completa(conn, anunciante_id):
     """
     Obtener facturación completa del ERP - VERSIÓN CORREGIDA
@@ -153,7 +197,7 @@ def get_facturacion_erp_completa(conn, anunciante_id):
                 'registros': result.registros or 0,
                 'divisiones': result.divisiones or '',
                 'arenas': result.arenas or '',
-                'evolucion_mensual': []  # ✅ CAMPO VACÍO PERO PRESENTE
+                'evolucion_mensual': get_evolucion_mensual(conn, anunciante_id)
             }
         else:
             return {
@@ -314,19 +358,65 @@ def get_perfil_adlens_completo(conn, anunciante_id):
 
 def get_inversion_granular_opcional(conn, anunciante_id):
     """
-    Obtener inversión granular mensual (opcional - solo si se necesita evolución)
+    Obtener inversión granular mensual desde el cubo de inversión (11_cubo_inversion_medios.sql)
     """
     
     try:
-        # Por ahora devolver vacío - se puede implementar después si se necesita
-        # la evolución mensual detallada por medio
-        return {}
+        stmt = text("""
+            SELECT 
+                anio,
+                mes,
+                medio,
+                SUM(monto_usd) as monto_usd,
+                SUM(monto_gs) as monto_gs,
+                SUM(registros) as registros
+            FROM fact_inversion_medios_cubo
+            WHERE anunciante_id = :anunciante_id
+            GROUP BY anio, mes, medio
+        """)
+        
+        filas = conn.execute(stmt, {"anunciante_id": anunciante_id}).mappings().all()
+        return formatear_inversion_granular(filas)
         
     except Exception as e:
         logger.error(f"❌ Error obteniendo inversión granular: {e}")
         return {}
 
-def merge_all_sources_360(cliente_info, facturacion_data, ranking_data, perfil_data, inversion_granular):
+def formatear_inversion_granular(filas):
+    """
+    Desglose por medio y evolución mensual a partir de filas (anio, mes, medio, montos) del cubo
+    {} si el anunciante no tiene inversión registrada
+    """
+    
+    if not filas:
+        return {}
+    
+    por_medio = {}
+    por_mes = {}
+    
+    for fila in filas:
+        monto_usd = float(fila['monto_usd'] or 0)
+        monto_gs = float(fila['monto_gs'] or 0)
+        
+        medio = por_medio.setdefault(fila['medio'], {'medio': fila['medio'], 'monto_usd': 0.0, 'monto_gs': 0.0, 'registros': 0})
+        medio['monto_usd'] += monto_usd
+        medio['monto_gs'] += monto_gs
+        medio['registros'] += int(fila['registros'] or 0)
+        
+        if fila['anio'] is not None and fila['mes'] is not None:
+            mes = por_mes.setdefault((fila['anio'], fila['mes']), {'anio': fila['anio'], 'mes': fila['mes'], 'monto_usd': 0.0, 'monto_gs': 0.0})
+            mes['monto_usd'] += monto_usd
+            mes['monto_gs'] += monto_gs
+    
+    total_usd = sum(medio['monto_usd'] for medio in por_medio.values())
+    
+    return {
+        'total_usd': total_usd,
+        'por_medio': sorted(por_medio.values(), key=lambda medio: medio['monto_usd'], reverse=True),
+        'evolucion_mensual': [por_mes[periodo] for periodo in sorted(por_mes)]
+    }
+
+def merge_all_sources_360(cliente_info, facturacion_data, ranking_data, perfil_data, inversion_granular, db_engine):
     """
     FUNCIÓN CLAVE: Integra todas las fuentes en estructura única 360°
     """
@@ -368,6 +458,7 @@ def merge_all_sources_360(cliente_info, facturacion_data, ranking_data, perfil_d
         'inversion_total_usd': perfil_data.get('inversion_total_usd', 0),
         'inversiones_detalle': perfil_data.get('inversiones_detalle', {}),
         'mix_medios': perfil_data.get('mix_medios', {}),
+        'inversion_granular': inversion_granular or {},
         
         # ORGANIZACIONAL
         'central_medios': perfil_data.get('central_medios', ''),
@@ -384,7 +475,7 @@ def merge_all_sources_360(cliente_info, facturacion_data, ranking_data, perfil_d
         cliente_360['roi_publicitario'] = 0
     
     # Market share calculado vs total del mercado
-    cliente_360['market_share'] = calcular_market_share(cliente_360['facturacion'])
+    cliente_360['market_share'] = calcular_market_share(cliente_360['facturacion'], get_totales_mercado(db_engine))
     
     # Perfil estratégico calculado
     cliente_360['perfil_estrategico'] = generar_perfil_estrategico(perfil_data)
@@ -401,14 +492,6 @@ def merge_all_sources_360(cliente_info, facturacion_data, ranking_data, perfil_d
     
     return cliente_360
 
-def calcular_market_share(facturacion_cliente):
-    """Calcular market share aproximado"""
-    # Simplificado - en producción usar suma total del mercado
-    if facturacion_cliente > 20000000000:  # 20B+
-        return round((facturacion_cliente / 200000000000) * 100, 2)  # Asumiendo mercado 200B
-    else:
-        return 0
-
 def generar_perfil_estrategico(perfil_data):
     """Generar descripción de perfil estratégico"""
     cluster = perfil_data.get('cluster', '')
@@ -423,23 +506,6 @@ def generar_perfil_estrategico(perfil_data):
     else:
         return "Perfil en desarrollo"
 
-def limpiar_query(query):
-    """Limpiar query para fuzzy matching"""
-    import re
-    
-    # Quitar stopwords
-    stopwords = ['cuanto', 'cuánto', 'facturo', 'facturó', 'invirtió', 'invirti', 'de', 'la', 'el', 'en', 'y', 'tv', 'television']
-    
-    # Limpiar query
-    query_clean = query.lower().strip()
-    for word in stopwords:
-        query_clean = query_clean.replace(word, ' ')
-    
-    # Limpiar espacios extra
-    query_clean = re.sub(r'\s+', ' ', query_clean).strip()
-    
-    return query_clean
-
 def get_facturacion_enriched_fallback(user_query):
     """Fallback al sistema anterior si el 360° falla"""
     logger.warning("⚠️ Usando sistema fallback")
@@ -487,6 +553,7 @@ def format_data_for_claude_360(rows, query_type):
             'registros': datos.get('registros', 0),
             'divisiones': datos.get('divisiones', ''),
             'arenas': datos.get('arenas', ''),
+            'evolucion_mensual': datos.get('evolucion_mensual', []),
             
             # PERFIL ADLENS - CORREGIDO
             'cluster': datos.get('perfil_adlens', {}).get('cluster', ''),
@@ -496,7 +563,7 @@ def format_data_for_claude_360(rows, query_type):
             'ranking': datos.get('ranking_dnit', {}).get('ranking'),
             'aporte_dnit': datos.get('ranking_dnit', {}).get('aporte_gs', 0),
             
-            'market_share': row.get('market_share', 0),
+            'market_share': datos.get('market_share', row.get('market_share', 0)),
         }
         
         formatted_clients.append(cliente_360)
@@ -512,210 +579,105 @@ def identify_cliente_automatico_robusto(user_query, db_engine):
     logger.info(f"🔍 Identificación automática para: {user_query}")
     
     try:
-        with db_engine.connect() as conn:
-            # Obtener todos los clientes
-            stmt = text("""
-                SELECT 
-                    p.anunciante_id,
-                    p.nombre_anunciante as nombre,
-                    p.cluster,
-                    p.rubro_principal
-                FROM dim_anunciante_perfil p
-                WHERE p.nombre_anunciante IS NOT NULL
-                ORDER BY p.anunciante_id
-            """)
-            
-            clientes = conn.execute(stmt).fetchall()
-            
-            # PASO 1: Normalizar query
-            query_clean = normalizar_nombre_cliente(user_query)
-            logger.info(f"🔧 Query normalizado: '{query_clean}'")
-            
-            # PASO 2: COINCIDENCIA EXACTA (Prioridad Máxima)
-            exact_match = buscar_coincidencia_exacta(query_clean, clientes)
-            if exact_match:
-                logger.info(f"✅ COINCIDENCIA EXACTA: {exact_match['nombre']}")
-                return exact_match
-            
-            # PASO 3: ALIASES AUTOMÁTICOS
-            alias_match = buscar_por_aliases(query_clean, clientes)
-            if alias_match:
-                logger.info(f"✅ ALIAS encontrado: {alias_match['nombre']}")
-                return alias_match
-            
-            # PASO 4: FUZZY ESTRICTO (último recurso)
-            fuzzy_match = buscar_fuzzy_estricto(query_clean, clientes)
-            if fuzzy_match:
-                logger.info(f"✅ FUZZY ESTRICTO: {fuzzy_match['nombre']} (score: {fuzzy_match['score']:.2f})")
-                return fuzzy_match
-            
-            # No encontrado
-            logger.warning(f"❌ Cliente no identificado: {query_clean}")
-            return None
+        # Índice en memoria (se construye una vez por proceso) y aliases/reglas de la base
+        indice = get_indice_anunciantes(db_engine)
+        matcher = get_matcher_aliases(db_engine)
+        
+        # PASO 1: Normalizar query
+        query_clean = normalizar_nombre_cliente(user_query)
+        logger.info(f"🔧 Query normalizado: '{query_clean}'")
+        
+        # PASO 2: COINCIDENCIA EXACTA (Prioridad Máxima)
+        exact_match = buscar_coincidencia_exacta(query_clean, indice.candidatos_exactos(query_clean))
+        if exact_match:
+            logger.info(f"✅ COINCIDENCIA EXACTA: {exact_match['nombre']}")
+            return exact_match
+        
+        # PASO 3: ALIASES (dim_anunciante_aliases)
+        alias_match = buscar_por_aliases(query_clean, matcher)
+        if alias_match:
+            logger.info(f"✅ ALIAS encontrado: {alias_match['nombre']}")
+            return alias_match
+        
+        # PASO 4: FUZZY ESTRICTO (último recurso)
+        fuzzy_match = buscar_fuzzy_estricto(query_clean, indice.candidatos_fuzzy(query_clean), matcher.reglas_negativas)
+        if fuzzy_match:
+            logger.info(f"✅ FUZZY ESTRICTO: {fuzzy_match['nombre']} (score: {fuzzy_match['score']:.2f})")
+            return fuzzy_match
+        
+        # No encontrado
+        logger.warning(f"❌ Cliente no identificado: {query_clean}")
+        return None
             
     except Exception as e:
         logger.error(f"❌ Error en identificación automática: {e}")
         return None
 
-def normalizar_nombre_cliente(query):
-    """Normalizar y limpiar nombre del cliente"""
-    
-    stopwords = [
-        'cuanto', 'cuánto', 'facturo', 'facturó', 'invirtió', 'invirti', 
-        'datos', 'informacion', 'perfil', 'de', 'la', 'el', 'en', 'y', 
-        'tv', 'television', 'facturacion', 'ranking', 'cluster', 'cultura'
-    ]
-    
-    query_clean = query.lower().strip()
-    
-    # Remover stopwords
-    for word in stopwords:
-        query_clean = re.sub(rf'\b{word}\b', '', query_clean, flags=re.IGNORECASE)
-    
-    # Limpiar espacios y caracteres especiales
-    query_clean = re.sub(r'[^\w\s]', ' ', query_clean)
-    query_clean = re.sub(r'\s+', ' ', query_clean).strip()
-    
-    return query_clean
-
 def buscar_coincidencia_exacta(query_clean, clientes):
     """Buscar coincidencia exacta o casi exacta"""
     
+    query_words = set(query_clean.split())
+    
     for cliente in clientes:
-        nombre = cliente.nombre or ""
+        nombre = normalizar_nombre(cliente.nombre)
         
         # 1. Coincidencia exacta completa
-        if query_clean.lower() == nombre.lower():
+        if query_clean == nombre:
             return crear_resultado_cliente(cliente, 1.0, "exact_full")
         
         # 2. Coincidencia por palabras exactas
-        query_words = set(query_clean.lower().split())
-        nombre_words = set(nombre.lower().split())
+        nombre_words = set(nombre.split())
         
         if query_words.issubset(nombre_words):
             return crear_resultado_cliente(cliente, 0.95, "exact_words")
         
         # 3. Inicio exacto (ej: "unilever" → "UNILEVER DE PARAGUAY")
-        if nombre.lower().startswith(query_clean.lower()) and len(query_clean) >= 5:
+        if nombre.startswith(query_clean) and len(query_clean) >= 5:
             return crear_resultado_cliente(cliente, 0.9, "exact_start")
     
     return None
 
-def buscar_por_aliases(query_clean, clientes):
-    """Buscar usando aliases conocidos automáticamente"""
-    
-    # Aliases automáticos para marcas conocidas
-    aliases_automaticos = {
-        # Cervezas
-        'cervepar': ['cervepar'],
-        'pilsen': ['pilsen'],
-        'brahma': ['brahma'],
-        'telecel': ['telecel'],
-        'banco familiar': ['banco familiar'],
-        'distribuidora del paraguay': ['distribuidora del paraguay', 'distribuidora paraguay'],
-        
-        # Telecos
-        'tigo': ['tigo paraguay'],
-        'personal': ['personal', 'telecom personal'],
-        'telefonica': ['telefonica'],
-        
-        # Marcas globales
-        'unilever': ['unilever'],
-        'nestle': ['nestle', 'nestlé'],
-        'coca cola': ['coca cola', 'coca-cola'],
-        
-        # Bancos
-        'banco nacional': ['banco nacional'],
-        'banco continental': ['banco continental'],
-        
-        # Retail
-        'carrefour': ['carrefour'],
-        'superseis': ['superseis', 'super seis'],
-    }
-    
-    # Buscar en aliases
-    for alias_key, alias_variants in aliases_automaticos.items():
-        if any(variant in query_clean.lower() for variant in alias_variants):
-            # Buscar cliente que contenga esta palabra clave
-            for cliente in clientes:
-                nombre = cliente.nombre or ""
-                if alias_key in nombre.lower():
-                    return crear_resultado_cliente(cliente, 0.85, f"alias_{alias_key}")
+def buscar_por_aliases(query_clean, matcher):
+    """Buscar en los aliases de la base (hit exacto o alias mencionado en el query)"""
     
-    return None
+    return matcher.buscar(query_clean)
 
-def buscar_fuzzy_estricto(query_clean, clientes):
-    """Fuzzy matching estricto con validaciones anti-falsos positivos"""
+def buscar_fuzzy_estricto(query_clean, clientes, reglas_negativas):
+    """
+    Fuzzy matching estricto con validaciones anti-falsos positivos (scoring por lotes)
+    reglas_negativas: (patrones_query, patrones_nombre) de dim_anunciante_alias_negativo
+    """
     
-    best_match = None
-    best_score = 0
+    if not clientes:
+        return None
     
-    for cliente in clientes:
-        nombre = cliente.nombre or ""
-        
-        # Calcular similarity
-        score = difflib.SequenceMatcher(None, query_clean.lower(), nombre.lower()).ratio()
-        
-        # VALIDACIONES ESTRICTAS
-        
-        # 1. Score mínimo mucho más alto
-        if score < 0.75:  # Era 0.4, ahora 0.75
-            continue
-        
-        # 2. Detectar falsos positivos obvios
-        if es_falso_positivo_obvio(query_clean, nombre):
-            logger.warning(f"⚠️ Falso positivo detectado: '{query_clean}' vs '{nombre}'")
-            continue
-        
-        # 3. Validar longitud similar
-        if abs(len(query_clean) - len(nombre)) > len(query_clean) * 0.7:
-            continue
-        
-        # 4. Primera palabra debe coincidir parcialmente
-        query_first = query_clean.split()[0] if query_clean.split() else ""
-        nombre_first = nombre.split()[0] if nombre.split() else ""
-        
-        if len(query_first) >= 4 and len(nombre_first) >= 4:
-            if query_first[:3].lower() != nombre_first[:3].lower():
-                continue
-        
-        if score > best_score:
-            best_score = score
-            best_match = crear_resultado_cliente(cliente, score, "fuzzy_strict")
+    corpus = CorpusFuzzy([normalizar_nombre(cliente.nombre) for cliente in clientes])
     
-    # Solo retornar si score es realmente alto
-    if best_match and best_score >= 0.8:
-        return best_match
+    # Score mínimo mucho más alto (era 0.4, ahora 0.75)
+    scores = corpus.puntuar(query_clean, score_cutoff=0.75)
+    candidatos = scores >= 0.75
     
-    return None
-
-def es_falso_positivo_obvio(query, nombre):
-    """Detectar falsos positivos conocidos"""
+    # VALIDACIONES ESTRICTAS (filtros vectorizados)
     
-    falsos_positivos = [
-        # Cervezas diferentes
-        (["cervepar"], ["cerveza diosa", "diosa"]),
-        (["brahma"], ["brahma garcia"]),
-        
-        # Telecos diferentes  
-        (["tigo"], ["tigo sports"]),
-        (["personal"], ["personal envios"]),
-        (["telefonica"], ["telefonica celular"]),
-        
-        # Evitar confusiones genéricas
-        (["nacional"], ["banco nacional de fomento"]),
-        (["central"], ["banco central", "mercado central"]),
-    ]
+    # 1. Detectar falsos positivos obvios
+    falsos = corpus.mascara_falsos_positivos(query_clean, reglas_negativas) & candidatos
+    for pos in np.flatnonzero(falsos):
+        logger.warning(f"⚠️ Falso positivo detectado: '{query_clean}' vs '{clientes[pos].nombre}'")
     
-    query_lower = query.lower()
-    nombre_lower = nombre.lower()
+    # 2. Validar longitud similar
+    # 3. Primera palabra debe coincidir parcialmente
+    mascara = (~falsos
+               & corpus.mascara_longitud(query_clean)
+               & corpus.mascara_primera_palabra(query_clean))
     
-    for query_patterns, nombre_patterns in falsos_positivos:
-        if any(pattern in query_lower for pattern in query_patterns):
-            if any(pattern in nombre_lower for pattern in nombre_patterns):
-                return True
+    mejores = top_k(scores, k=1, score_cutoff=0.75, mascara=mascara)
     
-    return False
+    # Solo retornar si score es realmente alto
+    if mejores and mejores[0][1] >= 0.8:
+        pos, score = mejores[0]
+        return crear_resultado_cliente(clientes[pos], score, "fuzzy_strict")
+    
+    return None
 
 def crear_resultado_cliente(cliente, score, method):
     """Crear objeto resultado estandarizado"""
@@ -735,7 +697,7 @@ def es_consulta_de_cliente(user_query, db_engine):
     Detectar si una query es sobre un cliente específico
     """
     try:
-        cliente_info = identify_cliente_automatico_robusto(user_query, db_engine)
+        cliente_info = resolver_identidad_cliente(user_query, db_engine)
         
         if cliente_info and cliente_info['score'] >= 0.8:
             return cliente_info
@@ -746,27 +708,40 @@ def es_consulta_de_cliente(user_query, db_engine):
         logger.error(f"❌ Error detectando cliente: {e}")
         return None
 
-def get_consulta_compleja_sin_claude(user_query, db_engine):
+# Palabras clave del router de consultas complejas
+_CLAVES_COMPARACION = compilar_claves(["comparar", "compare", "vs", "versus"])
+_CLAVES_RANKING = compilar_claves(["top", "ranking", "mejores", "mayores"])
+_CLAVES_CLUSTERS = compilar_claves(["cluster", "clusters", "grupos"])
+_CLAVES_COMPLETO = compilar_claves(["completo", "full", "todo", "todos"])
+_CLAVES_ESTADISTICAS = compilar_claves(["estadisticas", "stats", "resumen"])
+_CLAVES_MERCADO = compilar_claves(["mercado"])
+_CLAVES_CAMBIOS = compilar_claves(["cambio", "cambiado", "variacion", "ultima carga", "carga anterior"])
+
+def get_consulta_compleja_sin_claude(user_query, db_engine, despues_de=None):
     """
     Procesar consultas complejas que retornan datos puros sin análisis de Claude
+    despues_de: cursor 'siguiente' de la página anterior de un ranking ("ver más")
     """
     
-    query_lower = user_query.lower()
+    query_norm = normalizar_texto(user_query)
     
     # DETECTAR TIPO DE CONSULTA COMPLEJA
-    if any(w in query_lower for w in ["comparar", "compare", "vs", "versus"]):
+    if _CLAVES_MERCADO.search(query_norm) and _CLAVES_CAMBIOS.search(query_norm):
+        return consulta_cambios_mercado(user_query, db_engine)
+    
+    elif _CLAVES_COMPARACION.search(query_norm):
         return consulta_comparacion_clientes(user_query, db_engine)
     
-    elif any(w in query_lower for w in ["top", "ranking", "mejores", "mayores"]):
-        return consulta_ranking_avanzado(user_query, db_engine)
+    elif _CLAVES_RANKING.search(query_norm):
+        return consulta_ranking_avanzado(user_query, db_engine, despues_de=despues_de)
     
-    elif any(w in query_lower for w in ["cluster", "clusters", "grupos"]):
+    elif _CLAVES_CLUSTERS.search(query_norm):
         return consulta_analisis_clusters(user_query, db_engine)
     
-    elif any(w in query_lower for w in ["completo", "full", "todo", "todos"]):
+    elif _CLAVES_COMPLETO.search(query_norm):
         return consulta_datos_completos(user_query, db_engine)
     
-    elif any(w in query_lower for w in ["estadisticas", "stats", "resumen"]):
+    elif _CLAVES_ESTADISTICAS.search(query_norm):
         return consulta_estadisticas_mercado(user_query, db_engine)
     
     else:
@@ -780,25 +755,16 @@ def consulta_comparacion_clientes(user_query, db_engine):
     
     logger.info(f"🔍 Consulta comparación: {user_query}")
     
-    # Extraer nombres de clientes de la query
-    clientes_encontrados = []
-    posibles_clientes = ["unilever", "nestle", "coca cola", "cervepar", "tigo", "personal", "telefonica", "banco"]
-    
-    for cliente in posibles_clientes:
-        if cliente in user_query.lower():
-            info = identify_cliente_automatico_robusto(cliente, db_engine)
-            if info:
-                clientes_encontrados.append(info)
+    # Extraer todos los clientes mencionados en una sola pasada (nombres + aliases)
+    clientes_encontrados = get_extractor_menciones(db_engine).extraer(user_query)
+    logger.info(f"👥 Clientes mencionados: {[c['nombre'] for c in clientes_encontrados]}")
     
     if len(clientes_encontrados) < 2:
         # Si no encuentra múltiples, buscar top 5 para comparar
         clientes_encontrados = get_top_clientes_para_comparacion(db_engine)
     
-    # Obtener datos completos de cada cliente
-    comparacion_data = []
-    for cliente in clientes_encontrados:
-        datos = get_datos_completos_cliente(cliente['anunciante_id'], db_engine)
-        comparacion_data.append(datos)
+    # Datos completos de todos los clientes en una sola consulta
+    comparacion_data = get_datos_completos_clientes([c['anunciante_id'] for c in clientes_encontrados], db_engine)
     
     return {
         'tipo': 'comparacion',
@@ -810,161 +776,127 @@ def consulta_comparacion_clientes(user_query, db_engine):
         ]
     }
 
-def consulta_ranking_avanzado(user_query, db_engine):
+def consulta_ranking_avanzado(user_query, db_engine, despues_de=None):
     """
     Rankings con múltiples criterios y filtros
-    Ej: "top 10 clientes por facturacion con cluster y medios"
+    Ej: "top 10 clientes por facturacion con cluster y medios", "top 30 en 2024 de la division X"
+    N, año, división, arena y cluster salen de la consulta (15 si no pide cantidad);
+    despues_de: cursor 'siguiente' de la página anterior ("ver más")
     """
     
     logger.info(f"🔍 Consulta ranking avanzado: {user_query}")
     
     try:
-        with db_engine.connect() as conn:
-            stmt = text("""
-                SELECT 
-                    f.anunciante_id,
-                    p.nombre_anunciante,
-                    SUM(f.facturacion) as facturacion_total,
-                    SUM(f.revenue) as revenue_total,
-                    COUNT(*) as registros,
-                    p.cluster,
-                    p.cultura,
-                    p.competitividad,
-                    p.puntaje_total,
-                    CAST(p.inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT) as inv_tv,
-                    CAST(p.inversion_en_radio_2024_en_miles_usd AS FLOAT) as inv_radio,
-                    CAST(p.inversion_en_cable_2024_en_miles_usd AS FLOAT) as inv_cable,
-                    d.ranking as ranking_dnit,
-                    d.aporte_gs
-                FROM fact_facturacion f
-                JOIN dim_anunciante_perfil p ON f.anunciante_id = p.anunciante_id
-                LEFT JOIN dim_posicionamiento_dnit d ON f.anunciante_id = d.anunciante_id
-                GROUP BY f.anunciante_id, p.nombre_anunciante, p.cluster, p.cultura, 
-                         p.competitividad, p.puntaje_total, p.inversion_en_tv_abierta_2024_en_miles_usd,
-                         p.inversion_en_radio_2024_en_miles_usd, p.inversion_en_cable_2024_en_miles_usd,
-                         d.ranking, d.aporte_gs
-                ORDER BY facturacion_total DESC
-                LIMIT 15
-            """)
-            
-            results = conn.execute(stmt).fetchall()
-            
-            ranking_data = []
-            total_mercado = sum(row.facturacion_total for row in results)
-            
-            for i, row in enumerate(results, 1):
-                market_share = (row.facturacion_total / total_mercado * 100) if total_mercado > 0 else 0
-                
-                ranking_data.append({
-                    'posicion': i,
-                    'anunciante_id': row.anunciante_id,
-                    'nombre': row.nombre_anunciante,
-                    'facturacion_total': float(row.facturacion_total),
-                    'revenue_total': float(row.revenue_total),
-                    'market_share': round(market_share, 2),
-                    'registros': row.registros,
-                    'cluster': row.cluster,
-                    'cultura': row.cultura,
-                    'competitividad': row.competitividad,
-                    'puntaje_total': row.puntaje_total,
-                    'inversiones': {
-                        'tv_abierta': float(row.inv_tv or 0),
-                        'radio': float(row.inv_radio or 0),
-                        'cable': float(row.inv_cable or 0)
-                    },
-                    'ranking_dnit': row.ranking_dnit,
-                    'aporte_dnit': float(row.aporte_gs or 0)
-                })
-            
-            return {
-                'tipo': 'ranking_avanzado',
-                'total_clientes': len(ranking_data),
-                'mercado_total': float(total_mercado),
-                'datos': ranking_data
-            }
+        filtros = parsear_consulta_ranking(user_query, db_engine)
+        limite = filtros.pop('limite') or 15
+        
+        # Página del ranking precalculado (solo con perfil AdLens) + sus filas 360° (cacheadas)
+        pagina = get_pagina_ranking(db_engine, limite=limite, despues_de=despues_de, solo_con_perfil=True, **filtros)
+        ranking = pagina['datos']
+        filas = get_filas_360(db_engine, [cliente['anunciante_id'] for cliente in ranking])
+        
+        ranking_data = []
+        
+        for cliente in ranking:
+            row = filas[cliente['anunciante_id']]
+            
+            ranking_data.append({
+                'posicion': cliente['posicion'],
+                'anunciante_id': cliente['anunciante_id'],
+                'nombre': row.nombre_anunciante,
+                'facturacion_total': cliente['facturacion'],
+                'revenue_total': cliente['revenue'],
+                'market_share': round(cliente['market_share'], 2),
+                'registros': cliente['registros'],
+                'cluster': row.cluster,
+                'cultura': row.cultura,
+                'competitividad': row.competitividad,
+                'puntaje_total': row.puntaje_total,
+                'inversiones': {
+                    'tv_abierta': float(row.inv_tv or 0),
+                    'radio': float(row.inv_radio or 0),
+                    'cable': float(row.inv_cable or 0)
+                },
+                'ranking_dnit': row.ranking,
+                'aporte_dnit': float(row.aporte_gs or 0)
+            })
+        
+        return {
+            'tipo': 'ranking_avanzado',
+            'total_clientes': len(ranking_data),
+            'mercado_total': get_totales_mercado(db_engine)['total'],
+            'filtros': {nombre: valor for nombre, valor in filtros.items() if valor is not None},
+            'datos': ranking_data,
+            'siguiente': pagina['siguiente']
+        }
     
     except Exception as e:
         logger.error(f"❌ Error ranking avanzado: {e}")
         return {'error': str(e)}
 
-def consulta_analisis_clusters(user_query, db_engine):
+def consulta_analisis_clusters(user_query, db_engine, anio=None):
     """
-    Análisis por clusters empresariales - VERSIÓN CORREGIDA
+    Análisis por clusters empresariales desde cubo_clusters (14_cubo_clusters.sql)
     Ej: "analisis por clusters con inversiones"
+    anio: limitar facturación e inversión en medios a un año (None = todos)
     """
     
     logger.info(f"🔍 Análisis clusters: {user_query}")
     
     try:
-        with db_engine.connect() as conn:
+        with conexion(db_engine) as conn:
+            # Filas del año pedido: una por cluster (medio vacío) + una por cluster y medio
             stmt = text("""
                 SELECT 
-                    p.cluster,
-                    COUNT(*) as total_empresas,
-                    COUNT(f.anunciante_id) as empresas_con_facturacion,
-                    SUM(f.facturacion) as facturacion_cluster,
-                    AVG(f.facturacion) as promedio_facturacion,
-                    AVG(
-                        CASE 
-                            WHEN p.competitividad = '-' OR p.competitividad IS NULL OR p.competitividad = '' THEN NULL
-                            ELSE CAST(p.competitividad AS FLOAT)
-                        END
-                    ) as competitividad_promedio,
-                    AVG(
-                        CASE 
-                            WHEN p.puntaje_total = '-' OR p.puntaje_total IS NULL OR p.puntaje_total = '' THEN NULL
-                            ELSE CAST(p.puntaje_total AS FLOAT)
-                        END
-                    ) as puntaje_promedio,
-                    SUM(
-                        CASE 
-                            WHEN p.inversion_en_tv_abierta_2024_en_miles_usd = '-' OR p.inversion_en_tv_abierta_2024_en_miles_usd IS NULL OR p.inversion_en_tv_abierta_2024_en_miles_usd = '' THEN 0
-                            ELSE CAST(p.inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT)
-                        END
-                    ) as inversion_tv_total,
-                    SUM(
-                        CASE 
-                            WHEN p.inversion_en_radio_2024_en_miles_usd = '-' OR p.inversion_en_radio_2024_en_miles_usd IS NULL OR p.inversion_en_radio_2024_en_miles_usd = '' THEN 0
-                            ELSE CAST(p.inversion_en_radio_2024_en_miles_usd AS FLOAT)
-                        END
-                    ) as inversion_radio_total,
-                    SUM(
-                        CASE 
-                            WHEN p.inversion_en_cable_2024_en_miles_usd = '-' OR p.inversion_en_cable_2024_en_miles_usd IS NULL OR p.inversion_en_cable_2024_en_miles_usd = '' THEN 0
-                            ELSE CAST(p.inversion_en_cable_2024_en_miles_usd AS FLOAT)
-                        END
-                    ) as inversion_cable_total
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.cluster IS NOT NULL AND p.cluster != ''
-                GROUP BY p.cluster
-                ORDER BY facturacion_cluster DESC NULLS LAST
+                    cluster,
+                    medio,
+                    empresas,
+                    empresas_con_facturacion,
+                    facturacion,
+                    competitividad_promedio,
+                    puntaje_promedio,
+                    inversion_tv_perfil,
+                    inversion_radio_perfil,
+                    inversion_cable_perfil,
+                    inversion_usd
+                FROM cubo_clusters
+                WHERE COALESCE(anio, 0) = :anio
+                ORDER BY facturacion DESC, cluster, inversion_usd DESC
             """)
             
-            results = conn.execute(stmt).fetchall()
-            
-            clusters_data = []
-            for row in results:
-                clusters_data.append({
+            results = conn.execute(stmt, {'anio': anio or 0}).fetchall()
+        
+        clusters = {}
+        for row in results:
+            if row.medio is None:
+                clusters[row.cluster] = {
                     'cluster': row.cluster,
-                    'total_empresas': row.total_empresas,
+                    'total_empresas': row.empresas,
                     'empresas_con_facturacion': row.empresas_con_facturacion,
-                    'facturacion_total': float(row.facturacion_cluster or 0),
-                    'promedio_facturacion': float(row.promedio_facturacion or 0),
+                    'facturacion_total': float(row.facturacion),
+                    'promedio_facturacion': float(row.facturacion / row.empresas_con_facturacion) if row.empresas_con_facturacion else 0.0,
                     'competitividad_promedio': round(float(row.competitividad_promedio or 0), 2),
                     'puntaje_promedio': round(float(row.puntaje_promedio or 0), 1),
                     'inversiones_totales': {
-                        'tv_abierta': float(row.inversion_tv_total or 0),
-                        'radio': float(row.inversion_radio_total or 0),
-                        'cable': float(row.inversion_cable_total or 0)
-                    }
-                })
-            
-            return {
-                'tipo': 'analisis_clusters',
-                'total_clusters': len(clusters_data),
-                'datos': clusters_data
-            }
+                        'tv_abierta': float(row.inversion_tv_perfil),
+                        'radio': float(row.inversion_radio_perfil),
+                        'cable': float(row.inversion_cable_perfil)
+                    },
+                    'inversion_medios_usd': {}
+                }
+        
+        for row in results:
+            if row.medio is not None and row.cluster in clusters:
+                clusters[row.cluster]['inversion_medios_usd'][row.medio] = float(row.inversion_usd)
+        
+        clusters_data = list(clusters.values())
+        
+        return {
+            'tipo': 'analisis_clusters',
+            'anio': anio,
+            'total_clusters': len(clusters_data),
+            'datos': clusters_data
+        }
     
     except Exception as e:
         logger.error(f"❌ Error análisis clusters: {e}")
@@ -992,231 +924,232 @@ def consulta_datos_completos(user_query, db_engine):
         'datos': datos
     }
 
+_SQL_MARKET_SNAPSHOTS = text("""
+    SELECT 
+        cargado_en,
+        data_version,
+        total_clientes_facturacion,
+        total_anunciantes_mercado,
+        mercado_total_facturacion,
+        mercado_total_revenue,
+        promedio_facturacion,
+        total_registros,
+        top_sectores
+    FROM market_snapshot
+    ORDER BY cargado_en DESC
+    LIMIT :cantidad
+""")
+
+def get_market_snapshots(db_engine, cantidad=1):
+    """Últimos snapshots del mercado (15_market_snapshot.sql), del más nuevo al más viejo"""
+    with conexion(db_engine) as conn:
+        return conn.execute(_SQL_MARKET_SNAPSHOTS, {'cantidad': cantidad}).fetchall()
+
+def formatear_market_snapshot(snapshot):
+    """resumen_general + top 5 sectores de un snapshot"""
+    return {
+        'cargado_en': snapshot.cargado_en.isoformat(),
+        'data_version': snapshot.data_version,
+        'resumen_general': {
+            'total_clientes_facturacion': snapshot.total_clientes_facturacion,
+            'total_anunciantes_mercado': snapshot.total_anunciantes_mercado,
+            'mercado_total_facturacion': float(snapshot.mercado_total_facturacion),
+            'mercado_total_revenue': float(snapshot.mercado_total_revenue),
+            'promedio_facturacion': float(snapshot.promedio_facturacion),
+            'total_registros': snapshot.total_registros
+        },
+        'top_sectores': [
+            {
+                'sector': sector['sector'],
+                'empresas': sector['empresas'],
+                'facturacion': float(sector['facturacion'] or 0),
+                'competitividad_promedio': round(float(sector['competitividad_promedio'] or 0), 2)
+            }
+            for sector in snapshot.top_sectores[:5]
+        ]
+    }
+
 def consulta_estadisticas_mercado(user_query, db_engine):
     """
-    Estadísticas generales del mercado
+    Estadísticas generales del mercado desde el último snapshot de carga
     Ej: "estadisticas del mercado publicitario"
     """
     
     logger.info(f"🔍 Estadísticas mercado: {user_query}")
     
     try:
-        with db_engine.connect() as conn:
-            # Estadísticas generales
-            stmt = text("""
-                SELECT 
-                    COUNT(DISTINCT f.anunciante_id) as total_clientes_facturacion,
-                    COUNT(DISTINCT p.anunciante_id) as total_anunciantes_mercado,
-                    SUM(f.facturacion) as mercado_total_facturacion,
-                    SUM(f.revenue) as mercado_total_revenue,
-                    AVG(f.facturacion) as promedio_facturacion,
-                    COUNT(f.*) as total_registros
-                FROM fact_facturacion f
-                FULL OUTER JOIN dim_anunciante_perfil p ON f.anunciante_id = p.anunciante_id
-            """)
-            
-            result = conn.execute(stmt).fetchone()
-            
-            # Top 5 sectores por facturación
-            stmt_sectores = text("""
-                SELECT 
-                    p.rubro_principal,
-                    COUNT(*) as empresas,
-                    SUM(f.facturacion) as facturacion_sector,
-                    AVG(CAST(p.competitividad AS FLOAT)) as competitividad_promedio
-                FROM fact_facturacion f
-                JOIN dim_anunciante_perfil p ON f.anunciante_id = p.anunciante_id
-                WHERE p.rubro_principal IS NOT NULL
-                GROUP BY p.rubro_principal
-                ORDER BY facturacion_sector DESC
-                LIMIT 5
-            """)
-            
-            sectores = conn.execute(stmt_sectores).fetchall()
-            
-            return {
-                'tipo': 'estadisticas_mercado',
-                'resumen_general': {
-                    'total_clientes_facturacion': result.total_clientes_facturacion,
-                    'total_anunciantes_mercado': result.total_anunciantes_mercado,
-                    'mercado_total_facturacion': float(result.mercado_total_facturacion or 0),
-                    'mercado_total_revenue': float(result.mercado_total_revenue or 0),
-                    'promedio_facturacion': float(result.promedio_facturacion or 0),
-                    'total_registros': result.total_registros
-                },
-                'top_sectores': [
-                    {
-                        'sector': row.rubro_principal,
-                        'empresas': row.empresas,
-                        'facturacion': float(row.facturacion_sector),
-                        'competitividad_promedio': round(float(row.competitividad_promedio or 0), 2)
-                    }
-                    for row in sectores
-                ]
-            }
+        snapshots = get_market_snapshots(db_engine)
+        
+        if not snapshots:
+            return {'error': 'Sin snapshot del mercado (correr python post_carga.py)'}
+        
+        return {
+            'tipo': 'estadisticas_mercado',
+            **formatear_market_snapshot(snapshots[0])
+        }
     
     except Exception as e:
         logger.error(f"❌ Error estadísticas: {e}")
         return {'error': str(e)}
 
+def _variacion(actual, anterior):
+    """Diferencia absoluta y porcentual entre dos valores"""
+    return {
+        'actual': actual,
+        'anterior': anterior,
+        'diferencia': actual - anterior,
+        'variacion_pct': round((actual - anterior) * 100.0 / anterior, 2) if anterior else None
+    }
+
+def consulta_cambios_mercado(user_query, db_engine):
+    """
+    Cambios del mercado entre las dos últimas cargas (compara snapshots, no recorre los hechos)
+    Ej: "como cambio el mercado desde la ultima carga"
+    """
+    
+    logger.info(f"🔍 Cambios mercado: {user_query}")
+    
+    try:
+        snapshots = get_market_snapshots(db_engine, cantidad=2)
+        
+        if len(snapshots) < 2:
+            return {'error': 'Se necesitan al menos dos cargas para comparar el mercado'}
+        
+        actual = formatear_market_snapshot(snapshots[0])
+        anterior = formatear_market_snapshot(snapshots[1])
+        
+        sectores_anteriores = {sector['sector']: sector for sector in anterior['top_sectores']}
+        sectores_actuales = {sector['sector'] for sector in actual['top_sectores']}
+        
+        return {
+            'tipo': 'cambios_mercado',
+            'carga_actual': actual['cargado_en'],
+            'carga_anterior': anterior['cargado_en'],
+            'resumen_general': {
+                campo: _variacion(valor, anterior['resumen_general'][campo])
+                for campo, valor in actual['resumen_general'].items()
+            },
+            'top_sectores': [
+                {
+                    'sector': sector['sector'],
+                    'facturacion': _variacion(sector['facturacion'],
+                                              sectores_anteriores.get(sector['sector'], {}).get('facturacion', 0.0)),
+                    'nuevo_en_top': sector['sector'] not in sectores_anteriores
+                }
+                for sector in actual['top_sectores']
+            ],
+            'sectores_salieron_del_top': [sector for sector in sectores_anteriores if sector not in sectores_actuales]
+        }
+    
+    except Exception as e:
+        logger.error(f"❌ Error cambios mercado: {e}")
+        return {'error': str(e)}
+
 def get_datos_completos_cliente(anunciante_id, db_engine):
     """
     Obtener TODOS los datos disponibles de un cliente
     """
     
     try:
-        with db_engine.connect() as conn:
-            # Datos del perfil AdLens
-            stmt_perfil = text("""
-                SELECT 
-                    nombre_anunciante,
-                    rubro_principal,
-                    tamano_de_la_empresa_cantidad_de_empleados,
-                    cluster,
-                    tipo_de_cluster,
-                    cultura,
-                    ejecucion,
-                    estructura,
-                    competitividad,
-                    puntaje_total,
-                    CAST(inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT) as inv_tv,
-                    CAST(inversion_en_radio_2024_en_miles_usd AS FLOAT) as inv_radio,
-                    CAST(inversion_en_cable_2024_en_miles_usd AS FLOAT) as inv_cable,
-                    CAST(inversion_en_revistas_2024_en_miles_usd AS FLOAT) as inv_revistas,
-                    CAST(inversion_en_diarios_2024_en_miles_usd AS FLOAT) as inv_diarios,
-                    CAST(inversion_en_pdv_2024_en_miles_usd AS FLOAT) as inv_pdv,
-                    central_de_medios,
-                    tiene_la_empresa_departamento_de_marketing,
-                    en_que_medios_invierte_la_empresa_principalmente,
-                    la_empresa_invierte_en_digital
-                FROM dim_anunciante_perfil
-                WHERE anunciante_id = :anunciante_id
-            """)
-            
-            perfil = conn.execute(stmt_perfil, {"anunciante_id": anunciante_id}).fetchone()
-            
-            # Datos de facturación
-            stmt_facturacion = text("""
-                SELECT 
-                    SUM(facturacion) as facturacion_total,
-                    SUM(revenue) as revenue_total,
-                    SUM(costo) as costo_total,
-                    COUNT(*) as registros,
-                    AVG(facturacion) as promedio_mensual,
-                    MIN(fecha_fact) as primera_fecha,
-                    MAX(fecha_fact) as ultima_fecha,
-                    STRING_AGG(DISTINCT division, ', ') as divisiones,
-                    STRING_AGG(DISTINCT arena, ', ') as arenas
-                FROM fact_facturacion
-                WHERE anunciante_id = :anunciante_id
-            """)
-            
-            facturacion = conn.execute(stmt_facturacion, {"anunciante_id": anunciante_id}).fetchone()
-            
-            # Datos DNIT
-            stmt_dnit = text("""
-                SELECT 
-                    ranking,
-                    aporte_gs,
-                    ingreso_estimado_gs,
-                    razon_social
-                FROM dim_posicionamiento_dnit
-                WHERE anunciante_id = :anunciante_id
-            """)
-            
-            dnit = conn.execute(stmt_dnit, {"anunciante_id": anunciante_id}).fetchone()
-            
-            # Compilar datos completos
-            datos_completos = {
-                'identificacion': {
-                    'anunciante_id': anunciante_id,
-                    'nombre': perfil.nombre_anunciante if perfil else None,
-                    'rubro': perfil.rubro_principal if perfil else None,
-                    'tamaño_empresa': perfil.tamano_de_la_empresa_cantidad_de_empleados if perfil else None
-                },
-                'perfil_estrategico': {
-                    'cluster': perfil.cluster if perfil else None,
-                    'tipo_cluster': perfil.tipo_de_cluster if perfil else None,
-                    'cultura': perfil.cultura if perfil else None,
-                    'ejecucion': perfil.ejecucion if perfil else None,
-                    'estructura': perfil.estructura if perfil else None,
-                    'competitividad': perfil.competitividad if perfil else None,
-                    'puntaje_total': perfil.puntaje_total if perfil else None
-                } if perfil else {},
-                'facturacion_erp': {
-                    'facturacion_total': float(facturacion.facturacion_total or 0),
-                    'revenue_total': float(facturacion.revenue_total or 0),
-                    'costo_total': float(facturacion.costo_total or 0),
-                    'registros': facturacion.registros if facturacion else 0,
-                    'promedio_mensual': float(facturacion.promedio_mensual or 0),
-                    'primera_fecha': str(facturacion.primera_fecha) if facturacion and facturacion.primera_fecha else None,
-                    'ultima_fecha': str(facturacion.ultima_fecha) if facturacion and facturacion.ultima_fecha else None,
-                    'divisiones': facturacion.divisiones if facturacion else '',
-                    'arenas': facturacion.arenas if facturacion else ''
-                } if facturacion else {},
-                'inversiones_medios': {
-                    'tv_abierta_usd': float(perfil.inv_tv or 0),
-                    'radio_usd': float(perfil.inv_radio or 0),
-                    'cable_usd': float(perfil.inv_cable or 0),
-                    'revistas_usd': float(perfil.inv_revistas or 0),
-                    'diarios_usd': float(perfil.inv_diarios or 0),
-                    'pdv_usd': float(perfil.inv_pdv or 0),
-                    'total_usd': float((perfil.inv_tv or 0) + (perfil.inv_radio or 0) + (perfil.inv_cable or 0) + 
-                                     (perfil.inv_revistas or 0) + (perfil.inv_diarios or 0) + (perfil.inv_pdv or 0))
-                } if perfil else {},
-                'datos_organizacionales': {
-                    'central_medios': perfil.central_de_medios if perfil else None,
-                    'depto_marketing': perfil.tiene_la_empresa_departamento_de_marketing if perfil else None,
-                    'medios_principales': perfil.en_que_medios_invierte_la_empresa_principalmente if perfil else None,
-                    'invierte_digital': perfil.la_empresa_invierte_en_digital if perfil else None
-                } if perfil else {},
-                'ranking_dnit': {
-                    'ranking': dnit.ranking if dnit else None,
-                    'aporte_gs': float(dnit.aporte_gs or 0) if dnit else 0,
-                    'ingreso_estimado_gs': float(dnit.ingreso_estimado_gs or 0) if dnit else 0,
-                    'razon_social': dnit.razon_social if dnit else None
-                } if dnit else {}
-            }
-            
-            return datos_completos
+        return formatear_datos_completos_360(get_fila_360(db_engine, anunciante_id), get_totales_mercado(db_engine))
             
     except Exception as e:
         logger.error(f"❌ Error datos completos: {e}")
         return {'error': str(e)}
 
-def get_top_clientes_para_comparacion(db_engine, limit=5):
+def get_datos_completos_clientes(anunciante_ids, db_engine):
     """
-    Obtener top clientes para comparación
+    Datos completos de varios clientes en una sola consulta (comparaciones, top N)
+    Respeta el orden de anunciante_ids
     """
+    
     try:
-        with db_engine.connect() as conn:
-            stmt = text("""
-                SELECT DISTINCT
-                    p.anunciante_id,
-                    p.nombre_anunciante as nombre
-                FROM dim_anunciante_perfil p
-                JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.nombre_anunciante IS NOT NULL
-                ORDER BY p.anunciante_id
-                LIMIT :limit
-            """)
-            
-            results = conn.execute(stmt, {"limit": limit}).fetchall()
+        filas = get_filas_360(db_engine, anunciante_ids)
+        totales = get_totales_mercado(db_engine)
+        return [formatear_datos_completos_360(filas[int(anunciante_id)], totales) for anunciante_id in dict.fromkeys(anunciante_ids)]
             
-            return [
-                {
-                    'anunciante_id': row.anunciante_id,
-                    'nombre': row.nombre
-                }
-                for row in results
-            ]
+    except Exception as e:
+        logger.error(f"❌ Error datos completos: {e}")
+        return [{'error': str(e)}]
+
+def formatear_datos_completos_360(fila, totales):
+    """
+    Estructura de get_datos_completos_cliente a partir de una fila de consulta_360
+    totales: get_totales_mercado() para el market share
+    """
+    perfil = fila if fila.tiene_perfil else None
+    
+    return {
+        'identificacion': {
+            'anunciante_id': fila.anunciante_id,
+            'nombre': perfil.nombre_anunciante if perfil else None,
+            'rubro': perfil.rubro_principal if perfil else None,
+            'tamaño_empresa': perfil.tamano_de_la_empresa_cantidad_de_empleados if perfil else None
+        },
+        'perfil_estrategico': {
+            'cluster': perfil.cluster,
+            'tipo_cluster': perfil.tipo_de_cluster,
+            'cultura': perfil.cultura,
+            'ejecucion': perfil.ejecucion,
+            'estructura': perfil.estructura,
+            'competitividad': perfil.competitividad,
+            'puntaje_total': perfil.puntaje_total
+        } if perfil else {},
+        'facturacion_erp': {
+            'facturacion_total': float(fila.facturacion_total or 0),
+            'revenue_total': float(fila.revenue_total or 0),
+            'costo_total': float(fila.costo_total or 0),
+            'market_share': calcular_market_share(fila.facturacion_total, totales),
+            'registros': fila.registros,
+            'promedio_mensual': float(fila.promedio_mensual or 0),
+            'primera_fecha': str(fila.primera_fecha) if fila.primera_fecha else None,
+            'ultima_fecha': str(fila.ultima_fecha) if fila.ultima_fecha else None,
+            'divisiones': fila.divisiones,
+            'arenas': fila.arenas
+        },
+        'inversiones_medios': {
+            'tv_abierta_usd': float(perfil.inv_tv or 0),
+            'radio_usd': float(perfil.inv_radio or 0),
+            'cable_usd': float(perfil.inv_cable or 0),
+            'revistas_usd': float(perfil.inv_revistas or 0),
+            'diarios_usd': float(perfil.inv_diarios or 0),
+            'pdv_usd': float(perfil.inv_pdv or 0),
+            'total_usd': float((perfil.inv_tv or 0) + (perfil.inv_radio or 0) + (perfil.inv_cable or 0) + 
+                             (perfil.inv_revistas or 0) + (perfil.inv_diarios or 0) + (perfil.inv_pdv or 0))
+        } if perfil else {},
+        'datos_organizacionales': {
+            'central_medios': perfil.central_de_medios,
+            'depto_marketing': perfil.tiene_la_empresa_departamento_de_marketing,
+            'medios_principales': perfil.en_que_medios_invierte_la_empresa_principalmente,
+            'invierte_digital': perfil.la_empresa_invierte_en_digital
+        } if perfil else {},
+        'ranking_dnit': {
+            'ranking': fila.ranking,
+            'aporte_gs': float(fila.aporte_gs or 0),
+            'ingreso_estimado_gs': float(fila.ingreso_estimado_gs or 0),
+            'razon_social': fila.razon_social
+        } if fila.tiene_dnit else {}
+    }
+
+def get_top_clientes_para_comparacion(db_engine, limit=5):
+    """
+    Obtener top clientes por facturación (con perfil AdLens) para comparación
+    """
+    try:
+        return [
+            {
+                'anunciante_id': cliente['anunciante_id'],
+                'nombre': cliente['cliente']
+            }
+            for cliente in get_ranking(db_engine, limite=limit, solo_con_perfil=True)
+        ]
     
     except Exception as e:
         logger.error(f"❌ Error top clientes: {e}")
         return []
 
 # FUNCIÓN PRINCIPAL PARA AGREGAR A APP.PY
-def query_compleja_sin_claude_handler(user_query, engine):
+def query_compleja_sin_claude_handler(user_query, engine, despues_de=None):
     """
     Handler principal para consultas complejas sin Claude
     Retorna datos puros en JSON para análisis
@@ -1224,7 +1157,7 @@ def query_compleja_sin_claude_handler(user_query, engine):
     
     logger.info(f"🔍 Consulta compleja sin Claude: {user_query}")
     
-    resultado = get_consulta_compleja_sin_claude(user_query, engine)
+    resultado = get_consulta_compleja_sin_claude(user_query, engine, despues_de=despues_de)
     
     return {
         "success": True,
@@ -1306,48 +1239,41 @@ def get_analisis_estrategico_cliente(cliente_info, user_query, db_engine):
     logger.info(f"🧠 Generando análisis estratégico para: {nombre_cliente}")
     
     try:
-        with db_engine.connect() as conn:
-            # Query completa para análisis estratégico
+        with conexion(db_engine) as conn:
+            # Fila precalculada del anunciante (mv_anunciante_360)
             stmt = text("""
                 SELECT 
                     -- Identificación
-                    p.nombre_anunciante,
-                    p.rubro_principal,
-                    p.tamano_de_la_empresa_cantidad_de_empleados,
+                    nombre_anunciante,
+                    rubro_principal,
+                    tamano_de_la_empresa_cantidad_de_empleados,
                     
                     -- Perfil estratégico
-                    p.cluster,
-                    CAST(p.cultura AS FLOAT) as cultura,
-                    CAST(p.competitividad AS FLOAT) as competitividad,
-                    CAST(p.puntaje_total AS FLOAT) as puntaje_total,
-                    CAST(p.la_empresa_invierte_en_digital AS FLOAT) as digital_score,
+                    cluster,
+                    cultura_num as cultura,
+                    competitividad_num as competitividad,
+                    puntaje_total_num as puntaje_total,
+                    digital_num as digital_score,
                     
                     -- Inversiones publicitarias
-                    CAST(p.inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT) as inversion_tv,
-                    CAST(p.inversion_en_radio_2024_en_miles_usd AS FLOAT) as inversion_radio,
-                    CAST(p.inversion_en_cable_2024_en_miles_usd AS FLOAT) as inversion_cable,
+                    inv_tv as inversion_tv,
+                    inv_radio as inversion_radio,
+                    inv_cable as inversion_cable,
                     
                     -- Datos organizacionales
-                    p.central_de_medios,
-                    p.tiene_la_empresa_departamento_de_marketing,
-                    p.en_que_medios_invierte_la_empresa_principalmente,
+                    central_de_medios,
+                    tiene_la_empresa_departamento_de_marketing,
+                    en_que_medios_invierte_la_empresa_principalmente,
                     
                     -- Facturación nuestra
-                    COALESCE(SUM(f.facturacion), 0) as facturacion_total,
-                    COALESCE(SUM(f.revenue), 0) as revenue_total,
-                    COUNT(f.*) as registros,
-                    STRING_AGG(DISTINCT f.division, ', ') as divisiones,
-                    STRING_AGG(DISTINCT f.arena, ', ') as arenas
+                    COALESCE(facturacion_total, 0) as facturacion_total,
+                    COALESCE(revenue_total, 0) as revenue_total,
+                    registros,
+                    divisiones,
+                    arenas
                     
-                FROM dim_anunciante_perfil p
-                LEFT JOIN fact_facturacion f ON p.anunciante_id = f.anunciante_id
-                WHERE p.anunciante_id = :anunciante_id
-                GROUP BY p.anunciante_id, p.nombre_anunciante, p.rubro_principal, 
-                         p.tamano_de_la_empresa_cantidad_de_empleados, p.cluster,
-                         p.cultura, p.competitividad, p.puntaje_total, p.la_empresa_invierte_en_digital,
-                         p.inversion_en_tv_abierta_2024_en_miles_usd, p.inversion_en_radio_2024_en_miles_usd,
-                         p.inversion_en_cable_2024_en_miles_usd, p.central_de_medios,
-                         p.tiene_la_empresa_departamento_de_marketing, p.en_que_medios_invierte_la_empresa_principalmente
+                FROM mv_anunciante_360
+                WHERE anunciante_id = :anunciante_id AND tiene_perfil
             """)
             
             result = conn.execute(stmt, {"anunciante_id": anunciante_id}).fetchone()
@@ -1467,40 +1393,6 @@ def generar_insights_especificos(analisis, user_query):
     
     return insights
 
-# FUNCIÓN PRINCIPAL PARA INTEGRAR EN GET_CLIENTE_360
-def get_cliente_360_strategic(user_query, db_engine):
-    """
-    Versión mejorada de get_cliente_360 con análisis estratégico
-    """
-    
-    logger.info(f"🎯 Iniciando análisis estratégico 360° para: {user_query}")
-    
-    # 1. Identificación mejorada
-    cliente_info = identify_cliente_strategic_enhanced(user_query, db_engine)
-    
-    if not cliente_info:
-        logger.warning(f"❌ Cliente no encontrado: {user_query}")
-        return []
-    
-    # 2. Análisis estratégico completo
-    analisis_estrategico = get_analisis_estrategico_cliente(cliente_info, user_query, db_engine)
-    
-    if 'error' in analisis_estrategico:
-        logger.error(f"❌ Error en análisis: {analisis_estrategico['error']}")
-        return []
-    
-    # 3. Formatear para Claude
-    resultado = {
-        'tipo_analisis': 'estrategico',
-        'cliente': analisis_estrategico['cliente'],
-        'consulta_original': user_query,
-        'analisis_completo': analisis_estrategico
-    }
-    
-    logger.info(f"✅ Análisis estratégico completado para {cliente_info['nombre']}")
-    
-    return [resultado]
-
 def extract_client_from_strategic_query(user_query):
     """
     Extraer nombres de clientes de preguntas estratégicas complejas
@@ -1538,68 +1430,45 @@ def extract_client_from_strategic_query(user_query):
     
     return None
 
-def get_cliente_360_strategic(user_query, db_engine):
+def get_cliente_360_strategic(user_query, db_engine, cliente_info=None):
     """
     Análisis estratégico 360° para consultas complejas
     Esta es la función que falta y está siendo llamada desde get_cliente_360()
+    cliente_info: identidad ya resuelta en el request; si falta se identifica aquí
     """
     
     logger.info(f"🎯 Iniciando análisis estratégico 360° para: {user_query}")
     
-    # 1. Intentar extracción específica de nombre
-    nombre_candidato = extract_client_from_strategic_query(user_query)
+    # 1. Identificación (nombre extraído de la pregunta, con fallback a la query completa)
+    if cliente_info is None:
+        cliente_info = identify_cliente_strategic_enhanced(user_query, db_engine)
     
-    if nombre_candidato:
-        logger.info(f"✅ Usando nombre extraído: '{nombre_candidato}'")
-        
-        # 2. Usar sistema robusto SOLO con el nombre limpio
-        cliente_info = identify_cliente_automatico_robusto(nombre_candidato, db_engine)
-        
-        if cliente_info:
-            logger.info(f"✅ Cliente estratégico identificado: {cliente_info['nombre']}")
-            
-            # 3. Usar la misma lógica que el análisis normal
-            datos_erp = get_facturacion_erp_completa(db_engine.connect(), cliente_info['anunciante_id'])
-            
-            if not datos_erp:
-                logger.warning(f"❌ No hay datos para cliente: {cliente_info['nombre']}")
-                return []
-            
-            # 4. Enriquecer con datos AdLens y DNIT
-            datos_enriquecidos = enrich_with_adlens_and_dnit(datos_erp, cliente_info['anunciante_id'], db_engine)
-            
-            # 5. Formatear para Claude con contexto estratégico
-            resultado = {
-                'tipo_analisis': 'estrategico',
-                'cliente': cliente_info['nombre'],
-                'anunciante_id': cliente_info['anunciante_id'],
-                'consulta_original': user_query,
-                'metodo_identificacion': cliente_info.get('method', 'strategic'),
-                'datos_completos': datos_enriquecidos
-            }
-            
-            logger.info(f"✅ Análisis estratégico completado para {cliente_info['nombre']}")
-            return [resultado]
-        
-        else:
-            logger.warning(f"❌ Nombre extraído '{nombre_candidato}' no encontrado en BD")
+    if not cliente_info:
+        logger.warning(f"❌ Cliente no encontrado: {user_query}")
+        return []
     
-    # 3. Fallback: usar identificación normal
-    logger.info("🔄 Fallback: usando identificación normal")
-    cliente_info = identify_cliente_automatico_robusto(user_query, db_engine)
+    # 2-3. Misma consulta 360° que el análisis normal (ERP + AdLens + DNIT en un roundtrip)
+    try:
+        fila = get_fila_360(db_engine, cliente_info['anunciante_id'])
+    except Exception as e:
+        logger.error(f"❌ Error en consulta 360° de {cliente_info['nombre']}: {e}")
+        return []
     
-    if cliente_info:
-        logger.info(f"✅ Cliente fallback identificado: {cliente_info['nombre']}")
-        
-        # Usar análisis normal
-        datos_erp = get_facturacion_erp_completa(db_engine.connect(), cliente_info['anunciante_id'])
-        
-        if datos_erp:
-            datos_enriquecidos = enrich_with_adlens_and_dnit(datos_erp, cliente_info['anunciante_id'], db_engine)
-            return [datos_enriquecidos]
+    datos_enriquecidos = formatear_enriquecido_360(formatear_erp_360(fila), fila)
+    datos_enriquecidos['market_share'] = calcular_market_share(datos_enriquecidos['facturacion_total'], get_totales_mercado(db_engine))
     
-    logger.warning(f"❌ Cliente no encontrado: {user_query}")
-    return []
+    # 4. Formatear para Claude con contexto estratégico
+    resultado = {
+        'tipo_analisis': 'estrategico',
+        'cliente': cliente_info['nombre'],
+        'anunciante_id': cliente_info['anunciante_id'],
+        'consulta_original': user_query,
+        'metodo_identificacion': cliente_info.get('method', 'strategic'),
+        'datos_completos': datos_enriquecidos
+    }
+    
+    logger.info(f"✅ Análisis estratégico completado para {cliente_info['nombre']}")
+    return [resultado]
 
 
 
@@ -1610,102 +1479,76 @@ def enrich_with_adlens_and_dnit(datos_erp, anunciante_id, db_engine):
     """
     
     try:
-        with db_engine.connect() as conn:
-            # Obtener datos AdLens
-            stmt_adlens = text("""
-                SELECT 
-                    nombre_anunciante,
-                    rubro_principal,
-                    tamano_de_la_empresa_cantidad_de_empleados,
-                    cluster,
-                    tipo_de_cluster,
-                    cultura,
-                    ejecucion,
-                    estructura,
-                    competitividad,
-                    puntaje_total,
-                    CAST(inversion_en_tv_abierta_2024_en_miles_usd AS FLOAT) as inv_tv_usd,
-                    CAST(inversion_en_radio_2024_en_miles_usd AS FLOAT) as inv_radio_usd,
-                    CAST(inversion_en_cable_2024_en_miles_usd AS FLOAT) as inv_cable_usd,
-                    central_de_medios,
-                    tiene_la_empresa_departamento_de_marketing,
-                    en_que_medios_invierte_la_empresa_principalmente,
-                    la_empresa_invierte_en_digital
-                FROM dim_anunciante_perfil
-                WHERE anunciante_id = :anunciante_id
-            """)
-            
-            adlens_data = conn.execute(stmt_adlens, {"anunciante_id": anunciante_id}).fetchone()
-            
-            # Obtener datos DNIT
-            stmt_dnit = text("""
-                SELECT 
-                    ranking,
-                    aporte_gs,
-                    ingreso_estimado_gs,
-                    razon_social
-                FROM dim_posicionamiento_dnit
-                WHERE anunciante_id = :anunciante_id
-            """)
-            
-            dnit_data = conn.execute(stmt_dnit, {"anunciante_id": anunciante_id}).fetchone()
-            
-            # Combinar todos los datos
-            datos_enriquecidos = datos_erp.copy()
-            
-            # Agregar datos AdLens
-            if adlens_data:
-                datos_enriquecidos.update({
-                    'perfil_adlens': {
-                        'nombre': adlens_data.nombre_anunciante,
-                        'rubro': adlens_data.rubro_principal,
-                        'tamaño_empresa': adlens_data.tamano_de_la_empresa_cantidad_de_empleados,
-                        'cluster': adlens_data.cluster,
-                        'tipo_cluster': adlens_data.tipo_de_cluster,
-                        'cultura': adlens_data.cultura,
-                        'ejecucion': adlens_data.ejecucion,
-                        'estructura': adlens_data.estructura,
-                        'competitividad': adlens_data.competitividad,
-                        'puntaje_total': adlens_data.puntaje_total,
-                        'inversiones_usd': {
-                            'tv_abierta': adlens_data.inv_tv_usd or 0,
-                            'radio': adlens_data.inv_radio_usd or 0,
-                            'cable': adlens_data.inv_cable_usd or 0,
-                            'total': (adlens_data.inv_tv_usd or 0) + (adlens_data.inv_radio_usd or 0) + (adlens_data.inv_cable_usd or 0)
-                        },
-                        'organizacion': {
-                            'central_medios': adlens_data.central_de_medios,
-                            'depto_marketing': adlens_data.tiene_la_empresa_departamento_de_marketing,
-                            'medios_principales': adlens_data.en_que_medios_invierte_la_empresa_principalmente,
-                            'invierte_digital': adlens_data.la_empresa_invierte_en_digital
-                        }
-                    }
-                })
-            
-            # Agregar datos DNIT
-            if dnit_data:
-                datos_enriquecidos.update({
-                    'ranking_dnit': {
-                        'ranking': dnit_data.ranking,
-                        'aporte_gs': dnit_data.aporte_gs,
-                        'ingreso_estimado_gs': dnit_data.ingreso_estimado_gs,
-                        'razon_social': dnit_data.razon_social
-                    }
-                })
-            
-            if 'facturacion_total' in datos_enriquecidos:
-                datos_enriquecidos['facturacion_total'] = float(datos_enriquecidos['facturacion_total'])
-            if 'revenue_total' in datos_enriquecidos:
-                datos_enriquecidos['revenue_total'] = float(datos_enriquecidos['revenue_total'])
-            if 'costo_total' in datos_enriquecidos:
-                datos_enriquecidos['costo_total'] = float(datos_enriquecidos['costo_total'])
-
-            logger.info(f"✅ Datos enriquecidos para anunciante {anunciante_id}")
-            logger.info(f"🔍 DEBUG - Facturación en datos enriquecidos: {datos_enriquecidos.get('facturacion_total', 'NO ENCONTRADA')}")
-
-            return datos_enriquecidos
+        return formatear_enriquecido_360(datos_erp, get_fila_360(db_engine, anunciante_id))
             
     except Exception as e:
         logger.error(f"❌ Error enriqueciendo datos: {e}")
         # Si hay error, retornar datos ERP originales
-        return datos_erp
\ No newline at end of file
+        return datos_erp
+
+def formatear_erp_360(fila):
+    """Agregados ERP de una fila de consulta_360 (mismo formato que get_facturacion_erp_completa)"""
+    return {
+        'facturacion_total': float(fila.facturacion_total or 0),
+        'revenue_total': float(fila.revenue_total or 0),
+        'costo_total': float(fila.costo_total or 0),
+        'promedio_mensual': float(fila.promedio_mensual or 0),
+        'registros': fila.registros or 0,
+        'divisiones': fila.divisiones or '',
+        'arenas': fila.arenas or '',
+        'evolucion_mensual': [
+            {
+                'anio': mes['anio'],
+                'mes': mes['mes'],
+                'facturacion': float(mes['facturacion']),
+                'revenue': float(mes['revenue']),
+                'costo': float(mes['costo']),
+                'facturas': int(mes['facturas'])
+            }
+            for mes in fila.evolucion_mensual or []
+        ]
+    }
+
+def formatear_enriquecido_360(datos_erp, fila):
+    """Datos ERP + perfil AdLens + ranking DNIT de una fila de consulta_360"""
+    datos_enriquecidos = datos_erp.copy()
+    
+    if fila.tiene_perfil:
+        datos_enriquecidos['perfil_adlens'] = {
+            'nombre': fila.nombre_anunciante,
+            'rubro': fila.rubro_principal,
+            'tamaño_empresa': fila.tamano_de_la_empresa_cantidad_de_empleados,
+            'cluster': fila.cluster,
+            'tipo_cluster': fila.tipo_de_cluster,
+            'cultura': fila.cultura,
+            'ejecucion': fila.ejecucion,
+            'estructura': fila.estructura,
+            'competitividad': fila.competitividad,
+            'puntaje_total': fila.puntaje_total,
+            'inversiones_usd': {
+                'tv_abierta': fila.inv_tv or 0,
+                'radio': fila.inv_radio or 0,
+                'cable': fila.inv_cable or 0,
+                'total': (fila.inv_tv or 0) + (fila.inv_radio or 0) + (fila.inv_cable or 0)
+            },
+            'organizacion': {
+                'central_medios': fila.central_de_medios,
+                'depto_marketing': fila.tiene_la_empresa_departamento_de_marketing,
+                'medios_principales': fila.en_que_medios_invierte_la_empresa_principalmente,
+                'invierte_digital': fila.la_empresa_invierte_en_digital
+            }
+        }
+    
+    if fila.tiene_dnit:
+        datos_enriquecidos['ranking_dnit'] = {
+            'ranking': fila.ranking,
+            'aporte_gs': fila.aporte_gs,
+            'ingreso_estimado_gs': fila.ingreso_estimado_gs,
+            'razon_social': fila.razon_social
+        }
+    
+    if fila.inversion_medios:
+        datos_enriquecidos['inversion_granular'] = formatear_inversion_granular(fila.inversion_medios)
+    
+    logger.info(f"✅ Datos enriquecidos para anunciante {fila.anunciante_id}")
+    return datos_enriquecidos
@@ -0,0 +1,71 @@
+"""
+JARVIS - Lector del snapshot Parquet
+Lectura columnar y memory-mapped del snapshot que escribe snapshot_parquet.py, para que los scripts de
+análisis y diagnóstico corran offline sin importar app ni conectarse a la base de producción.
+Solo se leen las columnas pedidas y, en los hechos, los años pedidos (partition pruning).
+
+    from lector_snapshot import leer_tabla
+    facturas = leer_tabla('fact_facturacion', columnas=['anunciante_id', 'facturacion'], anios=[2024, 2025])
+"""
+
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from snapshot_parquet import DIMENSIONES, DIRECTORIO_SNAPSHOT, HECHOS, MANIFIESTO
+
+# anio=2024/ -> columna anio INTEGER (no diccionario)
+_PARTICION_ANIO = ds.partitioning(pa.schema([('anio', pa.int32())]), flavor='hive')
+
+
+def info_snapshot(directorio=DIRECTORIO_SNAPSHOT):
+    """Manifiesto del snapshot {'data_version', 'creado_en', 'tablas'} (FileNotFoundError si no existe)"""
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"Sin snapshot en {directorio} (correr python snapshot_parquet.py)")
+
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def leer_arrow(tabla, columnas=None, anios=None, filtros=None, directorio=DIRECTORIO_SNAPSHOT):
+    """
+    Tabla Arrow del snapshot
+    columnas: lista de columnas (None = todas); en los hechos 'anio' viene de la partición
+    anios: solo esos años (solo hechos)
+    filtros: filtros de pyarrow, p. ej. [('anunciante_id', '=', 42)]
+    """
+    if tabla in HECHOS:
+        ruta = os.path.join(directorio, tabla)
+        partitioning = _PARTICION_ANIO
+    elif tabla in DIMENSIONES:
+        if anios is not None:
+            raise ValueError(f"{tabla} no está particionada por año")
+        ruta = os.path.join(directorio, f"{tabla}.parquet")
+        partitioning = None
+    else:
+        raise ValueError(f"Tabla '{tabla}' no incluida en el snapshot")
+
+    if not os.path.exists(ruta):
+        info_snapshot(directorio)
+        raise FileNotFoundError(f"Falta {ruta} en el snapshot")
+
+    filtros = list(filtros or [])
+    if anios is not None:
+        filtros.append(('anio', 'in', [int(anio) for anio in anios]))
+
+    return pq.read_table(
+        ruta,
+        columns=columnas,
+        filters=filtros or None,
+        partitioning=partitioning,
+        memory_map=True,
+    )
+
+
+def leer_tabla(tabla, columnas=None, anios=None, filtros=None, directorio=DIRECTORIO_SNAPSHOT):
+    """Igual que leer_arrow pero como DataFrame de pandas"""
+    return leer_arrow(tabla, columnas=columnas, anios=anios, filtros=filtros, directorio=directorio).to_pandas()
@@ -7,6 +7,9 @@ import psycopg2
 from sqlalchemy import create_engine, text
 import logging
 
+from normalizacion import normalizar_nombre
+from post_carga import refrescar_resumenes
+
 # Configuración logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -74,12 +77,14 @@ def crear_todos_anunciantes_faltantes(engine):
                 cliente_nombre = row.cliente_original
                 
                 try:
-                    # Verificar si ya existe
+                    # Verificar si ya existe (por nombre normalizado: "X S.A." = "X SA", no duplica)
                     check_query = text("""
                         SELECT anunciante_id FROM dim_anunciante 
-                        WHERE nombre_canonico = :nombre
+                        WHERE nombre_normalizado = :nombre_normalizado
+                        ORDER BY anunciante_id
+                        LIMIT 1
                     """)
-                    existing = conn.execute(check_query, {"nombre": cliente_nombre}).fetchone()
+                    existing = conn.execute(check_query, {"nombre_normalizado": normalizar_nombre(cliente_nombre)}).fetchone()
                     
                     if existing:
                         # Ya existe, solo mapear
@@ -206,6 +211,9 @@ def main():
         # Verificar mapeo completo
         verificar_mapeo_completo(engine)
         
+        # Resúmenes 360° (mv_anunciante_360) con los anunciante_id recién asignados
+        refrescar_resumenes(engine)
+        
         logger.info("")
         logger.info("🎯 ¡JARVIS AHORA TIENE MAPEO 100% PERFECTO!")
         logger.info("🎉 Excel = Base de Datos = Análisis completos")
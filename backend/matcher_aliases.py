@@ -0,0 +1,187 @@
+"""
+JARVIS - Matcher de aliases desde la base de datos
+Compila dim_anunciante_aliases (aliases) y dim_anunciante_alias_negativo (reglas "no matchear")
+en estructuras en memoria; se recarga solo cuando cambian las tablas (ver 05_matcher_aliases.sql)
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import text
+
+from escucha_cache import escucha_activa
+from extractor_menciones import ExtractorMenciones
+from normalizacion import normalizar_nombre, normalizar_texto
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+# Aliases con menor confianza requieren validación manual (ver v_aliases_pendientes)
+CONFIANZA_MINIMA = 80
+
+# Score de un alias contenido dentro de un query más largo
+SCORE_MENCION_ALIAS = 0.85
+
+# Cada cuánto se consulta la firma de las tablas para detectar cambios
+# (solo sin escucha de NOTIFY: con escucha_cache activa el matcher se invalida al cambiar las tablas)
+# La firma lee las dos tablas completas, una vez por intervalo en cada worker que perdió la escucha
+INTERVALO_VERIFICACION_SEG = 30
+
+_matcher = None
+_ultima_verificacion = 0.0
+_matcher_lock = threading.Lock()
+
+
+class MatcherAliases:
+    """
+    - mapa alias normalizado → anunciante (hit exacto O(1))
+    - autómata de menciones para aliases contenidos en un query más largo
+    - reglas negativas agrupadas por patrón de query, en el formato (patrones_query, patrones_nombre)
+    """
+
+    def __init__(self, aliases, negativos, firma=None):
+        self.firma = firma
+        self.exactos = {}
+        self.anunciantes = {}
+
+        # aliases vienen ordenados por confianza desc: gana la primera aparición de cada alias
+        for row in aliases:
+            clave = normalizar_nombre(row.nombre_alias)
+            if clave and clave not in self.exactos:
+                self.exactos[clave] = (row.anunciante_id, row.confianza)
+            self.anunciantes.setdefault(row.anunciante_id, row)
+
+        self.menciones = ExtractorMenciones(
+            (alias, anunciante_id, self.anunciantes[anunciante_id].nombre)
+            for alias, (anunciante_id, _) in self.exactos.items()
+        )
+
+        por_query = defaultdict(list)
+        for row in negativos:
+            por_query[normalizar_texto(row.patron_query)].append(normalizar_texto(row.patron_nombre))
+        self.reglas_negativas = [([patron], nombres) for patron, nombres in por_query.items()]
+
+        logger.info(f"🏷️ Matcher de aliases cargado: {len(self.exactos)} aliases, "
+                    f"{len(negativos)} reglas negativas")
+
+    def es_negativo(self, query, nombre):
+        """True si una regla negativa impide que el query identifique este nombre"""
+        query_lower = normalizar_texto(query)
+        nombre_lower = normalizar_nombre(nombre)
+
+        for query_patterns, nombre_patterns in self.reglas_negativas:
+            if any(pattern in query_lower for pattern in query_patterns):
+                if any(pattern in nombre_lower for pattern in nombre_patterns):
+                    return True
+
+        return False
+
+    def _resultado(self, anunciante_id, score, method):
+        row = self.anunciantes[anunciante_id]
+        return {
+            'anunciante_id': anunciante_id,
+            'nombre': row.nombre,
+            'cluster': row.cluster,
+            'rubro': row.rubro_principal,
+            'score': score,
+            'method': method
+        }
+
+    def buscar(self, query_clean):
+        """
+        1. Alias idéntico al query (score = confianza del alias)
+        2. Alias más largo mencionado dentro del query
+        """
+        exacto = self.exactos.get(normalizar_nombre(query_clean))
+        if exacto:
+            anunciante_id, confianza = exacto
+            if not self.es_negativo(query_clean, self.anunciantes[anunciante_id].nombre):
+                return self._resultado(anunciante_id, confianza / 100, "alias_exacto")
+
+        menciones = [
+            m for m in self.menciones.extraer(query_clean)
+            if not self.es_negativo(query_clean, m['nombre'])
+        ]
+        if menciones:
+            mencion = max(menciones, key=lambda m: m['fin'] - m['inicio'])
+            return self._resultado(mencion['anunciante_id'], SCORE_MENCION_ALIAS, f"alias_{mencion['mencion']}")
+
+        return None
+
+
+def _firma_tablas(conn):
+    """
+    Hash del contenido de ambas tablas: cambia con cualquier INSERT, UPDATE o DELETE
+    (un UPDATE de confianza no cambia la cantidad de filas ni created_at)
+    """
+    return tuple(conn.execute(text("""
+        SELECT
+            (SELECT md5(COALESCE(string_agg(a::TEXT, '|' ORDER BY alias_id), ''))
+             FROM dim_anunciante_aliases a),
+            (SELECT md5(COALESCE(string_agg(n::TEXT, '|' ORDER BY negativo_id), ''))
+             FROM dim_anunciante_alias_negativo n)
+    """)).fetchone())
+
+
+def _cargar_matcher(conn, firma):
+    aliases = conn.execute(text("""
+        SELECT
+            a.nombre_alias,
+            a.anunciante_id,
+            a.confianza,
+            COALESCE(p.nombre_anunciante, d.nombre_canonico) as nombre,
+            p.cluster,
+            p.rubro_principal
+        FROM dim_anunciante_aliases a
+        JOIN dim_anunciante d ON a.anunciante_id = d.anunciante_id
+        LEFT JOIN dim_anunciante_perfil p ON a.anunciante_id = p.anunciante_id
+        WHERE a.confianza >= :confianza_minima
+        ORDER BY a.confianza DESC, a.created_at DESC
+    """), {'confianza_minima': CONFIANZA_MINIMA}).fetchall()
+
+    negativos = conn.execute(text("""
+        SELECT patron_query, patron_nombre
+        FROM dim_anunciante_alias_negativo
+        ORDER BY negativo_id
+    """)).fetchall()
+
+    return MatcherAliases(aliases, negativos, firma)
+
+
+def get_matcher_aliases(db_engine):
+    """
+    Obtener el matcher del proceso
+    Sin escucha de NOTIFY, como máximo cada INTERVALO_VERIFICACION_SEG compara la firma
+    de las tablas y recarga si cambiaron
+    """
+    global _matcher, _ultima_verificacion
+
+    if _matcher is not None and (
+        escucha_activa() or time.monotonic() - _ultima_verificacion < INTERVALO_VERIFICACION_SEG
+    ):
+        return _matcher
+
+    with _matcher_lock:
+        if _matcher is None or time.monotonic() - _ultima_verificacion >= INTERVALO_VERIFICACION_SEG:
+            with conexion(db_engine) as conn:
+                firma = _firma_tablas(conn)
+                if _matcher is None or firma != _matcher.firma:
+                    if _matcher is not None:
+                        logger.info("🔄 Cambios en aliases detectados, recargando matcher")
+                    _matcher = _cargar_matcher(conn, firma)
+
+            _ultima_verificacion = time.monotonic()
+
+    return _matcher
+
+
+def invalidar_matcher_aliases():
+    """Descartar el matcher para que se recargue en la próxima consulta"""
+    global _matcher
+
+    with _matcher_lock:
+        _matcher = None
+
+    logger.info("🔄 Matcher de aliases invalidado")
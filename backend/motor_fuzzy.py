@@ -0,0 +1,123 @@
+"""
+JARVIS - Motor de scoring fuzzy por lotes
+Puntúa un query contra todo un arreglo de candidatos en una sola llamada (rapidfuzz + numpy)
+y aplica las reglas anti-falsos positivos como filtros vectorizados
+"""
+
+import logging
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+logger = logging.getLogger(__name__)
+
+# Scorers disponibles (escala 0-100)
+# - ratio: equivalente por lotes de difflib.SequenceMatcher.ratio() (similitud Indel)
+# - token_set_ratio: equivalente de fuzzywuzzy.fuzz.token_set_ratio (con su preprocesado)
+SCORERS = {
+    'ratio': (fuzz.ratio, None),
+    'token_set_ratio': (fuzz.token_set_ratio, utils.default_process),
+}
+
+
+def puntuar_lote(query, candidatos, scorer='ratio', score_cutoff=None, workers=1):
+    """
+    Puntuar query contra todos los candidatos en una sola llamada
+    Retorna np.ndarray float64 con scores 0-1 (0 para los que no superan score_cutoff)
+    """
+    if len(candidatos) == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    funcion, procesador = SCORERS[scorer]
+    cutoff = score_cutoff * 100 if score_cutoff is not None else None
+
+    scores = process.cdist(
+        [query], candidatos,
+        scorer=funcion,
+        processor=procesador,
+        score_cutoff=cutoff,
+        dtype=np.float64,
+        workers=workers
+    )[0]
+
+    return scores / 100
+
+
+def top_k(scores, k=1, score_cutoff=0.0, mascara=None):
+    """
+    Mejores k posiciones (score desc; en empate gana la posición menor, igual que los loops originales)
+    Retorna lista de (posicion, score)
+    """
+    validos = scores >= score_cutoff
+    if mascara is not None:
+        validos &= mascara
+
+    posiciones = np.flatnonzero(validos)
+    if len(posiciones) == 0:
+        return []
+
+    # lexsort: última clave = primaria → score desc, luego posición asc
+    orden = np.lexsort((posiciones, -scores[posiciones]))[:k]
+    return [(int(posiciones[i]), float(scores[posiciones[i]])) for i in orden]
+
+
+class CorpusFuzzy:
+    """
+    Arreglo de nombres candidatos preparado para scoring por lotes
+    Precalcula longitudes y primeras palabras para las validaciones vectorizadas
+    """
+
+    def __init__(self, nombres):
+        self.nombres = [(n or "").lower() for n in nombres]
+        self._nombres_np = np.array(self.nombres, dtype=str)
+        self.longitudes = np.fromiter((len(n) for n in self.nombres), dtype=np.int32, count=len(self.nombres))
+
+        primeras = [n.split()[0] if n.split() else "" for n in self.nombres]
+        self._primera_larga = np.fromiter((len(p) >= 4 for p in primeras), dtype=bool, count=len(primeras))
+        self._prefijo_primera = np.array([p[:3] for p in primeras], dtype=str)
+
+        self._mascaras_patron = {}
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def puntuar(self, query, scorer='ratio', score_cutoff=None):
+        """Scores 0-1 del query contra todo el corpus"""
+        return puntuar_lote(query.lower(), self.nombres, scorer=scorer, score_cutoff=score_cutoff)
+
+    def contiene(self, patron):
+        """Máscara: nombres que contienen el patrón"""
+        return np.char.find(self._nombres_np, patron.lower()) >= 0
+
+    def _contiene_patron_regla(self, patron):
+        """Igual que contiene(), memoizado (los patrones de reglas son pocos y fijos)"""
+        if patron not in self._mascaras_patron:
+            self._mascaras_patron[patron] = self.contiene(patron)
+        return self._mascaras_patron[patron]
+
+    def mascara_longitud(self, query, factor=0.7):
+        """Longitud similar: |len(query) - len(nombre)| <= len(query) * factor"""
+        return np.abs(len(query) - self.longitudes) <= len(query) * factor
+
+    def mascara_primera_palabra(self, query):
+        """Primera palabra debe coincidir en sus 3 primeras letras (si ambas tienen >= 4)"""
+        query_first = query.split()[0].lower() if query.split() else ""
+        if len(query_first) < 4:
+            return np.ones(len(self.nombres), dtype=bool)
+
+        return ~self._primera_larga | (self._prefijo_primera == query_first[:3])
+
+    def mascara_falsos_positivos(self, query, reglas):
+        """
+        Máscara de falsos positivos: True donde el nombre está bloqueado para este query
+        reglas: lista de (patrones_query, patrones_nombre)
+        """
+        query_lower = query.lower()
+        bloqueados = np.zeros(len(self.nombres), dtype=bool)
+
+        for query_patterns, nombre_patterns in reglas:
+            if any(pattern in query_lower for pattern in query_patterns):
+                for pattern in nombre_patterns:
+                    bloqueados |= self._contiene_patron_regla(pattern)
+
+        return bloqueados
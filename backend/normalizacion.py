@@ -0,0 +1,129 @@
+"""
+JARVIS - Normalización de texto en español
+Pipeline único (patrones precompilados + memo LRU) para queries y nombres de anunciantes:
+minúsculas, plegado de acentos (Nestlé → nestle), sufijos societarios (S.A., S.A.E., SRL) y stopwords
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Palabras de consulta que no forman parte del nombre de un cliente
+STOPWORDS_CLIENTE = (
+    'cuanto', 'facturo', 'invirtio', 'invirti',
+    'datos', 'informacion', 'perfil', 'de', 'la', 'el', 'en', 'y',
+    'tv', 'television', 'facturacion', 'ranking', 'cluster', 'cultura'
+)
+
+# Variante reducida usada por el fuzzy 360° (conserva palabras como "datos" o "perfil")
+STOPWORDS_FUZZY = (
+    'cuanto', 'facturo', 'invirtio', 'invirti', 'de', 'la', 'el', 'en', 'y', 'tv', 'television'
+)
+
+# Palabras ignoradas al extraer el cliente en get_facturacion_enriched
+STOPWORDS_CONSULTA = (
+    'cuanto', 'facturo', 'facturacion',
+    'de', 'la', 'el', 'en', 'y', 'o', 'para', 'con', 'a', 'un', 'una',
+    'invirtio', 'invirti', 'invertir', 'inversion'
+)
+
+# Sufijos societarios como palabra completa (con o sin puntos)
+# Las regex de nombres usan clases ASCII explícitas para dar el mismo resultado que
+# normalizar_nombre() de la base en cualquier locale (ver 06_nombre_normalizado.sql)
+_SUFIJOS_LEGALES = re.compile(
+    r'(?<![a-z0-9_])(?:s\.? ?a\.? ?e\.? ?c\.? ?a|s\.? ?a\.? ?e|s\.? ?a|s\.? ?r\.? ?l|ltda|sociedad anonima)\.?(?![a-z0-9_])'
+)
+_DIACRITICOS = re.compile('[\u0300-\u036f]')
+_PUNTUACION = re.compile(r'[^a-z0-9_ ]')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def _patron_palabras(palabras):
+    """Una sola regex con todas las palabras como alternativas (palabra completa)"""
+    alternativas = sorted({plegar_acentos(p.lower()) for p in palabras}, key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(map(re.escape, alternativas)) + r')\b')
+
+
+def plegar_acentos(texto):
+    """Quitar tildes y diéresis (á → a, ü → u, ñ → n)"""
+    if texto.isascii():
+        return texto
+    return _DIACRITICOS.sub('', unicodedata.normalize('NFKD', texto))
+
+
+@lru_cache(maxsize=8192)
+def normalizar_texto(texto):
+    """Minúsculas, sin acentos y con espacios simples"""
+    # Plegar antes de bajar a minúsculas: NFKD puede generar mayúsculas (№ → No)
+    return ' '.join(plegar_acentos(texto or '').lower().split())
+
+
+def compilar_claves(palabras):
+    """
+    Patrón para detectar cualquiera de las palabras clave en un texto normalizado
+    Las palabras sin tildes se buscan como subcadena, igual que any(kw in texto for kw in palabras)
+    ('factur' sigue cubriendo 'facturo' y 'facturacion'); las que tenían tildes se buscan como
+    palabra completa, porque plegadas aparecen dentro de otras ('más' → 'mas' en 'mastercard')
+    (los espacios de borde se conservan: ' y ' no equivale a 'y')
+    """
+    claves = {}
+    for palabra in palabras:
+        minuscula = _ESPACIOS.sub(' ', palabra.lower())
+        plegada = plegar_acentos(minuscula)
+        # Si la misma clave aparece sin tilde, gana la búsqueda como subcadena
+        claves[plegada] = claves.get(plegada, True) and plegada != minuscula
+
+    alternativas = []
+    for clave in sorted(claves, key=len, reverse=True):
+        patron = re.escape(clave)
+        if claves[clave]:
+            patron = (r'\b' if clave[0].isalnum() else '') + patron + (r'\b' if clave[-1].isalnum() else '')
+        alternativas.append(patron)
+    return re.compile('|'.join(alternativas))
+
+
+_STOPWORDS_CLIENTE = _patron_palabras(STOPWORDS_CLIENTE)
+_STOPWORDS_FUZZY = _patron_palabras(STOPWORDS_FUZZY)
+_STOPWORDS_CONSULTA = frozenset(normalizar_texto(p) for p in STOPWORDS_CONSULTA)
+
+
+def _limpiar(texto):
+    """Puntuación a espacios y espacios simples"""
+    return ' '.join(_PUNTUACION.sub(' ', texto).split())
+
+
+def quitar_sufijos_legales(texto):
+    """Quitar S.A., S.A.E., S.A.E.C.A., SRL, LTDA (texto ya normalizado)"""
+    return _SUFIJOS_LEGALES.sub(' ', texto)
+
+
+@lru_cache(maxsize=16384)
+def normalizar_nombre(nombre):
+    """
+    Clave canónica de un nombre de anunciante
+    "Nestlé Paraguay S.A." → "nestle paraguay"
+    """
+    return _limpiar(quitar_sufijos_legales(normalizar_texto(nombre)))
+
+
+@lru_cache(maxsize=4096)
+def normalizar_nombre_cliente(query):
+    """Normalizar y limpiar nombre del cliente de una query (sin stopwords ni sufijos)"""
+    texto = _STOPWORDS_CLIENTE.sub('', normalizar_texto(query))
+    return _limpiar(quitar_sufijos_legales(texto))
+
+
+@lru_cache(maxsize=4096)
+def limpiar_query(query):
+    """Limpiar query para fuzzy matching (mismo formato que los nombres de normalizar_nombre)"""
+    texto = _STOPWORDS_FUZZY.sub(' ', normalizar_texto(query))
+    return _limpiar(quitar_sufijos_legales(texto))
+
+
+@lru_cache(maxsize=4096)
+def palabras_cliente(query):
+    """Palabras candidatas a nombre de cliente (sin stopwords de consulta ni palabras cortas)"""
+    return tuple(
+        p for p in _limpiar(normalizar_texto(query)).split()
+        if p not in _STOPWORDS_CONSULTA and len(p) > 2
+    )
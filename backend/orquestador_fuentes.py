@@ -0,0 +1,84 @@
+"""
+JARVIS - Orquestador de fuentes
+Ejecuta en paralelo las consultas independientes de un cliente (ERP, inversión en medios, DNIT...)
+en un pool de hilos acotado, cada una con su propio timeout: la latencia la marca la fuente más
+lenta y no la suma de todas. Una fuente que falla o no responde a tiempo queda en fuentes_faltantes
+y el resto del resultado se devuelve igual.
+
+Los hilos no comparten la conexión del request (unidad_trabajo.py): cada fuente toma la suya del pool,
+con statement_timeout igual a su timeout. Una fuente vencida no se cancela (un hilo no se puede
+interrumpir): se abandona, su resultado se descarta y la base corta su consulta a más tardar
+cuando la sentencia en curso llega al statement_timeout.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+from unidad_trabajo import limite_sentencias
+
+logger = logging.getLogger(__name__)
+
+# Hilos del proceso para consultas de fuentes (acotado por el tamaño del pool de conexiones)
+MAX_HILOS = 8
+
+# Timeout por defecto de una fuente
+TIMEOUT_FUENTE_SEG = 5.0
+
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+
+
+def _get_ejecutor():
+    """Pool de hilos compartido, creado en el primer uso"""
+    global _ejecutor
+
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix='jarvis-fuente')
+        return _ejecutor
+
+
+def _ejecutar_con_limite(funcion, segundos):
+    """Correr una fuente con sus sentencias cortadas al timeout de la fuente"""
+    with limite_sentencias(segundos):
+        return funcion()
+
+
+def ejecutar_fuentes(fuentes, timeouts=None):
+    """
+    Ejecutar fuentes = {nombre: función sin argumentos} en paralelo
+    timeouts = {nombre: segundos} (TIMEOUT_FUENTE_SEG para las que no estén)
+    Retorna (resultados, fuentes_faltantes): resultados = {nombre: valor} solo con las que respondieron
+    Una fuente vencida se abandona, no se cancela: sigue en su hilo hasta que termine o el
+    statement_timeout corte su consulta, y su resultado se descarta
+    """
+    timeouts = timeouts or {}
+    ejecutor = _get_ejecutor()
+    inicio = time.monotonic()
+
+    futuros = {
+        nombre: ejecutor.submit(_ejecutar_con_limite, funcion, timeouts.get(nombre, TIMEOUT_FUENTE_SEG))
+        for nombre, funcion in fuentes.items()
+    }
+
+    resultados = {}
+    fuentes_faltantes = []
+
+    for nombre, futuro in futuros.items():
+        # Cada timeout cuenta desde el inicio común, no desde que terminó la fuente anterior
+        restante = timeouts.get(nombre, TIMEOUT_FUENTE_SEG) - (time.monotonic() - inicio)
+        try:
+            resultados[nombre] = futuro.result(timeout=max(restante, 0))
+        except FuturesTimeoutError:
+            # Solo evita que empiece si seguía en cola; si ya corre, queda abandonada
+            futuro.cancel()
+            logger.warning(f"⏱️ Fuente '{nombre}' sin respuesta en {timeouts.get(nombre, TIMEOUT_FUENTE_SEG)}s")
+            fuentes_faltantes.append(nombre)
+        except Exception as e:
+            logger.error(f"❌ Fuente '{nombre}' falló: {e}")
+            fuentes_faltantes.append(nombre)
+
+    logger.info(f"📦 {len(resultados)}/{len(futuros)} fuentes en {time.monotonic() - inicio:.2f}s")
+    return resultados, fuentes_faltantes
@@ -0,0 +1,63 @@
+"""
+JARVIS - Post carga
+Al final de cada script ETL llama a refrescar_resumenes_jarvis(), que reconstruye las tablas
+derivadas (perfil AdLens tipado, rollup mensual, ranking de clientes y cubo de clusters:
+10, 12, 13 y 14_*.sql),
+refresca mv_anunciante_360 (08_resumen_anunciante_360.sql), incrementa data_version
+(09_data_version.sql, invalida los caches en todos los procesos) y guarda el snapshot del
+mercado de la carga (15_market_snapshot.sql).
+También se puede correr a mano después de una carga por SQL:
+
+    python post_carga.py
+"""
+
+import logging
+import os
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_SQL_REFRESCO = "SELECT refrescar_resumenes_jarvis()"
+
+
+def refrescar_resumenes(destino):
+    """
+    Refrescar los resúmenes después de una carga
+    destino: engine de SQLAlchemy o conexión psycopg2 (02_cargar_inversion_posicionamiento.py)
+    Un error no revierte la carga: los datos ya están confirmados y el refresco se puede repetir
+    Retorna la nueva data_version (None si falló)
+    """
+    inicio = time.perf_counter()
+    try:
+        if isinstance(destino, Engine):
+            with destino.begin() as conn:
+                version = conn.execute(text(_SQL_REFRESCO)).scalar()
+        else:
+            with destino.cursor() as cursor:
+                cursor.execute(_SQL_REFRESCO)
+                version = cursor.fetchone()[0]
+            destino.commit()
+    except Exception as e:
+        logger.error(f"❌ Error refrescando resúmenes (correr python post_carga.py): {e}")
+        if not isinstance(destino, Engine):
+            destino.rollback()
+        return None
+
+    logger.info(f"✅ Resúmenes refrescados en {time.perf_counter() - inicio:.1f}s (data_version {version})")
+    return version
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    DB_USER = os.getenv('PG_USER', 'postgres')
+    DB_PASS = os.getenv('PG_PASS', '12345')
+    DB_HOST = os.getenv('PG_HOST', 'localhost')
+    DB_PORT = os.getenv('PG_PORT', '5432')
+    DB_NAME = os.getenv('PG_DB', 'jarvis')
+
+    engine = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+    refrescar_resumenes(engine)
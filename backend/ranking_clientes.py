@@ -0,0 +1,320 @@
+"""
+JARVIS - Ranking de clientes
+Top N por facturación leído de ranking_clientes (13_ranking_clientes.sql): la tabla ya trae posición,
+market share y share acumulado por corte (total, año, división, arena, cluster y año × división /
+arena / cluster), así que un top N es una lectura de N filas por índice. Con el cache columnar
+activo (cache_columnar.py) el top N se calcula en memoria y admite cualquier combinación de filtros;
+sin cache, las combinaciones que no tienen corte precalculado (división × arena, año × división ×
+cluster...) se agregan en vivo sobre fact_facturacion con la misma numeración.
+Las páginas siguientes ("ver más") se piden después de (posición, cliente) de la última fila
+(keyset, 16_ranking_paginado.sql) y parsear_consulta_ranking extrae N y los filtros de la consulta
+"""
+
+import logging
+import re
+import threading
+
+from sqlalchemy import text
+
+from cache_360 import get_data_version
+from cache_columnar import get_hechos_columnares
+from normalizacion import normalizar_texto
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+# Tope de filas por página (el usuario puede pedir "top 500")
+MAX_LIMITE = 100
+
+# Cortes precalculados (dimensiones en el orden en que se nombra el corte)
+CORTES = {
+    (): 'total',
+    ('anio',): 'anio',
+    ('division',): 'division',
+    ('arena',): 'arena',
+    ('cluster',): 'cluster',
+    ('anio', 'division'): 'anio_division',
+    ('anio', 'arena'): 'anio_arena',
+    ('anio', 'cluster'): 'anio_cluster',
+}
+
+_SQL_RANKING = """
+    SELECT
+        r.posicion,
+        r.anunciante_id,
+        r.cliente,
+        r.facturacion,
+        r.revenue,
+        r.registros,
+        r.market_share,
+        r.share_acumulado
+    FROM ranking_clientes r
+    {join_perfil}
+    WHERE r.corte = :corte
+      AND COALESCE(r.anio, 0) = :anio
+      AND COALESCE(r.division, '') = :division
+      AND COALESCE(r.arena, '') = :arena
+      AND COALESCE(r.cluster, '') = :cluster
+      {keyset}
+    ORDER BY r.posicion, r.cliente
+    LIMIT :limite
+"""
+
+# Solo anunciantes con perfil AdLens (rankings que después se enriquecen con mv_anunciante_360)
+_JOIN_PERFIL = "JOIN mv_anunciante_360 m ON m.anunciante_id = r.anunciante_id AND m.tiene_perfil"
+
+# Página siguiente: filas después de la última (posición, cliente) de la anterior
+_KEYSET = "AND (r.posicion, r.cliente) > (:despues_posicion, :despues_cliente)"
+
+# Combinaciones sin corte precalculado: mismo cálculo que reconstruir_ranking_clientes() sobre las
+# filas filtradas (el market share incluye la facturación sin cliente identificado)
+_SQL_RANKING_EN_VIVO = """
+    WITH base AS (
+        SELECT
+            f.anunciante_id,
+            COALESCE(a.nombre_canonico, NULLIF(BTRIM(f.cliente_original), ''), 'ANUNCIANTE ' || f.anunciante_id) as cliente,
+            CASE
+                WHEN f.anunciante_id IS NOT NULL THEN 'a' || f.anunciante_id
+                ELSE 'c' || NULLIF(BTRIM(f.cliente_original), '')
+            END as clave,
+            COALESCE(f.anio, EXTRACT(YEAR FROM f.fecha_fact)::INTEGER) as anio,
+            NULLIF(f.division, '') as division,
+            NULLIF(f.arena, '') as arena,
+            t.cluster,
+            f.facturacion,
+            f.revenue
+        FROM fact_facturacion f
+        LEFT JOIN dim_anunciante a ON a.anunciante_id = f.anunciante_id
+        LEFT JOIN dim_anunciante_perfil_tipado t ON t.anunciante_id = f.anunciante_id
+    ),
+    agregado AS (
+        SELECT
+            clave,
+            MAX(anunciante_id) as anunciante_id,
+            MIN(cliente) as cliente,
+            COALESCE(SUM(facturacion), 0) as facturacion,
+            COALESCE(SUM(revenue), 0) as revenue,
+            COUNT(*) as registros,
+            SUM(COALESCE(SUM(facturacion), 0)) OVER () as total_corte
+        FROM base
+        WHERE {filtros}
+        GROUP BY clave
+    ),
+    rankeado AS (
+        SELECT
+            agregado.*,
+            DENSE_RANK() OVER w_corte as posicion,
+            SUM(facturacion) OVER (w_corte ROWS UNBOUNDED PRECEDING) as facturacion_acumulada
+        FROM agregado
+        WHERE clave IS NOT NULL
+        WINDOW w_corte AS (ORDER BY facturacion DESC, cliente)
+    )
+    SELECT
+        r.posicion,
+        r.anunciante_id,
+        r.cliente,
+        r.facturacion,
+        r.revenue,
+        r.registros,
+        r.facturacion * 100.0 / NULLIF(r.total_corte, 0) as market_share,
+        r.facturacion_acumulada * 100.0 / NULLIF(r.total_corte, 0) as share_acumulado
+    FROM rankeado r
+    {join_perfil}
+    WHERE TRUE
+      {keyset}
+    ORDER BY r.posicion, r.cliente
+    LIMIT :limite
+"""
+
+# Años y valores de división / arena / cluster que se pueden nombrar en una consulta
+_SQL_DIMENSIONES = text("""
+    SELECT DISTINCT corte, anio, division, arena, cluster
+    FROM ranking_clientes
+    WHERE corte IN ('anio', 'division', 'arena', 'cluster')
+""")
+
+# Cantidad pedida: "top 5", "top5", "los 20 mejores", "primeros 30", "diez clientes"
+_NUMEROS = {
+    'tres': 3, 'cinco': 5, 'diez': 10, 'quince': 15, 'veinte': 20,
+    'veinticinco': 25, 'treinta': 30, 'cincuenta': 50, 'cien': 100,
+}
+_CANTIDAD = r'(\d{1,3}|' + '|'.join(_NUMEROS) + r')'
+_PATRONES_LIMITE = [
+    re.compile(r'\btop\s*' + _CANTIDAD + r'\b'),
+    re.compile(r'\b(?:primeros|primeras|principales|mejores|mayores)\s+' + _CANTIDAD + r'\b'),
+    re.compile(r'\b' + _CANTIDAD + r'\s+(?:mejores|mayores|primeros|principales|clientes|empresas|anunciantes)\b'),
+]
+
+_dimensiones = None
+_dimensiones_version = None
+_dimensiones_lock = threading.Lock()
+
+
+def get_corte(anio=None, division=None, arena=None, cluster=None):
+    """Nombre del corte precalculado para los filtros dados (ValueError si la combinación no existe)"""
+    filtros = tuple(nombre for nombre, valor in
+                    (('anio', anio), ('division', division), ('arena', arena), ('cluster', cluster))
+                    if valor is not None)
+
+    if filtros not in CORTES:
+        raise ValueError(f"Ranking no precalculado para {' + '.join(filtros)}")
+    return CORTES[filtros]
+
+
+def get_ranking(db_engine, limite=10, anio=None, division=None, arena=None, cluster=None, solo_con_perfil=False,
+                despues_de=None):
+    """
+    Top N clientes de un corte ordenado por posición
+    [{'posicion', 'anunciante_id', 'cliente', 'facturacion', 'revenue', 'registros',
+      'market_share', 'share_acumulado'}, ...] (shares en %)
+    despues_de: {'posicion', 'cliente'} de la última fila de la página anterior
+    """
+    hechos = get_hechos_columnares(db_engine)
+    if hechos is not None:
+        return hechos.top_clientes(limite=limite, solo_con_perfil=solo_con_perfil, despues_de=despues_de,
+                                   anio=anio, division=division, arena=arena, cluster=cluster)
+
+    filtros = {'anio': anio, 'division': division, 'arena': arena, 'cluster': cluster}
+    parametros = {
+        'limite': limite,
+        'despues_posicion': despues_de['posicion'] if despues_de else None,
+        'despues_cliente': despues_de['cliente'] if despues_de else None,
+    }
+    join_perfil = _JOIN_PERFIL if solo_con_perfil else ''
+    keyset = _KEYSET if despues_de else ''
+
+    try:
+        corte = get_corte(**filtros)
+    except ValueError as e:
+        logger.warning(f"⚠️ {e}: ranking calculado en vivo sobre fact_facturacion")
+        condiciones = [f"{nombre} = :{nombre}" for nombre, valor in filtros.items() if valor is not None]
+        stmt = text(_SQL_RANKING_EN_VIVO.format(filtros=' AND '.join(condiciones), join_perfil=join_perfil,
+                                                keyset=keyset))
+        parametros.update({nombre: valor for nombre, valor in filtros.items() if valor is not None})
+    else:
+        stmt = text(_SQL_RANKING.format(join_perfil=join_perfil, keyset=keyset))
+        parametros.update({
+            'corte': corte,
+            'anio': anio or 0,
+            'division': division or '',
+            'arena': arena or '',
+            'cluster': cluster or '',
+        })
+
+    with conexion(db_engine) as conn:
+        filas = conn.execute(stmt, parametros).mappings().all()
+
+    return [
+        {
+            'posicion': fila['posicion'],
+            'anunciante_id': fila['anunciante_id'],
+            'cliente': fila['cliente'],
+            'facturacion': float(fila['facturacion']),
+            'revenue': float(fila['revenue']),
+            'registros': fila['registros'],
+            'market_share': float(fila['market_share'] or 0),
+            'share_acumulado': float(fila['share_acumulado'] or 0),
+        }
+        for fila in filas
+    ]
+
+
+def get_pagina_ranking(db_engine, limite=10, despues_de=None, **filtros):
+    """
+    Una página del ranking: {'datos': [...], 'siguiente': {'posicion', 'cliente'} o None}
+    'siguiente' es el despues_de de la página que sigue (None en la última)
+    filtros: anio, division, arena, cluster, solo_con_perfil
+    """
+    limite = max(1, min(int(limite), MAX_LIMITE))
+    filas = get_ranking(db_engine, limite=limite + 1, despues_de=despues_de, **filtros)
+
+    datos = filas[:limite]
+    siguiente = None
+    if len(filas) > limite:
+        siguiente = {'posicion': datos[-1]['posicion'], 'cliente': datos[-1]['cliente']}
+
+    return {'datos': datos, 'siguiente': siguiente}
+
+
+def _compilar_dimensiones(dimensiones):
+    """
+    {'anio': [2024, ...], 'division': ['DIV X', ...], ...} -> {nombre: (patrón, {texto normalizado: valor})}
+    Un año solo cuenta si tiene ranking: "más de 2050 registros" no es el año 2050
+    """
+    compiladas = {}
+    for nombre, valores in dimensiones.items():
+        # Valores de una letra o número suelto ("1", "A") aparecen en cualquier consulta
+        textos = {normalizar_texto(str(valor)): valor for valor in valores
+                  if valor is not None and len(normalizar_texto(str(valor))) > 1}
+        if textos:
+            patron = re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted(textos, key=len, reverse=True))) + r')\b')
+            compiladas[nombre] = (patron, textos)
+    return compiladas
+
+
+def _consultar_dimensiones(db_engine):
+    """Años, divisiones, arenas y clusters con ranking, compilados para parsear_consulta_ranking"""
+    dimensiones = {'anio': set(), 'division': set(), 'arena': set(), 'cluster': set()}
+
+    with conexion(db_engine) as conn:
+        for fila in conn.execute(_SQL_DIMENSIONES):
+            dimensiones[fila.corte].add(getattr(fila, fila.corte))
+
+    return _compilar_dimensiones(dimensiones)
+
+
+def _get_dimensiones(db_engine):
+    """Patrones de año / división / arena / cluster de la data_version actual"""
+    global _dimensiones, _dimensiones_version
+
+    version = get_data_version(db_engine)
+
+    with _dimensiones_lock:
+        if version is not None and _dimensiones is not None and _dimensiones_version == version:
+            return _dimensiones
+
+    dimensiones = _consultar_dimensiones(db_engine)
+
+    if version is not None:
+        with _dimensiones_lock:
+            _dimensiones = dimensiones
+            _dimensiones_version = version
+
+    return dimensiones
+
+
+def parsear_consulta_ranking(user_query, db_engine):
+    """
+    Cantidad y filtros pedidos en una consulta de ranking
+    "top 30 en 2024 de la división X" -> {'limite': 30, 'anio': 2024, 'division': 'X', 'arena': None, 'cluster': None}
+    limite None si la consulta no pide una cantidad (cada caller usa su default)
+    """
+    query_norm = normalizar_texto(user_query)
+    parametros = {'limite': None, 'anio': None, 'division': None, 'arena': None, 'cluster': None}
+
+    for patron in _PATRONES_LIMITE:
+        cantidad = patron.search(query_norm)
+        if cantidad:
+            valor = cantidad.group(1)
+            valor = _NUMEROS[valor] if valor in _NUMEROS else int(valor)
+            if valor > 0:
+                parametros['limite'] = min(valor, MAX_LIMITE)
+                break
+
+    for nombre, (patron, valores) in _get_dimensiones(db_engine).items():
+        encontrado = patron.search(query_norm)
+        if encontrado:
+            parametros[nombre] = valores[encontrado.group(0)]
+
+    return parametros
+
+
+def invalidar_dimensiones_ranking():
+    """Descartar los años y valores de división / arena / cluster para que se relean en la próxima consulta"""
+    global _dimensiones, _dimensiones_version
+
+    with _dimensiones_lock:
+        _dimensiones = None
+        _dimensiones_version = None
+
+    logger.info("🔄 Dimensiones del ranking invalidadas")
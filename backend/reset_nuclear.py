@@ -6,6 +6,8 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import logging
 
+from post_carga import refrescar_resumenes
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -123,5 +125,8 @@ def reset_nuclear():
             else:
                 logger.error("❌ Números aún incorrectos")
 
+    # Resúmenes 360° (mv_anunciante_360) con los datos recién cargados
+    refrescar_resumenes(engine)
+
 if __name__ == "__main__":
     reset_nuclear()
@@ -6,6 +6,8 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import logging
 
+from post_carga import refrescar_resumenes
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -164,5 +166,8 @@ def reset_total_2025():
         else:
             logger.warning("⚠️ Aún hay diferencias menores")
 
+    # Resúmenes 360° (mv_anunciante_360) con los datos recién cargados
+    refrescar_resumenes(engine)
+
 if __name__ == "__main__":
     reset_total_2025()
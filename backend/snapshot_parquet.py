@@ -0,0 +1,177 @@
+"""
+JARVIS - Snapshot Parquet
+Exporta las tablas de hechos y dimensiones a Parquet comprimido (zstd) para los scripts de análisis
+offline (ver lector_snapshot.py): los hechos quedan particionados por año (hive: anio=2024/), las
+dimensiones en un archivo cada una, y _snapshot.json guarda la data_version y las filas exportadas.
+Todo se lee en una sola foto de la base (REPEATABLE READ) y el directorio se reemplaza al final,
+así que un lector nunca ve un snapshot a medio escribir.
+
+    python snapshot_parquet.py [directorio]
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_SNAPSHOT = os.getenv(
+    'JARVIS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot_parquet')
+)
+MANIFIESTO = '_snapshot.json'
+COMPRESION = 'zstd'
+
+# Hechos particionados: tabla -> expresión del año (la columna anio sale de la partición)
+HECHOS = {
+    'fact_facturacion': 'COALESCE(anio, EXTRACT(YEAR FROM fecha_fact)::INTEGER)',
+    'fact_inversion_medios': 'anio',
+}
+
+DIMENSIONES = (
+    'dim_anunciante',
+    'dim_anunciante_aliases',
+    'dim_anunciante_perfil',
+    'dim_anunciante_perfil_tipado',
+    'dim_posicionamiento_dnit',
+)
+
+# Partición de las filas sin año (la misma que usa pyarrow para los NULL en hive)
+PARTICION_NULA = '__HIVE_DEFAULT_PARTITION__'
+
+
+# Tipo Arrow por tipo de Postgres (NUMERIC se exporta como double; lo no listado como texto)
+_TIPOS_ARROW = {
+    'smallint': pa.int16(),
+    'integer': pa.int32(),
+    'bigint': pa.int64(),
+    'numeric': pa.float64(),
+    'real': pa.float32(),
+    'double precision': pa.float64(),
+    'boolean': pa.bool_(),
+    'date': pa.date32(),
+    'timestamp without time zone': pa.timestamp('us'),
+    'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+}
+
+_SQL_COLUMNAS = text("""
+    SELECT column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = :tabla
+    ORDER BY ordinal_position
+""")
+
+
+def _columnas(conn, tabla, excluir=()):
+    """(SELECT con los casts, esquema Arrow) de una tabla: el esquema es el mismo en todas las particiones"""
+    expresiones, campos = [], []
+    for nombre, tipo in conn.execute(_SQL_COLUMNAS, {'tabla': tabla}):
+        if nombre in excluir:
+            continue
+        tipo_arrow = _TIPOS_ARROW.get(tipo, pa.string())
+        if tipo == 'numeric':
+            expresiones.append(f'"{nombre}"::DOUBLE PRECISION as "{nombre}"')
+        elif tipo_arrow == pa.string() and tipo not in ('text', 'character varying', 'character'):
+            expresiones.append(f'"{nombre}"::TEXT as "{nombre}"')
+        else:
+            expresiones.append(f'"{nombre}"')
+        campos.append(pa.field(nombre, tipo_arrow))
+
+    return f"SELECT {', '.join(expresiones)} FROM {tabla}", pa.schema(campos)
+
+
+def _escribir(df, esquema, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False), ruta, compression=COMPRESION)
+
+
+def _exportar_hecho(conn, tabla, expresion_anio, destino):
+    """Un archivo por año; retorna {anio: filas}"""
+    select, esquema = _columnas(conn, tabla, excluir=('anio',))
+    anios = [fila[0] for fila in conn.execute(text(
+        f"SELECT DISTINCT {expresion_anio} FROM {tabla}"
+    ))]
+
+    filas = {}
+    for anio in anios:
+        condicion = f"{expresion_anio} = :anio" if anio is not None else f"{expresion_anio} IS NULL"
+        df = pd.read_sql(text(f"{select} WHERE {condicion}"), conn, params={'anio': anio})
+
+        particion = f"anio={anio}" if anio is not None else f"anio={PARTICION_NULA}"
+        _escribir(df, esquema, os.path.join(destino, tabla, particion, 'datos.parquet'))
+        filas[anio] = len(df)
+
+    return filas
+
+
+def exportar_snapshot(db_engine, directorio=DIRECTORIO_SNAPSHOT):
+    """
+    Escribir el snapshot completo en directorio (reemplaza el anterior)
+    Retorna el manifiesto {'data_version', 'creado_en', 'tablas': {tabla: filas}}
+    """
+    inicio = time.perf_counter()
+    directorio = os.path.abspath(directorio)
+    temporal = f"{directorio}.tmp-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+
+    manifiesto = {'data_version': None, 'creado_en': datetime.now().isoformat(), 'tablas': {}}
+
+    with db_engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='REPEATABLE READ')
+        with conn.begin():
+            # Sin 09_data_version.sql el snapshot no queda versionado
+            if conn.execute(text("SELECT to_regclass('jarvis_data_version')")).scalar():
+                manifiesto['data_version'] = conn.execute(
+                    text("SELECT data_version FROM jarvis_data_version WHERE id = 1")
+                ).scalar()
+
+            for tabla, expresion_anio in HECHOS.items():
+                filas = _exportar_hecho(conn, tabla, expresion_anio, temporal)
+                manifiesto['tablas'][tabla] = {
+                    'filas': sum(filas.values()),
+                    'anios': sorted(anio for anio in filas if anio is not None),
+                }
+                logger.info(f"📦 {tabla}: {sum(filas.values()):,} filas en {len(filas)} particiones")
+
+            for tabla in DIMENSIONES:
+                select, esquema = _columnas(conn, tabla)
+                df = pd.read_sql(text(select), conn)
+                _escribir(df, esquema, os.path.join(temporal, f"{tabla}.parquet"))
+                manifiesto['tablas'][tabla] = {'filas': len(df)}
+                logger.info(f"📦 {tabla}: {len(df):,} filas")
+
+    with open(os.path.join(temporal, MANIFIESTO), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=2, default=str)
+
+    # Reemplazo del snapshot anterior
+    anterior = f"{directorio}.anterior"
+    shutil.rmtree(anterior, ignore_errors=True)
+    if os.path.exists(directorio):
+        os.rename(directorio, anterior)
+    os.rename(temporal, directorio)
+    shutil.rmtree(anterior, ignore_errors=True)
+
+    logger.info(f"✅ Snapshot Parquet en {directorio} ({time.perf_counter() - inicio:.1f}s, "
+                f"data_version {manifiesto['data_version']})")
+    return manifiesto
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    DB_USER = os.getenv('PG_USER', 'postgres')
+    DB_PASS = os.getenv('PG_PASS', '12345')
+    DB_HOST = os.getenv('PG_HOST', 'localhost')
+    DB_PORT = os.getenv('PG_PORT', '5432')
+    DB_NAME = os.getenv('PG_DB', 'jarvis')
+
+    engine = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+    exportar_snapshot(engine, sys.argv[1] if len(sys.argv) > 1 else DIRECTORIO_SNAPSHOT)
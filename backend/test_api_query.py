@@ -0,0 +1,33 @@
+"""
+TEST: Rutas de /api/query
+Cada rama del router debe responder sin error (requiere la base con las migraciones aplicadas)
+"""
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+
+def _cliente_api():
+    """Cliente de prueba con token; se saltea el test si no hay base"""
+    from app import app, engine, generate_token
+
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"Sin base de datos: {e.orig}")
+
+    return app.test_client(), {'Authorization': f'Bearer {generate_token(1)}'}
+
+
+def test_consulta_compleja_de_mercado():
+    """'mercado' va a las consultas complejas sin Claude (comparación de snapshots de carga)"""
+    cliente, headers = _cliente_api()
+
+    respuesta = cliente.post('/api/query', json={'query': 'cambios en el mercado desde la ultima carga'}, headers=headers)
+
+    assert respuesta.status_code == 200, respuesta.get_data(as_text=True)
+    cuerpo = respuesta.get_json()
+    assert cuerpo['success']
+    assert cuerpo['responses'][0]['query_type'] == 'compleja_sin_claude'
+    assert cuerpo['responses'][0]['data']['tipo'] == 'cambios_mercado'
@@ -0,0 +1,41 @@
+"""
+TEST: Palabras clave de los routers sobre texto normalizado
+Las claves con tilde se pliegan ('más' → 'mas') y no deben aparecer dentro de nombres de clientes
+"""
+
+from chart_utils import BOTH_CONNECTOR_KEYWORDS, TEMPORAL_KEYWORDS
+from normalizacion import compilar_claves, normalizar_texto
+
+# Mismas claves que CLAVES_QUERY_RANKING / CLAVES_QUERY_FACTURACION en app.py
+CLAVES_QUERY_RANKING = compilar_claves(["top", "ranking", "principal", "importante", "mayor", "más", "clientes"])
+CLAVES_QUERY_FACTURACION = compilar_claves(["cuánto", "cuanto", "factur", "how much", "invirti", "ranking", "dnit", "datos", "perfil", "informacion", "cluster", "cultura"])
+
+
+def test_clientes_con_mas_en_el_nombre_no_van_al_ranking():
+    """'más' plegado no debe encontrarse dentro de Mastercard ni de Tomas"""
+    for consulta in ("cuanto facturo Mastercard", "cuánto facturó Tomas Martinez SA"):
+        texto = normalizar_texto(consulta)
+        assert not CLAVES_QUERY_RANKING.search(texto), consulta
+        assert CLAVES_QUERY_FACTURACION.search(texto), consulta
+
+
+def test_mas_como_palabra_sigue_yendo_al_ranking():
+    for consulta in ("clientes que más facturan", "los que mas facturaron", "¿quién factura más?"):
+        assert CLAVES_QUERY_RANKING.search(normalizar_texto(consulta)), consulta
+
+
+def test_claves_sin_tilde_siguen_siendo_subcadenas():
+    """'factur' cubre facturó/facturación y 'cuanto' también 'cuantos'"""
+    for consulta in ("facturación de Nestlé", "cuántos clientes facturaron"):
+        assert CLAVES_QUERY_FACTURACION.search(normalizar_texto(consulta)), consulta
+
+
+def test_anio_solo_como_palabra():
+    assert TEMPORAL_KEYWORDS.search(normalizar_texto("facturación por año"))
+    assert TEMPORAL_KEYWORDS.search(normalizar_texto("facturación de los años 2024 y 2025"))
+    assert TEMPORAL_KEYWORDS.search(normalizar_texto("facturación de Pirano SA")) is None
+
+
+def test_conectores_con_espacios_de_borde():
+    assert BOTH_CONNECTOR_KEYWORDS.search(normalizar_texto("facturación y también inversión"))
+    assert BOTH_CONNECTOR_KEYWORDS.search(normalizar_texto("tambien")) is None
@@ -0,0 +1,45 @@
+"""
+TEST: Parser de consultas de ranking
+Cantidad, año y filtros que salen de la consulta (sin base: las dimensiones se fijan en el test)
+"""
+
+import pytest
+
+import ranking_clientes
+from ranking_clientes import _compilar_dimensiones, parsear_consulta_ranking
+
+DIMENSIONES = _compilar_dimensiones({
+    'anio': [2023, 2024, 2025],
+    'division': ['DIGITAL', 'MEDIOS'],
+    'arena': ['CREACION'],
+    'cluster': ['LIDERES'],
+})
+
+
+@pytest.fixture(autouse=True)
+def dimensiones_fijas(monkeypatch):
+    monkeypatch.setattr(ranking_clientes, '_get_dimensiones', lambda db_engine: DIMENSIONES)
+
+
+def test_cantidad_anio_y_division():
+    filtros = parsear_consulta_ranking("Top 30 en 2024 de la división Digital", None)
+
+    assert filtros == {'limite': 30, 'anio': 2024, 'division': 'DIGITAL', 'arena': None, 'cluster': None}
+
+
+def test_cantidad_en_palabras_y_tope():
+    assert parsear_consulta_ranking("los diez mejores clientes", None)['limite'] == 10
+    assert parsear_consulta_ranking("top 500", None)['limite'] == ranking_clientes.MAX_LIMITE
+
+
+def test_numeros_que_no_son_anios_del_ranking():
+    """Un número de cuatro cifras solo es año si hay ranking de ese año"""
+    for consulta in ("top 10 clientes con facturación mayor a 2000 millones",
+                     "top 5 clientes con más de 2050 registros"):
+        assert parsear_consulta_ranking(consulta, None)['anio'] is None, consulta
+
+
+def test_sin_filtros():
+    filtros = parsear_consulta_ranking("ranking de clientes", None)
+
+    assert filtros == {'limite': None, 'anio': None, 'division': None, 'arena': None, 'cluster': None}
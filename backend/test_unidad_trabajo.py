@@ -0,0 +1,189 @@
+"""
+TEST: Unidad de trabajo por request
+Cada endpoint debe tomar como máximo UNA conexión del pool por request, sin importar
+cuántos helpers (Session(), buscar_anunciante, get_cliente_360, log_audit...) consulten la base
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from unidad_trabajo import conexion, fabrica_sesiones, registrar_unidad_trabajo, transaccion
+
+
+def _engine_o_saltear():
+    """Engine de app; se saltea el test si no hay base"""
+    from app import engine
+
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"Sin base de datos: {e.orig}")
+
+    return engine
+
+
+@contextmanager
+def contar_checkouts(engine):
+    """Cuenta las conexiones que se toman del pool dentro del bloque"""
+    contador = {'checkouts': 0}
+
+    def al_tomar(dbapi_conn, registro, proxy):
+        contador['checkouts'] += 1
+
+    event.listen(engine.pool, 'checkout', al_tomar)
+    try:
+        yield contador
+    finally:
+        event.remove(engine.pool, 'checkout', al_tomar)
+
+
+def _app_sin_base(tmp_path):
+    """App mínima sobre SQLite (mismo pool con checkouts que Postgres) con endpoints que consultan varias veces"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'unidad_trabajo.db'}", poolclass=QueuePool)
+    Session = fabrica_sesiones(sessionmaker(bind=engine))
+
+    app_prueba = Flask(__name__)
+    registrar_unidad_trabajo(app_prueba)
+
+    @app_prueba.route('/varios_helpers')
+    def varios_helpers():
+        with conexion(engine) as conn:
+            conn.execute(text("SELECT 1"))
+        sesion = Session()
+        sesion.execute(text("SELECT 1"))
+        sesion.close()
+        with transaccion(engine) as conn:
+            conn.execute(text("SELECT 1"))
+        with conexion(engine) as conn:
+            conn.execute(text("SELECT 1"))
+        return 'ok'
+
+    @app_prueba.route('/sin_datos')
+    def sin_datos():
+        return 'ok'
+
+    @app_prueba.route('/con_error')
+    def con_error():
+        try:
+            with conexion(engine) as conn:
+                conn.execute(text("SELECT * FROM tabla_que_no_existe"))
+        except Exception:
+            pass
+        with conexion(engine) as conn:
+            return str(conn.execute(text("SELECT 1")).scalar())
+
+    return app_prueba, engine
+
+
+def test_checkouts_por_request_sin_base(tmp_path):
+    """Un checkout por request aunque varios helpers consulten, ninguno si no hay datos, y se devuelve al final"""
+    app_prueba, engine = _app_sin_base(tmp_path)
+    cliente = app_prueba.test_client()
+
+    for ruta, esperados in (('/varios_helpers', 1), ('/sin_datos', 0), ('/con_error', 1)):
+        with contar_checkouts(engine) as contador:
+            respuesta = cliente.get(ruta)
+        assert respuesta.status_code == 200, f"{ruta}: {respuesta.status_code}"
+        assert contador['checkouts'] == esperados, f"{ruta}: {contador['checkouts']} checkouts"
+        assert engine.pool.checkedout() == 0, f"{ruta}: conexión no devuelta al pool"
+
+    assert cliente.get('/con_error').get_data(as_text=True) == '1'
+
+
+def test_checkouts_por_endpoint():
+    """Checkouts por request en los endpoints que más consultan la base"""
+    engine = _engine_o_saltear()
+    from app import app, generate_token
+
+    cliente = app.test_client()
+    headers = {'Authorization': f'Bearer {generate_token(1)}'}
+
+    casos = [
+        ('GET', '/api/health', None, None),
+        ('POST', '/api/query', {'query': 'cuanto facturo cervepar en 2024'}, headers),
+        ('POST', '/api/query', {'query': 'top 10 clientes'}, headers),
+        ('POST', '/api/query', {'query': 'perfil de unilever'}, headers),
+        ('GET', '/api/auth/verify', None, headers),
+        ('GET', '/api/trainer/tables', None, headers),
+    ]
+
+    # Primera pasada: construye índices y matcher (también sobre la conexión del request)
+    for metodo, ruta, cuerpo, cabeceras in casos:
+        cliente.open(ruta, method=metodo, json=cuerpo, headers=cabeceras)
+
+    for metodo, ruta, cuerpo, cabeceras in casos:
+        with contar_checkouts(engine) as contador:
+            respuesta = cliente.open(ruta, method=metodo, json=cuerpo, headers=cabeceras)
+        etiqueta = f"{metodo} {ruta}" + (f" '{cuerpo['query']}'" if cuerpo else "")
+        assert contador['checkouts'] <= 1, f"{etiqueta}: {contador['checkouts']} checkouts [{respuesta.status_code}]"
+
+
+def test_conexion_y_sesion_compartidas():
+    """conexion() y Session() reutilizan la misma conexión y la devuelven al pool al terminar"""
+    engine = _engine_o_saltear()
+    from app import Session
+
+    app_prueba = Flask(__name__)
+    registrar_unidad_trabajo(app_prueba)
+
+    with contar_checkouts(engine) as contador:
+        with app_prueba.app_context():
+            with conexion(engine) as conn_1:
+                conn_1.execute(text("SELECT 1"))
+            with conexion(engine) as conn_2:
+                conn_2.execute(text("SELECT 1"))
+            sesion = Session()
+            sesion.execute(text("SELECT 1"))
+            sesion.close()
+            with transaccion(engine) as conn_3:
+                conn_3.execute(text("SELECT 1"))
+
+            assert conn_1 is conn_2 is conn_3
+            assert sesion is Session()
+            assert not conn_1.in_transaction()
+
+    assert contador['checkouts'] == 1, contador
+    assert engine.pool.checkedout() == 0
+
+    # Fuera de un request cada bloque sigue usando su propia conexión
+    with contar_checkouts(engine) as contador:
+        with conexion(engine) as conn:
+            conn.execute(text("SELECT 1"))
+        sesion = Session()
+        sesion.execute(text("SELECT 1"))
+        sesion.close()
+    assert contador['checkouts'] == 2, contador
+
+    print("✅ conexion()/Session() comparten una conexión por request")
+
+
+def test_error_en_bloque_no_contamina_request():
+    """Un bloque que falla se revierte y el siguiente helper del mismo request funciona"""
+    engine = _engine_o_saltear()
+
+    app_prueba = Flask(__name__)
+    registrar_unidad_trabajo(app_prueba)
+
+    with app_prueba.app_context():
+        try:
+            with conexion(engine) as conn:
+                conn.execute(text("SELECT * FROM tabla_que_no_existe"))
+        except Exception:
+            pass
+        with conexion(engine) as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+
+    print("✅ Error en un bloque no afecta al siguiente")
+
+
+if __name__ == "__main__":
+    test_conexion_y_sesion_compartidas()
+    test_error_en_bloque_no_contamina_request()
+    test_checkouts_por_endpoint()
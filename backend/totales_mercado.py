@@ -0,0 +1,133 @@
+"""
+JARVIS - Totales del mercado
+Facturación total (general, por año, por división y por arena) calculada una vez por data_version
+(ver 09_data_version.sql) y guardada en el proceso: el market share de un cliente es una división
+en lugar de un SUM sobre todo fact_facturacion en cada consulta. Con el cache columnar activo
+(cache_columnar.py) los totales salen de los arrays en memoria
+"""
+
+import logging
+import threading
+
+from sqlalchemy import text
+
+from cache_360 import get_data_version
+from cache_columnar import get_hechos_columnares
+from unidad_trabajo import conexion
+
+logger = logging.getLogger(__name__)
+
+_SQL_TOTALES = text("""
+    SELECT
+        GROUPING(anio) as sin_anio,
+        GROUPING(division) as sin_division,
+        GROUPING(arena) as sin_arena,
+        anio,
+        division,
+        arena,
+        COALESCE(SUM(facturacion), 0) as facturacion
+    FROM (
+        SELECT
+            COALESCE(anio, EXTRACT(YEAR FROM fecha_fact)::INTEGER) as anio,
+            division,
+            arena,
+            facturacion
+        FROM fact_facturacion
+    ) f
+    GROUP BY GROUPING SETS ((), (anio), (division), (arena))
+""")
+
+_totales = None
+_totales_version = None
+_totales_lock = threading.Lock()
+
+
+def _consultar_totales(db_engine):
+    """Una pasada sobre fact_facturacion con los cuatro niveles de agregación"""
+    hechos = get_hechos_columnares(db_engine)
+    if hechos is not None:
+        return {
+            'total': hechos.total_facturacion(),
+            'por_anio': hechos.facturacion_por('anio'),
+            'por_division': hechos.facturacion_por('division'),
+            'por_arena': hechos.facturacion_por('arena'),
+        }
+
+    totales = {
+        'total': 0.0,
+        'por_anio': {},
+        'por_division': {},
+        'por_arena': {},
+    }
+
+    with conexion(db_engine) as conn:
+        for fila in conn.execute(_SQL_TOTALES):
+            facturacion = float(fila.facturacion)
+            if fila.sin_anio and fila.sin_division and fila.sin_arena:
+                totales['total'] = facturacion
+            elif not fila.sin_anio:
+                totales['por_anio'][fila.anio] = facturacion
+            elif not fila.sin_division:
+                totales['por_division'][fila.division] = facturacion
+            else:
+                totales['por_arena'][fila.arena] = facturacion
+
+    return totales
+
+
+def get_totales_mercado(db_engine):
+    """
+    Totales de facturación del mercado para la data_version actual
+    {'total', 'por_anio': {anio: total}, 'por_division': {...}, 'por_arena': {...}}
+    Sin data_version (falta 09_data_version.sql) se calculan en cada llamada
+    """
+    global _totales, _totales_version
+
+    version = get_data_version(db_engine)
+
+    with _totales_lock:
+        if version is not None and _totales is not None and _totales_version == version:
+            return _totales
+
+    totales = _consultar_totales(db_engine)
+
+    if version is not None:
+        with _totales_lock:
+            _totales = totales
+            _totales_version = version
+        logger.info(f"✅ Totales del mercado calculados (data_version {version}): {totales['total']:,.0f} Gs")
+
+    return totales
+
+
+def get_total_mercado(totales, anio=None, division=None, arena=None):
+    """Total del mercado general o de un solo año / división / arena (0.0 si no hay facturación)"""
+    filtros = [(clave, valor) for clave, valor in
+               (('por_anio', anio), ('por_division', division), ('por_arena', arena)) if valor is not None]
+
+    if not filtros:
+        return totales['total']
+    if len(filtros) > 1:
+        raise ValueError("Total del mercado disponible por año, división o arena, no combinados")
+
+    clave, valor = filtros[0]
+    return totales[clave].get(valor, 0.0)
+
+
+def calcular_market_share(facturacion, totales, anio=None, division=None, arena=None):
+    """Porcentaje (2 decimales) de facturación sobre el total del mercado; 0.0 si el total es 0"""
+    total = get_total_mercado(totales, anio=anio, division=division, arena=arena)
+    if not total:
+        return 0.0
+    return round(float(facturacion or 0) * 100.0 / total, 2)
+
+
+def invalidar_totales_mercado():
+    """Descartar los totales para que se recalculen en la próxima consulta"""
+    global _totales, _totales_version
+
+    with _totales_lock:
+        _totales = None
+        _totales_version = None
+
+    logger.info("🔄 Totales del mercado invalidados")
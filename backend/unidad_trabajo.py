@@ -0,0 +1,182 @@
+"""
+JARVIS - Unidad de trabajo por request
+Una sola conexión del pool por request, tomada recién en el primer acceso a datos y devuelta
+en el teardown; la sesión ORM del request usa esa misma conexión.
+Fuera de un request (scripts, hilos de fondo) cada bloque usa su propia conexión como antes.
+"""
+
+import contextvars
+import logging
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from sqlalchemy import text
+from sqlalchemy.orm import Session as SesionOrm
+
+logger = logging.getLogger(__name__)
+
+# statement_timeout (ms) de las conexiones propias abiertas en este contexto (ver limite_sentencias)
+_timeout_sentencias_ms = contextvars.ContextVar('timeout_sentencias_ms', default=None)
+
+
+class _SesionRequest(SesionOrm):
+    """
+    Sesión compartida por todo el request: close() suelta los objetos y descarta lo no confirmado
+    (mismo efecto visible que cerrar) y el cierre real lo hace cerrar_unidad_trabajo()
+    """
+
+    def close(self):
+        self.expunge_all()
+        self.rollback()
+
+    def cerrar(self):
+        super().close()
+
+
+class UnidadTrabajo:
+    """Conexión y sesión del request, creadas de forma perezosa"""
+
+    def __init__(self):
+        self.engine = None
+        self.conexion = None
+        self.sesion = None
+
+    def get_conexion(self, db_engine):
+        if self.conexion is None:
+            self.engine = db_engine
+            self.conexion = db_engine.connect()
+        elif db_engine is not self.engine:
+            raise ValueError("La unidad de trabajo ya usa otro engine en este request")
+        return self.conexion
+
+    def get_sesion(self, db_engine):
+        if self.sesion is None:
+            # Si la conexión ya tiene una transacción abierta, la sesión trabaja en un SAVEPOINT
+            # y su commit/rollback no toca lo que hizo el bloque que la contiene
+            self.sesion = _SesionRequest(bind=self.get_conexion(db_engine),
+                                         join_transaction_mode='create_savepoint')
+        elif self.sesion.in_transaction() and not self.sesion.get_transaction().is_active:
+            # Un helper anterior falló sin cerrar: no arrastrar el error al siguiente
+            self.sesion.rollback()
+        return self.sesion
+
+    def cerrar(self, error=None):
+        try:
+            if self.sesion is not None:
+                self.sesion.cerrar()
+            if self.conexion is not None:
+                if self.conexion.in_transaction():
+                    if error is None:
+                        self.conexion.commit()
+                    else:
+                        self.conexion.rollback()
+        finally:
+            if self.conexion is not None:
+                self.conexion.close()
+            self.conexion = None
+            self.sesion = None
+
+
+@contextmanager
+def limite_sentencias(segundos):
+    """
+    Las conexiones propias (fuera de un request) que se abran dentro del bloque cortan cada
+    sentencia a los segundos dados (SET LOCAL statement_timeout: no queda en la conexión del pool)
+    """
+    token = _timeout_sentencias_ms.set(max(int(segundos * 1000), 1))
+    try:
+        yield
+    finally:
+        _timeout_sentencias_ms.reset(token)
+
+
+def _aplicar_limite(conn):
+    timeout_ms = _timeout_sentencias_ms.get()
+    if timeout_ms is not None:
+        conn.execute(text("SELECT set_config('statement_timeout', :timeout, true)"),
+                     {'timeout': str(timeout_ms)})
+
+
+def _unidad_actual():
+    """Unidad de trabajo del request actual (None fuera de un request)"""
+    if not has_app_context():
+        return None
+    if 'unidad_trabajo' not in g:
+        g.unidad_trabajo = UnidadTrabajo()
+    return g.unidad_trabajo
+
+
+@contextmanager
+def conexion(db_engine):
+    """
+    Reemplazo de `with db_engine.connect() as conn`
+    En un request reutiliza la conexión compartida: la transacción que abre el bloque se confirma
+    al salir (o se revierte si hubo error) para que el siguiente bloque empiece limpio;
+    si ya había una transacción abierta (ej: la de la sesión) queda a cargo de quien la abrió
+    """
+    unidad = _unidad_actual()
+    if unidad is None:
+        with db_engine.connect() as conn:
+            _aplicar_limite(conn)
+            yield conn
+        return
+
+    conn = unidad.get_conexion(db_engine)
+    abre_transaccion = not conn.in_transaction()
+
+    try:
+        yield conn
+    except Exception:
+        if abre_transaccion and conn.in_transaction():
+            conn.rollback()
+        raise
+
+    if abre_transaccion and conn.in_transaction():
+        conn.commit()
+
+
+@contextmanager
+def transaccion(db_engine):
+    """Reemplazo de `with db_engine.begin() as conn`: confirma al salir, revierte si hubo error"""
+    unidad = _unidad_actual()
+    if unidad is None:
+        with db_engine.begin() as conn:
+            _aplicar_limite(conn)
+            yield conn
+        return
+
+    with conexion(db_engine) as conn:
+        if conn.in_transaction():
+            # Dentro de una transacción ajena: solo se confirma/revierte lo de este bloque
+            with conn.begin_nested():
+                yield conn
+        else:
+            with conn.begin():
+                yield conn
+
+
+def fabrica_sesiones(sessionmaker_base):
+    """
+    Reemplazo de Session(): dentro de un request devuelve la sesión compartida,
+    fuera de un request una sesión nueva de sessionmaker_base
+    """
+    def crear_sesion():
+        unidad = _unidad_actual()
+        if unidad is None:
+            return sessionmaker_base()
+        return unidad.get_sesion(sessionmaker_base.kw['bind'])
+
+    return crear_sesion
+
+
+def registrar_unidad_trabajo(app):
+    """Cerrar la unidad de trabajo al terminar cada request (devuelve la conexión al pool)"""
+
+    @app.teardown_appcontext
+    def cerrar_unidad_trabajo(error=None):
+        unidad = g.pop('unidad_trabajo', None)
+        if unidad is not None:
+            try:
+                unidad.cerrar(error)
+            except Exception as e:
+                logger.error(f"Error cerrando unidad de trabajo: {e}")
@@ -1,33 +1,29 @@
 """
 SCRIPT: Verificación Exacta Excel vs Base de Datos
 Compara todos los números para confirmar integridad 100%
+La BD se lee del snapshot Parquet (python snapshot_parquet.py después de la carga)
 """
 
 import pandas as pd
-import psycopg2
-from sqlalchemy import create_engine, text
 import logging
 
+from lector_snapshot import info_snapshot, leer_tabla
+
 # Configuración logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuración base de datos
-DB_CONFIG = {
-    'host': 'localhost',
-    'database': 'jarvis',
-    'user': 'postgres',
-    'password': '12345'
-}
-
 def conectar_bd():
-    """Crear conexión a PostgreSQL"""
+    """Facturación 2025 del snapshot Parquet"""
     try:
-        engine = create_engine(f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}/{DB_CONFIG['database']}")
-        logger.info("✅ Conexión a BD establecida")
-        return engine
+        snapshot = info_snapshot()
+        facturas = leer_tabla('fact_facturacion', anios=[2025], columnas=[
+            'cliente_original', 'facturacion', 'costo', 'revenue', 'anunciante_id'
+        ])
+        logger.info(f"✅ Snapshot cargado (data_version {snapshot['data_version']}, {snapshot['creado_en']})")
+        return facturas
     except Exception as e:
-        logger.error(f"❌ Error conectando BD: {e}")
+        logger.error(f"❌ Error leyendo snapshot: {e}")
         return None
 
 def leer_datos_excel():
@@ -60,41 +56,34 @@ def leer_datos_excel():
         logger.error(f"❌ Error leyendo Excel: {e}")
         return None
 
-def leer_datos_bd(engine):
+def leer_datos_bd(facturas):
     """Leer datos de la Base de Datos"""
     try:
         logger.info("🗄️ Leyendo datos de la Base de Datos...")
         
-        with engine.connect() as conn:
-            # Consulta principal
-            query = text("""
-                SELECT 
-                    COUNT(*) as total_registros,
-                    SUM(facturacion) as facturacion_total,
-                    SUM(costo) as costo_total,
-                    SUM(revenue) as revenue_total,
-                    COUNT(CASE WHEN anunciante_id IS NOT NULL THEN 1 END) as registros_mapeados,
-                    COUNT(CASE WHEN anunciante_id IS NULL THEN 1 END) as registros_sin_mapear
-                FROM fact_facturacion 
-                WHERE anio = 2025
-            """)
-            
-            result = conn.execute(query).fetchone()
-            
-            logger.info(f"📈 BD - Total registros 2025: {result.total_registros:,}")
-            logger.info(f"💰 BD - Facturación total: {float(result.facturacion_total):,.2f} Gs")
-            logger.info(f"💵 BD - Costo total: {float(result.costo_total):,.2f} Gs")
-            logger.info(f"📊 BD - Revenue total: {float(result.revenue_total):,.2f} Gs")
-            logger.info(f"🔗 BD - Registros mapeados: {result.registros_mapeados:,}")
-            logger.info(f"❌ BD - Registros sin mapear: {result.registros_sin_mapear:,}")
-            
-            return result
-            
+        result = pd.Series({
+            'total_registros': len(facturas),
+            'facturacion_total': facturas['facturacion'].sum(),
+            'costo_total': facturas['costo'].sum(),
+            'revenue_total': facturas['revenue'].sum(),
+            'registros_mapeados': int(facturas['anunciante_id'].notna().sum()),
+            'registros_sin_mapear': int(facturas['anunciante_id'].isna().sum()),
+        })
+
+        logger.info(f"📈 BD - Total registros 2025: {result.total_registros:,}")
+        logger.info(f"💰 BD - Facturación total: {float(result.facturacion_total):,.2f} Gs")
+        logger.info(f"💵 BD - Costo total: {float(result.costo_total):,.2f} Gs")
+        logger.info(f"📊 BD - Revenue total: {float(result.revenue_total):,.2f} Gs")
+        logger.info(f"🔗 BD - Registros mapeados: {result.registros_mapeados:,}")
+        logger.info(f"❌ BD - Registros sin mapear: {result.registros_sin_mapear:,}")
+        
+        return result
+        
     except Exception as e:
         logger.error(f"❌ Error leyendo BD: {e}")
         return None
 
-def verificar_por_cliente(df_excel, engine):
+def verificar_por_cliente(df_excel, facturas):
     """Verificación detallada por cliente"""
     try:
         logger.info("🔍 Verificando facturación por cliente...")
@@ -109,26 +98,14 @@ def verificar_por_cliente(df_excel, engine):
         excel_clientes.columns = ['Registros_Excel', 'Facturacion_Excel', 'Costo_Excel', 'Revenue_Excel']
         excel_clientes = excel_clientes.reset_index()
         
-        # Consultar BD por cliente
-        with engine.connect() as conn:
-            bd_query = text("""
-                SELECT 
-                    cliente_original as cliente,
-                    COUNT(*) as registros_bd,
-                    SUM(facturacion) as facturacion_bd,
-                    SUM(costo) as costo_bd,
-                    SUM(revenue) as revenue_bd
-                FROM fact_facturacion 
-                WHERE anio = 2025
-                    AND cliente_original IS NOT NULL
-                GROUP BY cliente_original
-                ORDER BY facturacion_bd DESC
-            """)
-            
-            bd_clientes = pd.read_sql(bd_query, conn)
-            bd_clientes['facturacion_bd'] = bd_clientes['facturacion_bd'].astype(float).round(2)
-            bd_clientes['costo_bd'] = bd_clientes['costo_bd'].astype(float).round(2) 
-            bd_clientes['revenue_bd'] = bd_clientes['revenue_bd'].astype(float).round(2)
+        # Agrupar BD por cliente
+        bd_clientes = facturas[facturas['cliente_original'].notna()].groupby('cliente_original').agg(
+            registros_bd=('facturacion', 'size'),
+            facturacion_bd=('facturacion', 'sum'),
+            costo_bd=('costo', 'sum'),
+            revenue_bd=('revenue', 'sum'),
+        ).round(2).reset_index().rename(columns={'cliente_original': 'cliente'})
+        bd_clientes = bd_clientes.sort_values('facturacion_bd', ascending=False)
         
         # Comparar
         comparacion = excel_clientes.merge(
@@ -184,10 +161,10 @@ def main():
     logger.info("🔍 VERIFICACIÓN EXACTA: EXCEL vs BASE DE DATOS")
     logger.info("=" * 60)
     
-    # Conectar BD
-    engine = conectar_bd()
-    if not engine:
-        logger.error("❌ No se pudo conectar a la BD")
+    # Leer snapshot de la BD
+    facturas = conectar_bd()
+    if facturas is None:
+        logger.error("❌ No se pudo leer el snapshot de la BD")
         return
     
     # Leer datos Excel
@@ -197,7 +174,7 @@ def main():
         return
     
     # Leer datos BD
-    bd_data = leer_datos_bd(engine)
+    bd_data = leer_datos_bd(facturas)
     if bd_data is None:
         logger.error("❌ No se pudieron leer los datos de la BD")
         return
@@ -229,7 +206,7 @@ def main():
         logger.info("🔍 Ejecutando verificación detallada por cliente...")
         
         # Verificación detallada
-        comparacion = verificar_por_cliente(df_excel, engine)
+        comparacion = verificar_por_cliente(df_excel, facturas)
     
     logger.info("")
     logger.info("🎯 VERIFICACIÓN COMPLETADA")